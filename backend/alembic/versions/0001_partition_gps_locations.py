@@ -0,0 +1,117 @@
+"""partition gps_locations by timestamp
+
+Revision ID: 0001_partition_gps_locations
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.gps_partitions import (
+    create_default_partition,
+    create_partitions,
+    ensure_future_partitions,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_partition_gps_locations"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX_NAME = "ix_gps_locations_rider_id_timestamp"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+
+    # other dialects only get the composite index
+    if bind.dialect.name != "postgresql":
+        op.create_index(INDEX_NAME, "gps_locations", ["rider_id", "timestamp"], if_not_exists=True)
+        return
+
+    has_legacy = sa.inspect(bind).has_table("gps_locations")
+
+    if has_legacy:
+        op.execute("ALTER TABLE gps_locations RENAME TO gps_locations_legacy")
+        op.execute("ALTER INDEX IF EXISTS gps_locations_pkey RENAME TO gps_locations_legacy_pkey")
+        op.execute("DROP INDEX IF EXISTS ix_gps_locations_id")
+        op.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+    else:
+        op.execute("CREATE SEQUENCE IF NOT EXISTS gps_locations_id_seq")
+
+    # the partition key has to be part of the primary key
+    op.execute("""
+        CREATE TABLE gps_locations (
+            id INTEGER NOT NULL DEFAULT nextval('gps_locations_id_seq'),
+            rider_id INTEGER NOT NULL REFERENCES users (id),
+            latitude DOUBLE PRECISION NOT NULL,
+            longitude DOUBLE PRECISION NOT NULL,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("ALTER SEQUENCE gps_locations_id_seq OWNED BY gps_locations.id")
+    op.execute("CREATE INDEX ix_gps_locations_id ON gps_locations (id)")
+    op.execute(f"CREATE INDEX {INDEX_NAME} ON gps_locations (rider_id, timestamp)")
+
+    # rows outside every range land here instead of failing the insert
+    create_default_partition(bind)
+
+    today = datetime.utcnow().date()
+    ensure_future_partitions(bind, today=today)
+
+    if has_legacy:
+        oldest = bind.execute(sa.text(
+            "SELECT min(timestamp) FROM gps_locations_legacy"
+        )).scalar()
+        if oldest is not None:
+            create_partitions(bind, oldest.date(), today)
+
+        op.execute("""
+            INSERT INTO gps_locations (id, rider_id, latitude, longitude, timestamp)
+            SELECT id, rider_id, latitude, longitude, COALESCE(timestamp, now())
+            FROM gps_locations_legacy
+        """)
+        op.execute("DROP TABLE gps_locations_legacy")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+
+    if bind.dialect.name != "postgresql":
+        op.drop_index(INDEX_NAME, table_name="gps_locations", if_exists=True)
+        return
+
+    op.execute("ALTER TABLE gps_locations RENAME TO gps_locations_partitioned")
+    op.execute("ALTER INDEX IF EXISTS gps_locations_pkey RENAME TO gps_locations_partitioned_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_gps_locations_id")
+    op.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+
+    op.execute("""
+        CREATE TABLE gps_locations (
+            id INTEGER NOT NULL DEFAULT nextval('gps_locations_id_seq') PRIMARY KEY,
+            rider_id INTEGER NOT NULL REFERENCES users (id),
+            latitude DOUBLE PRECISION NOT NULL,
+            longitude DOUBLE PRECISION NOT NULL,
+            timestamp TIMESTAMP WITHOUT TIME ZONE DEFAULT now()
+        )
+    """)
+    op.execute("ALTER SEQUENCE gps_locations_id_seq OWNED BY gps_locations.id")
+    op.execute("CREATE INDEX ix_gps_locations_id ON gps_locations (id)")
+    op.execute(f"CREATE INDEX {INDEX_NAME} ON gps_locations (rider_id, timestamp)")
+
+    op.execute("""
+        INSERT INTO gps_locations (id, rider_id, latitude, longitude, timestamp)
+        SELECT id, rider_id, latitude, longitude, timestamp
+        FROM gps_locations_partitioned
+    """)
+    op.execute("DROP TABLE gps_locations_partitioned CASCADE")
@@ -0,0 +1,33 @@
+"""add red_zones.weight
+
+Revision ID: 0002_red_zone_weight
+Revises: 0001_partition_gps_locations
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_red_zone_weight"
+down_revision: Union[str, Sequence[str], None] = "0001_partition_gps_locations"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table("red_zones"):
+        return      # created with the column by create_all
+    op.add_column(
+        "red_zones",
+        sa.Column("weight", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("red_zones", "weight")
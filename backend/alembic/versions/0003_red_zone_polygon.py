@@ -0,0 +1,34 @@
+"""polygon red zones
+
+Revision ID: 0003_red_zone_polygon
+Revises: 0002_red_zone_weight
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_red_zone_polygon"
+down_revision: Union[str, Sequence[str], None] = "0002_red_zone_weight"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table("red_zones"):
+        return      # created with the columns by create_all
+    with op.batch_alter_table("red_zones") as batch:
+        batch.add_column(sa.Column("polygon", sa.JSON(), nullable=True))
+        batch.alter_column("radius_meters", existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("red_zones") as batch:
+        batch.alter_column("radius_meters", existing_type=sa.Integer(), nullable=False)
+        batch.drop_column("polygon")
@@ -1,16 +1,27 @@
 from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.websockets import WebSocketDisconnect
+import asyncio
+import json
 import time
 
-from app.db.session import engine
+from app.db.session import engine, AsyncSessionLocal
 from app.db.base import Base
-from .utils.geo import distance_meters
+from .utils.fix_frames import SUBPROTOCOL as FIX_SUBPROTOCOL, FrameDecoder, FrameError
 from .tracking_state import rider_state
+from .services.gps_buffer import gps_buffer
+from .services.odometer import odometer
+from .services.distance import distance_rollup
+from .services.last_fix_cache import last_fix_cache
+from .services.admin_broadcast import admin_broadcaster
+from .services.zone_pressure import zone_pressure
+from .services.gps_partitions import run_maintenance as run_gps_partition_maintenance
 from .red_zone_service import (
+    load_zone_catalogue,
+    zone_reloader,
     get_current_red_zone,
     get_nearest_red_zone,
-    get_nearest_under_served_zone
+    zone_occupancy,
 )
 
 from app.routers import (
@@ -81,6 +92,39 @@ app.include_router(tracking.router, prefix="/tracking", tags=["Tracking"])
 app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
 app.include_router(live.router, prefix="/live", tags=["Live"])
 
+# -------------------------------
+# Lifecycle
+# -------------------------------
+@app.on_event("startup")
+async def on_startup():
+    # keeps "now" out of the default partition; expiry is left to the cron job
+    run_gps_partition_maintenance(engine, retention_days=0)
+
+    async with AsyncSessionLocal() as db:
+        cached = await db.run_sync(last_fix_cache.warm)
+        print(f"📍 Last-fix cache warmed: {cached} riders")
+        zones = await db.run_sync(load_zone_catalogue)
+        print(f"🗺️ Zone catalogue v{zones.version}: {len(zones.zones)} zones")
+
+    await gps_buffer.start()
+    await odometer.start()
+    await distance_rollup.start()
+    await zone_reloader.start()
+    await zone_pressure.start()
+    await admin_broadcaster.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await admin_broadcaster.stop()
+    await zone_pressure.stop()
+    await zone_reloader.stop()
+    await distance_rollup.stop()
+    # flush buffered GPS points before the process exits
+    await gps_buffer.stop()
+    # ...and the distance they added
+    await odometer.stop()
+
 # -------------------------------
 # Tracking Constants
 # -------------------------------
@@ -93,22 +137,39 @@ REDIRECT_ALERT_COOLDOWN = 15 * 60
 DELIVERY_STOP_TIME = 2 * 60
 POST_DELIVERY_COOLDOWN = 20 * 60
 
-# -------------------------------
-# Admin WebSocket Store
-# -------------------------------
-admin_clients = set()
-
 # -------------------------------
 # Rider WebSocket
 # -------------------------------
 @app.websocket("/ws/rider/{rider_id}")
 async def rider_tracking(ws: WebSocket, rider_id: str):
-    await ws.accept()
-    print(f"🚴 Rider connected: {rider_id}")
+    # newer apps may ask for packed binary frames, older ones keep sending JSON
+    binary = FIX_SUBPROTOCOL in ws.scope.get("subprotocols", [])
+    await ws.accept(subprotocol=FIX_SUBPROTOCOL if binary else None)
+    print(f"🚴 Rider connected: {rider_id}" + (" (binary)" if binary else ""))
+
+    decoder = FrameDecoder()
 
     try:
         while True:
-            data = await ws.receive_json()
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            if message.get("bytes") is not None:
+                try:
+                    fixes = decoder.decode(message["bytes"])
+                except FrameError as e:
+                    print(f"⚠️ Bad frame from {rider_id}: {e}")
+                    continue
+
+                for fix in fixes:
+                    await handle_rider_fix(ws, rider_id, fix.lat, fix.lon)
+                continue
+
+            try:
+                data = json.loads(message.get("text") or "")
+            except ValueError:
+                continue
 
             if data.get("type") == "PING":
                 continue
@@ -118,71 +179,65 @@ async def rider_tracking(ws: WebSocket, rider_id: str):
             if lat is None or lon is None:
                 continue
 
-            now = time.time()
-
-            if rider_id not in rider_state:
-                rider_state[rider_id] = {
-                    "lat": lat,
-                    "lon": lon,
-                    "last_move_time": now,
-                    "last_update": now,
-                    "last_alert": {
-                        "STATIONARY": 0,
-                        "REDIRECT": 0,
-                        "POST_DELIVERY": 0
-                    }
-                }
-            else:
-                prev = rider_state[rider_id]
-                moved = distance_meters(prev["lat"], prev["lon"], lat, lon)
-
-                if moved > 20:
-                    prev["last_move_time"] = now
-                    prev["lat"] = lat
-                    prev["lon"] = lon
-
-                prev["last_update"] = now
-
-            for admin_ws in list(admin_clients):
-                try:
-                    await admin_ws.send_json({
-                        "rider_id": rider_id,
-                        "lat": lat,
-                        "lon": lon
-                    })
-                except:
-                    admin_clients.discard(admin_ws)
-
-            last_stationary = rider_state[rider_id]["last_alert"]["STATIONARY"]
-            last_redirect = rider_state[rider_id]["last_alert"]["REDIRECT"]
-            last_post_delivery = rider_state[rider_id]["last_alert"]["POST_DELIVERY"]
-
-            if now - rider_state[rider_id]["last_move_time"] > STATIONARY_LIMIT:
-                if now - last_stationary > STATIONARY_ALERT_COOLDOWN:
-                    await ws.send_json({
-                        "type": "STATIONARY_WARNING",
-                        "message": "You seem idle. Checking nearby high-demand areas."
-                    })
-                    rider_state[rider_id]["last_alert"]["STATIONARY"] = now
-
-                if now - last_redirect > REDIRECT_ALERT_COOLDOWN:
-                    target_zone = get_nearest_under_served_zone(lat, lon, rider_state)
-                    if target_zone:
-                        await ws.send_json({
-                            "type": "REDIRECT_TO_ZONE",
-                            "zone_id": target_zone["id"],
-                            "lat": target_zone["lat"],
-                            "lon": target_zone["lon"],
-                            "title": "High demand nearby",
-                            "message": (
-                                f"{target_zone['id']} has fewer riders. "
-                                "Moving there may increase orders."
-                            )
-                        })
-                        rider_state[rider_id]["last_alert"]["REDIRECT"] = now
+            await handle_rider_fix(ws, rider_id, lat, lon)
 
     except WebSocketDisconnect:
         print(f"⚠️ Rider disconnected: {rider_id}")
+    finally:
+        # off the admin map with the next tick
+        admin_broadcaster.remove(rider_id)
+
+
+async def run_state(func, *args):
+    # a redis store waits on the network: keep that off the event loop
+    if rider_state.blocking:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+
+def track_fix(rider_id, lat, lon, now):
+    # atomic per rider, whichever backend holds the state
+    state = rider_state.update_position(rider_id, lat, lon, now)
+    # zone counters follow the stored position
+    zone_occupancy.track(rider_id, state["lat"], state["lon"])
+    return state
+
+
+async def handle_rider_fix(ws: WebSocket, rider_id: str, lat, lon):
+    now = time.time()
+
+    state = await run_state(track_fix, rider_id, lat, lon, now)
+
+    # admins get it with the next tick
+    admin_broadcaster.publish(rider_id, lat, lon)
+
+    last_stationary = state["last_alert"]["STATIONARY"]
+    last_redirect = state["last_alert"]["REDIRECT"]
+    last_post_delivery = state["last_alert"]["POST_DELIVERY"]
+
+    if now - state["last_move_time"] > STATIONARY_LIMIT:
+        if now - last_stationary > STATIONARY_ALERT_COOLDOWN:
+            await ws.send_json({
+                "type": "STATIONARY_WARNING",
+                "message": "You seem idle. Checking nearby high-demand areas."
+            })
+            await run_state(rider_state.mark_alert, rider_id, "STATIONARY", now)
+
+        if now - last_redirect > REDIRECT_ALERT_COOLDOWN:
+            target_zone = zone_pressure.nearest_under_served(lat, lon)
+            if target_zone:
+                await ws.send_json({
+                    "type": "REDIRECT_TO_ZONE",
+                    "zone_id": target_zone["id"],
+                    "lat": target_zone["lat"],
+                    "lon": target_zone["lon"],
+                    "title": "High demand nearby",
+                    "message": (
+                        f"{target_zone['id']} has fewer riders. "
+                        "Moving there may increase orders."
+                    )
+                })
+                await run_state(rider_state.mark_alert, rider_id, "REDIRECT", now)
 
 # -------------------------------
 # Admin WebSocket
@@ -190,13 +245,22 @@ async def rider_tracking(ws: WebSocket, rider_id: str):
 @app.websocket("/ws/admin")
 async def admin_ws(ws: WebSocket):
     await ws.accept()
-    admin_clients.add(ws)
-    print("🟢 Admin connected. Total:", len(admin_clients))
+    client = admin_broadcaster.register(ws)
+    print("🟢 Admin connected. Total:", len(admin_broadcaster.clients))
 
     try:
         while True:
-            await ws.receive_text()
+            text = await ws.receive_text()
+
+            # {"type": "SUBSCRIBE", "bbox" | "zone_id" | "rider_ids": ...}
+            try:
+                data = json.loads(text)
+                if data.get("type") == "SUBSCRIBE":
+                    admin_broadcaster.subscribe(client, data)
+            except (ValueError, TypeError, AttributeError) as e:
+                # the sender task owns the socket, so replies go through the outbox
+                client.offer({"type": "ERROR", "message": f"Bad subscription: {e}"})
     except WebSocketDisconnect:
         print("🔴 Admin disconnected")
     finally:
-        admin_clients.discard(ws)
+        admin_broadcaster.unregister(client)
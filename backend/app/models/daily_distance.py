@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, Date, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -13,3 +13,45 @@ class DailyDistance(Base):
     rider = relationship("User")
 
     __table_args__ = (UniqueConstraint("rider_id", "date", name="uq_rider_date"), )
+
+
+class HourlyDistance(Base):
+    """
+    Finest distance bucket. A segment counts in the hour (and day, week)
+    of its end point, also when it started the day before.
+    """
+    __tablename__ = "hourly_distance"
+
+    id = Column(Integer, primary_key=True, index=True)
+    rider_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    hour = Column(DateTime, nullable=False)         # start of the hour (UTC)
+    distance_km = Column(Float, default=0)
+
+    __table_args__ = (UniqueConstraint("rider_id", "hour", name="uq_rider_hour"), )
+
+
+class WeeklyDistance(Base):
+    """
+    Sum of a rider's daily_distance rows for one ISO week.
+    """
+    __tablename__ = "weekly_distance"
+
+    id = Column(Integer, primary_key=True, index=True)
+    rider_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    week_start = Column(Date, nullable=False)       # Monday
+    distance_km = Column(Float, default=0)
+
+    __table_args__ = (UniqueConstraint("rider_id", "week_start", name="uq_rider_week"), )
+
+
+class DistanceRollupDay(Base):
+    """
+    Checkpoint of the fleet-wide daily rollup: one row per day that has
+    been rebuilt from raw points into hourly/daily/weekly distance.
+    """
+    __tablename__ = "distance_rollup_days"
+
+    date = Column(Date, primary_key=True)
+    riders = Column(Integer, default=0)
+    distance_km = Column(Float, default=0)
+    completed_at = Column(DateTime, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -12,3 +12,11 @@ class GPSLocation(Base):
     timestamp = Column(DateTime, server_default=func.now())
 
     rider = relationship("User", back_populates="gps_locations")
+
+    # almost every read is "rider X between t1 and t2, ordered by time".
+    # On Postgres the table is range-partitioned on timestamp by the
+    # 0001 migration (see app/services/gps_partitions.py) and this index
+    # exists on every partition.
+    __table_args__ = (
+        Index("ix_gps_locations_rider_id_timestamp", "rider_id", "timestamp"),
+    )
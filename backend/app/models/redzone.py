@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, func
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, JSON, func
 from app.db.session import Base
 
 class RedZone(Base):
@@ -8,6 +8,8 @@ class RedZone(Base):
     name = Column(String, nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
-    radius_meters = Column(Integer, nullable=False)
+    radius_meters = Column(Integer, nullable=True)      # circle zones
+    polygon = Column(JSON, nullable=True)               # polygon zones: [[lat, lon], ...]
+    weight = Column(Integer, nullable=False, default=1, server_default="1")   # demand priority 1-5
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, server_default=func.now())
@@ -1,11 +1,22 @@
+import asyncio
+import threading
+from collections import namedtuple
+from datetime import datetime
 from math import radians, cos, sin, asin, sqrt
 
+from app.core.config import ZONE_GRID_CELL_DEG, ZONE_RELOAD_SECONDS
+from app.tracking_state import rider_state as live_riders
+from app.utils.geo import PreparedPolygon
+from app.utils.spatial_grid import ZoneGrid
+from app.utils.tasks import cancel_and_wait
+
 # -------------------------------
-# Red Zone Model (In-Memory)
+# Default zones (seed for an empty red_zones table)
 # -------------------------------
 RED_ZONES = [
     {
         "id": "zone_1",
+        "name": "Berlin Center",
         "lat": 52.5200,   # Berlin Center
         "lon": 13.4050,
         "radius": 500,
@@ -13,6 +24,7 @@ RED_ZONES = [
     },
     {
         "id": "zone_2",
+        "name": "Kreuzberg",
         "lat": 52.4909,   # Kreuzberg
         "lon": 13.3929,
         "radius": 500,
@@ -20,6 +32,7 @@ RED_ZONES = [
     },
     {
         "id": "zone_3",
+        "name": "Mitte",
         "lat": 52.5076,   # Mitte
         "lon": 13.3904,
         "radius": 500,
@@ -37,11 +50,152 @@ def distance_meters(lat1, lon1, lat2, lon2):
     a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
     return 2 * R * asin(sqrt(a))
 
+# -------------------------------
+# Zone catalogue
+# -------------------------------
+ZoneCatalogue = namedtuple("ZoneCatalogue", "version zones grid loaded_at")
+
+_publish_lock = threading.Lock()
+
+
+def _build(version, zones):
+    zones = tuple(zones)
+    return ZoneCatalogue(
+        version,
+        zones,
+        ZoneGrid(zones, distance_meters, ZONE_GRID_CELL_DEG),
+        datetime.utcnow(),
+    )
+
+
+# version 0: the defaults, until the table has been read
+_catalogue = _build(0, RED_ZONES)
+
+
+def zone_catalogue():
+    """
+    Current catalogue. Never modified in place: a reload builds a new
+    one and swaps it in, so read it once and use that copy throughout.
+    """
+    return _catalogue
+
+
+def zone_index():
+    return _catalogue.grid
+
+
+def set_red_zones(zones):
+    """
+    Publishes `zones` as a new catalogue version, unless nothing changed.
+    """
+    global _catalogue
+    zones = tuple(zones)
+    with _publish_lock:
+        if zones != _catalogue.zones:
+            _catalogue = _build(_catalogue.version + 1, zones)
+        return _catalogue
+
+
+def zone_from_row(row):
+    zone = {
+        "id": f"zone_{row.id}",
+        "db_id": row.id,
+        "name": row.name,
+        "lat": row.latitude,
+        "lon": row.longitude,
+        "radius": row.radius_meters,
+        "weight": row.weight,
+    }
+    if row.polygon:
+        # (lat, lon) stays the zone's anchor for nearest-zone lookups;
+        # radius becomes the circle around it that holds the polygon
+        zone["polygon"] = [list(vertex) for vertex in row.polygon]
+        zone["radius"] = round(PreparedPolygon(row.polygon).bounding_radius(row.latitude, row.longitude))
+    return zone
+
+
+def seed_zones(db):
+    """
+    Inserts the default zones if the red_zones table is empty.
+    """
+    from app.models.redzone import RedZone
+
+    if db.query(RedZone.id).first() is not None:
+        return 0
+    for zone in RED_ZONES:
+        db.add(RedZone(
+            name=zone["name"],
+            latitude=zone["lat"],
+            longitude=zone["lon"],
+            radius_meters=zone["radius"],
+            weight=zone["weight"],
+        ))
+    db.commit()
+    return len(RED_ZONES)
+
+
+def reload_zones(db):
+    """
+    Reads the active zones from red_zones and publishes them.
+    Call after every zone write (takes a sync Session; use run_sync).
+    """
+    from app.models.redzone import RedZone
+
+    rows = db.query(RedZone).filter(RedZone.is_active == True).order_by(RedZone.id).all()
+    return set_red_zones(zone_from_row(row) for row in rows)
+
+
+def load_zone_catalogue(db):
+    seed_zones(db)
+    return reload_zones(db)
+
+
+class ZoneReloader:
+    """
+    Re-reads red_zones every ZONE_RELOAD_SECONDS, so zone edits made
+    through another worker reach this one. The version only moves when
+    the zones actually changed.
+    """
+
+    def __init__(self, interval=ZONE_RELOAD_SECONDS):
+        self.interval = interval
+        self._task = None
+
+    async def start(self):
+        if self.interval > 0 and not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        await cancel_and_wait(task)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(_reload_now)
+            except Exception as e:
+                print(f"⚠️ Zone reload failed: {e}")
+
+
+def _reload_now():
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return reload_zones(db)
+    finally:
+        db.close()
+
+
+zone_reloader = ZoneReloader()
+
+
 # -------------------------------
 # Public API (Backward Compatible)
 # -------------------------------
 def get_all_red_zones():
-    return RED_ZONES
+    return zone_catalogue().zones
 
 
 def get_current_red_zone(lat=None, lon=None):
@@ -52,54 +206,45 @@ def get_current_red_zone(lat=None, lon=None):
     Else → return highest-weight zone (default behavior)
     """
     if lat is not None and lon is not None:
-        for zone in RED_ZONES:
-            if distance_meters(lat, lon, zone["lat"], zone["lon"]) <= zone["radius"]:
-                return zone
-        return None
+        return zone_index().containing(lat, lon)
 
     # Default: highest priority zone
-    return max(RED_ZONES, key=lambda z: z["weight"])
+    return max(zone_catalogue().zones, key=lambda z: z["weight"], default=None)
 
 
 def get_nearest_red_zone(lat, lon):
-    nearest = None
-    min_dist = float("inf")
+    return zone_index().nearest(lat, lon)
 
-    for zone in RED_ZONES:
-        dist = distance_meters(lat, lon, zone["lat"], zone["lon"])
-        if dist < min_dist:
-            min_dist = dist
-            nearest = zone
 
-    return nearest
+def get_zone_for_rider(lat, lon):
+    return zone_index().containing(lat, lon)
 
 
-def get_zone_for_rider(lat, lon):
-    for zone in RED_ZONES:
-        if distance_meters(lat, lon, zone["lat"], zone["lon"]) <= zone["radius"]:
-            return zone
-    return None
+def compute_zone_loads(rider_state, catalogue=None):
+    """
+    Loads from scratch for a {rider_id: {"lat", "lon"}} snapshot.
+    The live loads are kept by `zone_occupancy` instead.
+    """
+    catalogue = catalogue or zone_catalogue()
+    zone_counts = {}
+    for rider in rider_state.values():
+        zone = catalogue.grid.containing(rider["lat"], rider["lon"])
+        if zone:
+            zone_counts[zone["id"]] = zone_counts.get(zone["id"], 0) + 1
 
+    return _loads(catalogue.zones, zone_counts, len(rider_state))
 
-def compute_zone_loads(rider_state):
-    zones = get_all_red_zones()
-    total_riders = len(rider_state)
 
+def _loads(zones, zone_counts, total_riders):
     if total_riders == 0:
         return {}
 
     total_weight = sum(z["weight"] for z in zones)
-    zone_counts = {z["id"]: 0 for z in zones}
-
-    for rider in rider_state.values():
-        zone = get_zone_for_rider(rider["lat"], rider["lon"])
-        if zone:
-            zone_counts[zone["id"]] += 1
 
     result = {}
     for z in zones:
         target = (z["weight"] / total_weight) * total_riders
-        current = zone_counts[z["id"]]
+        current = zone_counts.get(z["id"], 0)
 
         result[z["id"]] = {
             "current": current,
@@ -109,35 +254,87 @@ def compute_zone_loads(rider_state):
 
     return result
 
-def get_nearest_under_served_zone(lat, lon, rider_state):
+def get_nearest_under_served_zone(lat, lon, rider_state=None):
     """
     Returns nearest red zone where pressure < 1.0
+    (live loads unless a positions snapshot is passed)
     """
-    zone_loads = compute_zone_loads(rider_state)
+    catalogue = zone_catalogue()
+    if rider_state is None:
+        zone_loads = zone_occupancy.loads(catalogue)
+    else:
+        zone_loads = compute_zone_loads(rider_state, catalogue)
 
-    candidates = []
-    for zone in RED_ZONES:
+    def under_served(zone):
         load = zone_loads.get(zone["id"])
-        if not load:
-            continue
+        return bool(load) and load["pressure"] < 1.0
 
-        # Under-served zone
-        if load["pressure"] < 1.0:
-            dist = distance_meters(lat, lon, zone["lat"], zone["lon"])
-            candidates.append((dist, zone))
+    # Return nearest under-served zone
+    return catalogue.grid.nearest(lat, lon, accept=under_served)
 
-    if not candidates:
-        return None
 
-    # Return nearest under-served zone
-    candidates.sort(key=lambda x: x[0])
-    return candidates[0][1]
+# -------------------------------
+# Live occupancy
+# -------------------------------
+class ZoneOccupancy:
+    """
+    Riders per zone, kept as riders move: `track` classifies one rider
+    with the zone grid and the store moves them between its zone
+    counters (RiderStateStore.set_zone), so `loads` costs O(zones).
 
+    When a new catalogue version is published every live rider is
+    classified again, once, before the next read or update.
+    """
 
-def update_zone_weight(zone_id: str, weight: int):
-    for zone in RED_ZONES:
-        if zone["id"] == zone_id:
-            zone["weight"] = max(1, min(weight, 5))  # clamp 1–5
-            return zone
-    return None
+    def __init__(self, store):
+        self.store = store
+        self.version = None
+        self._lock = threading.Lock()
+
+    def track(self, rider_id, lat, lon, catalogue=None):
+        catalogue = self._sync(catalogue)
+        zone = catalogue.grid.containing(lat, lon)
+        self.store.set_zone(rider_id, zone["id"] if zone else None)
+        return zone
+
+    def counts(self, catalogue=None):
+        self._sync(catalogue)
+        return self.store.zone_counts()
+
+    def loads(self, catalogue=None):
+        catalogue = self._sync(catalogue)
+        return _loads(catalogue.zones, self.store.zone_counts(), len(self.store))
+
+    def _sync(self, catalogue):
+        catalogue = catalogue or zone_catalogue()
+        if self.version != catalogue.version:
+            with self._lock:
+                if self.version != catalogue.version:
+                    for rider_id, pos in self.store.positions().items():
+                        zone = catalogue.grid.containing(pos["lat"], pos["lon"])
+                        self.store.set_zone(rider_id, zone["id"] if zone else None)
+                    self.version = catalogue.version
+        return catalogue
+
+
+zone_occupancy = ZoneOccupancy(live_riders)
+
+
+def update_zone_weight(db, zone_id: str, weight: int):
+    """
+    Stores a zone's weight and republishes the catalogue.
+    `zone_id` is the catalogue id ("zone_<db id>").
+    """
+    from app.models.redzone import RedZone
+
+    try:
+        row = db.get(RedZone, int(zone_id.removeprefix("zone_")))
+    except ValueError:
+        return None
+    if row is None:
+        return None
 
+    row.weight = max(1, min(weight, 5))  # clamp 1–5
+    db.commit()
+    reload_zones(db)
+    return zone_from_row(row)
@@ -1,33 +1,488 @@
+"""
+Fleet load generator / ingest benchmark.
+
+Simulates many riders against a local server and reports ingest latency,
+admin fan-out lag, alert counts and throughput.
+
+    # old behaviour: one rider on /ws/rider, one fix every 5s, forever
+    python -m app.rider_simulator
+
+    # 2000 riders for 2 minutes, 1 fix/s, binary frames, with an admin observer
+    python -m app.rider_simulator --riders 2000 --interval 1 --duration 120 --binary
+
+    # REST ingest (creates sim riders in DATABASE_URL, needs the 30s rule in mind)
+    python -m app.rider_simulator --transport http --riders 500 --interval 30 --seed-db
+
+Transports: ws-rider (/ws/rider/{id}), ws-live (/live/ws/location/{id}),
+http (/tracking/update, or /tracking/update/batch with --batch N).
+"""
+
+import argparse
 import asyncio
-import websockets
 import json
+import math
 import random
+import time
+from collections import OrderedDict
+
+import websockets
 
-RIDER_ID = "rider_101"
-WS_URL = f"ws://127.0.0.1:8000/ws/rider/{RIDER_ID}"
+from app.red_zone_service import RED_ZONES
+from app.utils.fix_frames import SUBPROTOCOL as FIX_SUBPROTOCOL, FrameEncoder
 
 # Starting near red zone
-lat = 52.5200
-lon = 13.4050
+START_LAT = 52.5200
+START_LON = 13.4050
+
+METERS_PER_DEG = 111320
+
+# a fix the admin feed has not shown after this long never will
+# (dead band, cluster views, or coalesced into a later tick)
+OBSERVE_TIMEOUT = 30
+
+
+# -------------------------------
+# Movement models
+# -------------------------------
+class IdleModel:
+    """Parked rider: GPS jitter of a few meters."""
+
+    def __init__(self, rng, lat, lon):
+        self.rng, self.lat, self.lon = rng, lat, lon
+
+    def step(self, dt):
+        jitter = 5 / METERS_PER_DEG
+        return (
+            self.lat + self.rng.uniform(-jitter, jitter),
+            self.lon + self.rng.uniform(-jitter, jitter),
+        )
+
+
+class MovingModel:
+    """Random walk with a slowly turning heading at cycling speed."""
+
+    def __init__(self, rng, lat, lon, speed_kmh=15):
+        self.rng, self.lat, self.lon = rng, lat, lon
+        self.speed = speed_kmh / 3.6
+        self.heading = rng.uniform(0, 2 * math.pi)
+
+    def step(self, dt):
+        self.heading += self.rng.gauss(0, 0.3)
+        meters = self.speed * dt
+        self.lat += meters * math.cos(self.heading) / METERS_PER_DEG
+        self.lon += meters * math.sin(self.heading) / (METERS_PER_DEG * math.cos(math.radians(self.lat)))
+        return self.lat, self.lon
+
+
+class ClusteredModel(MovingModel):
+    """Slow movement that stays inside one red zone."""
+
+    def __init__(self, rng, lat, lon):
+        zone = rng.choice(RED_ZONES)
+        self.zone = zone
+        super().__init__(rng, zone["lat"], zone["lon"], speed_kmh=4)
+
+    def step(self, dt):
+        lat, lon = super().step(dt)
+        radius_deg = self.zone["radius"] / METERS_PER_DEG
+        if math.hypot(lat - self.zone["lat"], lon - self.zone["lon"]) > radius_deg * 0.8:
+            self.heading += math.pi  # turn back into the zone
+        return lat, lon
+
+
+MODELS = {"idle": IdleModel, "moving": MovingModel, "clustered": ClusteredModel}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in MODELS:
+            raise argparse.ArgumentTypeError(f"unknown movement model {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# -------------------------------
+# Metrics
+# -------------------------------
+class Metrics:
+
+    def __init__(self, observe_timeout=OBSERVE_TIMEOUT):
+        self.started = time.time()
+        self.sent = 0
+        self.accepted = 0
+        self.unobserved = 0         # ws-rider: sent, never seen by the admin observer
+        self.rejected = 0
+        self.errors = 0
+        self.ingest_latency = []    # send -> server ack (http) / admin visibility (ws-rider)
+        self.fanout_lag = []        # server tick -> admin receive
+        self.alerts = {}
+        self.admin_messages = 0
+        self.pending = OrderedDict()  # (rider_id, lat, lon) -> send time, oldest first
+        self.observe_timeout = observe_timeout
+
+    def alert(self, kind):
+        self.alerts[kind] = self.alerts.get(kind, 0) + 1
+
+    # -------------------------------
+    # ws-rider fixes waiting for the admin feed
+    # -------------------------------
+    def track(self, key, now):
+        if key in self.pending:
+            # the earlier send can no longer be told apart
+            self.unobserved += 1
+            del self.pending[key]
+        self.pending[key] = now
+        self.expire(now)
+
+    def observe(self, key, now):
+        sent_at = self.pending.pop(key, None)
+        if sent_at is not None:
+            self.ingest_latency.append(now - sent_at)
+            self.accepted += 1
+
+    def expire(self, now=None):
+        """
+        Counts fixes older than observe_timeout as unobserved and forgets
+        them (now=None: everything still pending).
+        """
+        while self.pending:
+            key, sent_at = next(iter(self.pending.items()))
+            if now is not None and now - sent_at < self.observe_timeout:
+                break
+            del self.pending[key]
+            self.unobserved += 1
+
+    @staticmethod
+    def percentiles(values):
+        if not values:
+            return None
+        values = sorted(values)
+
+        def pick(p):
+            return round(values[min(len(values) - 1, int(p * len(values)))] * 1000, 2)
+
+        return {"p50_ms": pick(0.50), "p90_ms": pick(0.90), "p99_ms": pick(0.99),
+                "max_ms": round(values[-1] * 1000, 2), "samples": len(values)}
+
+    def report(self, args, server_stats=None):
+        elapsed = time.time() - self.started
+        return {
+            "transport": args.transport,
+            "binary": args.binary,
+            "riders": args.riders,
+            "interval_s": args.interval,
+            "duration_s": round(elapsed, 1),
+            "sent": self.sent,
+            "accepted": self.accepted,
+            "unobserved": self.unobserved,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "client_send_rate": round(self.sent / elapsed, 1) if elapsed else 0,
+            "server_accept_rate": round(self.accepted / elapsed, 1) if elapsed else 0,
+            "ingest_latency": self.percentiles(self.ingest_latency),
+            "admin_fanout_lag": self.percentiles(self.fanout_lag),
+            "admin_messages": self.admin_messages,
+            "alerts": self.alerts,
+            "server": server_stats,
+        }
+
+
+def _key(rider_id, lat, lon):
+    return (str(rider_id), round(lat, 6), round(lon, 6))
+
+
+# -------------------------------
+# Riders
+# -------------------------------
+async def ws_rider(args, rider_id, model, metrics, stop):
+    url = f"{args.ws_base}/ws/rider/{rider_id}"
+    protocols = [FIX_SUBPROTOCOL] if args.binary else None
+    encoder = FrameEncoder()
+
+    async with websockets.connect(url, subprotocols=protocols) as ws:
+
+        async def listen():
+            async for message in ws:
+                data = json.loads(message)
+                metrics.alert(data.get("type", "UNKNOWN"))
+
+        listener = asyncio.create_task(listen())
+        try:
+            while not stop.is_set():
+                lat, lon = model.step(args.interval)
+                if args.admin:
+                    metrics.track(_key(rider_id, lat, lon), time.time())
+
+                if args.binary:
+                    for frame in encoder.encode([(lat, lon, time.time() * 1000)]):
+                        await ws.send(frame)
+                else:
+                    await ws.send(json.dumps({"lat": lat, "lon": lon}))
+                metrics.sent += 1
+
+                await _sleep(args.interval, stop)
+        finally:
+            listener.cancel()
+
+
+async def ws_live(args, rider_id, model, metrics, stop):
+    url = f"{args.ws_base}/live/ws/location/{rider_id}"
+
+    async with websockets.connect(url) as ws:
+        while not stop.is_set():
+            lat, lon = model.step(args.interval)
+            await ws.send(json.dumps({"latitude": lat, "longitude": lon}))
+            metrics.sent += 1
+            await _sleep(args.interval, stop)
+
+
+async def http_rider(args, rider_id, model, metrics, stop, client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    fixes = []
+
+    while not stop.is_set():
+        lat, lon = model.step(args.interval)
+
+        if args.batch <= 1:
+            started = time.time()
+            res = await client.post(
+                "/tracking/update",
+                json={"latitude": lat, "longitude": lon},
+                headers=headers,
+            )
+            metrics.sent += 1
+            metrics.ingest_latency.append(time.time() - started)
+            if res.status_code == 200:
+                metrics.accepted += 1
+            elif res.status_code == 400:
+                metrics.rejected += 1
+            else:
+                metrics.errors += 1
+        else:
+            fixes.append({"latitude": lat, "longitude": lon, "timestamp": _utc_iso()})
+            if len(fixes) >= args.batch:
+                started = time.time()
+                res = await client.post("/tracking/update/batch", json={"fixes": fixes}, headers=headers)
+                metrics.sent += len(fixes)
+                metrics.ingest_latency.append(time.time() - started)
+                if res.status_code == 200:
+                    body = res.json()
+                    metrics.accepted += len(body["accepted"])
+                    metrics.rejected += len(body["rejected"])
+                else:
+                    metrics.errors += len(fixes)
+                fixes = []
+
+        await _sleep(args.interval, stop)
+
+
+# -------------------------------
+# Admin observer
+# -------------------------------
+async def admin_observer(args, metrics, stop):
+    async with websockets.connect(f"{args.ws_base}/ws/admin") as ws:
+        while not stop.is_set():
+            metrics.expire(time.time())
+            try:
+                message = await asyncio.wait_for(ws.recv(), timeout=1)
+            except asyncio.TimeoutError:
+                continue
+
+            now = time.time()
+            data = json.loads(message)
+            metrics.admin_messages += 1
+
+            if "server_time" in data:
+                metrics.fanout_lag.append(now - data["server_time"])
+
+            riders = data.get("riders") if data.get("type") == "POSITIONS" else [data]
+            for r in riders or []:
+                if r.get("lat") is None:
+                    continue
+                metrics.observe(_key(r["rider_id"], r["lat"], r["lon"]), now)
+
+
+# -------------------------------
+# Setup helpers
+# -------------------------------
+def _utc_iso():
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+
+
+async def _sleep(seconds, stop):
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+def seed_db_riders(count):
+    """
+    Creates (or reuses) sim_rider_N users and a sim_admin directly in
+    DATABASE_URL and returns ({index: (user_id, token)}, admin_token).
+    """
+    from app.core.security import create_access_token, hash_password
+    from app.db.session import SessionLocal
+    from app.models.user import User
+
+    db = SessionLocal()
+    try:
+        password = hash_password("simulator")
+        wanted = [f"sim_rider_{i}" for i in range(count)] + ["sim_admin"]
+        existing = {u.login_id: u for u in db.query(User).filter(User.login_id.in_(wanted)).all()}
+
+        for login_id in wanted:
+            if login_id not in existing:
+                user = User(
+                    login_id=login_id,
+                    email=f"{login_id}@sim.local",
+                    hashed_password=password,
+                    role="admin" if login_id == "sim_admin" else "rider",
+                )
+                db.add(user)
+                existing[login_id] = user
+        db.commit()
+
+        riders = {
+            i: (existing[f"sim_rider_{i}"].id,
+                create_access_token({"sub": f"sim_rider_{i}", "role": "rider"}))
+            for i in range(count)
+        }
+        admin_token = create_access_token({"sub": "sim_admin", "role": "admin"})
+        return riders, admin_token
+    finally:
+        db.close()
+
+
+async def fetch_server_stats(args, admin_token):
+    if not admin_token:
+        return None
+    import httpx
+
+    async with httpx.AsyncClient(base_url=args.http_base) as client:
+        res = await client.get("/live/admin/buffer", headers={"Authorization": f"Bearer {admin_token}"})
+        return res.json() if res.status_code == 200 else None
+
+
+# -------------------------------
+# Main
+# -------------------------------
+async def run(args):
+    rng = random.Random(args.seed)
+    metrics = Metrics(args.observe_timeout)
+    stop = asyncio.Event()
+
+    names = list(args.mix)
+    weights = [args.mix[n] for n in names]
+
+    riders = None
+    admin_token = None
+    if args.seed_db or args.transport in ("http", "ws-live"):
+        riders, admin_token = seed_db_riders(args.riders)
+
+    buffer_before = await fetch_server_stats(args, admin_token) if args.transport == "ws-live" else None
+
+    client = None
+    if args.transport == "http":
+        import httpx
+        client = httpx.AsyncClient(base_url=args.http_base, timeout=30)
+
+    # only ws-rider fixes are matched against the admin feed
+    args.admin = args.admin and args.transport == "ws-rider"
+
+    tasks = []
+    if args.admin:
+        tasks.append(asyncio.create_task(admin_observer(args, metrics, stop)))
+
+    for i in range(args.riders):
+        model = MODELS[rng.choices(names, weights)[0]](random.Random(rng.random()), START_LAT, START_LON)
+
+        if args.transport == "ws-rider":
+            coro = ws_rider(args, f"{args.prefix}{i}", model, metrics, stop)
+        elif args.transport == "ws-live":
+            coro = ws_live(args, riders[i][0], model, metrics, stop)
+        else:
+            coro = http_rider(args, riders[i][0], model, metrics, stop, client, riders[i][1])
+
+        tasks.append(asyncio.create_task(_guard(coro, metrics)))
+        if args.ramp:
+            await asyncio.sleep(args.ramp / args.riders)
+
+    print(f"🚴 {args.riders} riders running on {args.transport}")
+
+    try:
+        if args.duration:
+            await asyncio.sleep(args.duration)
+        else:
+            await asyncio.Event().wait()
+    finally:
+        stop.set()
+        await asyncio.sleep(max(1.0, args.interval / 10))  # let the last ticks arrive
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if client:
+            await client.aclose()
+        metrics.expire()
+
+    server_stats = None
+    if args.transport == "ws-live":
+        buffer_after = await fetch_server_stats(args, admin_token)
+        if buffer_before and buffer_after:
+            flushed = buffer_after["flushed_rows"] - buffer_before["flushed_rows"]
+            metrics.accepted = flushed
+            server_stats = {"buffer": buffer_after, "flushed_rows": flushed}
+
+    return metrics.report(args, server_stats)
+
+
+async def _guard(coro, metrics):
+    try:
+        await coro
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        metrics.errors += 1
+        print(f"⚠️ rider task failed: {e}")
 
 
-async def simulate_rider():
-    async with websockets.connect(WS_URL) as ws:
-        print("🚴 Rider connected")
+def main():
+    parser = argparse.ArgumentParser(description="Fleet load generator / ingest benchmark")
+    parser.add_argument("--riders", type=int, default=1)
+    parser.add_argument("--interval", type=float, default=5, help="seconds between fixes per rider")
+    parser.add_argument("--duration", type=float, default=0, help="seconds to run, 0 = forever")
+    parser.add_argument("--ramp", type=float, default=0, help="seconds over which riders connect")
+    parser.add_argument("--transport", choices=["ws-rider", "ws-live", "http"], default="ws-rider")
+    parser.add_argument("--binary", action="store_true", help="fleet.fix.v1 frames on ws-rider")
+    parser.add_argument("--batch", type=int, default=1, help="http: fixes per /tracking/update/batch call")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("moving"),
+                        help="movement models, e.g. idle=0.2,moving=0.6,clustered=0.2")
+    parser.add_argument("--no-admin", dest="admin", action="store_false", help="skip the admin observer")
+    parser.add_argument("--observe-timeout", type=float, default=OBSERVE_TIMEOUT,
+                        help="seconds before a fix the admin never saw counts as unobserved")
+    parser.add_argument("--seed", type=int, default=101)
+    parser.add_argument("--seed-db", action="store_true", help="create sim users in DATABASE_URL")
+    parser.add_argument("--prefix", default="rider_", help="ws-rider id prefix")
+    parser.add_argument("--host", default="127.0.0.1:8000")
+    parser.add_argument("--out", help="write the JSON report here")
+    args = parser.parse_args()
 
-        while True:
-            # Simulate small movement
-            lat_delta = random.uniform(-0.0003, 0.0003)
-            lon_delta = random.uniform(-0.0003, 0.0003)
+    args.ws_base = f"ws://{args.host}"
+    args.http_base = f"http://{args.host}"
 
-            data = {
-                "lat": lat + lat_delta,
-                "lon": lon + lon_delta
-            }
+    try:
+        report = asyncio.run(run(args))
+    except KeyboardInterrupt:
+        return
 
-            await ws.send(json.dumps(data))
-            print("📍 Sent:", data)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
 
-            await asyncio.sleep(5)
 
-asyncio.run(simulate_rider())
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,10 @@ from datetime import datetime, timedelta
 from app.db.session import get_db
 from app.core.deps import get_current_admin
 from app.models.user import User
-from app.models.gps import GPSLocation
 from app.models.payroll import Payroll
 from app.models.bonus import Bonus
 from app.models.shift import ShiftBooking
-from app.routers.tracking import compute
+from app.services.distance_range import distance_between
 
 router = APIRouter()
 
@@ -103,35 +102,46 @@ def dashboard_summary(
     total_riders = db.query(User).filter(User.role=="rider").count()
     active_riders = db.query(User).filter(User.role=="rider", User.is_active==True).count()
 
-    # distance day
-    day_points = db.query(GPSLocation).filter(GPSLocation.timestamp >= start_day).all()
-    week_points = db.query(GPSLocation).filter(GPSLocation.timestamp >= start_week).all()
+    # distance per rider from the hour/day/week rollups
+    # (app/services/distance_range.py): a few grouped queries and
+    # sub-hour edges, however many points the fleet sent
+    day_km = distance_between(db, start_day, now, now=now)
+    week_km = distance_between(db, start_week, now, now=now)
 
-    # compute totals across all riders
-    def total_distance(points):
-        return compute(points)
+    total_km_day = round(sum(day_km.values()), 3)
+    total_km_week = round(sum(week_km.values()), 3)
 
-    total_km_day = total_distance(day_points)
-    total_km_week = total_distance(week_points)
-
-    # payroll summary
-    payroll_day = db.query(Payroll).filter(Payroll.generated_at >= start_day).all()
-    payroll_week = db.query(Payroll).filter(Payroll.generated_at >= start_week).all()
+    # payroll summary (Payroll has created_at; generated_at is on Earnings)
+    total_pay_day = (
+        db.query(func.sum(Payroll.amount))
+        .filter(Payroll.created_at >= start_day)
+        .scalar()
+    ) or 0
+    total_pay_week = (
+        db.query(func.sum(Payroll.amount))
+        .filter(Payroll.created_at >= start_week)
+        .scalar()
+    ) or 0
 
-    total_pay_day = sum(p.amount for p in payroll_day)
-    total_pay_week = sum(p.amount for p in payroll_week)
+    # ✅ existing: generate weekly bonus
+    for rider_id in week_km:
+        generate_weekly_bonus(
+            db=db,
+            rider_id=rider_id,
+            week_start=start_week.date(),
+            week_end=now.date(),
+        )
 
-    # Top 5 by distance this week
-    # We reuse distance logic by grouping
-    weekly_report = {}
-    for p in week_points:
-        weekly_report.setdefault(p.rider_id, []).append(p)
+    # Top 5 by distance this week (same per-rider totals)
+    top = sorted(week_km.items(), key=lambda x: (-x[1], x[0]))[:5]
+    logins = dict(
+        db.query(User.id, User.login_id)
+        .filter(User.id.in_([rider_id for rider_id, _ in top]))
+        .all()
+    )
 
     leaderboard = []
-    for rider_id, pts in weekly_report.items():
-        km = compute(pts)
-        rider = db.query(User).filter(User.id==rider_id).first()
-
+    for rider_id, km in top:
         # ✅ NEW: calculate weekly tier
         tier = calculate_weekly_tier(
             db=db,
@@ -142,22 +152,11 @@ def dashboard_summary(
 
         leaderboard.append({
             "rider_id": rider_id,
-            "login_id": rider.login_id,
-            "km": km,
+            "login_id": logins.get(rider_id),
+            "km": round(km, 3),
             "tier": tier
         })
 
-        # ✅ existing: generate weekly bonus
-        generate_weekly_bonus(
-            db=db,
-            rider_id=rider_id,
-            week_start=start_week.date(),
-            week_end=now.date(),
-        )
-
-    leaderboard.sort(key=lambda x: x["km"], reverse=True)
-    leaderboard = leaderboard[:5]
-
     return {
         "total_riders": total_riders,
         "active_riders": active_riders,
@@ -178,6 +177,7 @@ def rider_analytics(
     start_week = now - timedelta(days=7)
 
     riders = db.query(User).filter(User.role == "rider").all()
+    week_km = distance_between(db, start_week, now, now=now)
 
     analytics = []
 
@@ -196,21 +196,12 @@ def rider_analytics(
             db.query(func.sum(Payroll.amount))
             .filter(
                 Payroll.rider_id == rider.id,
-                Payroll.generated_at >= start_week,
+                Payroll.created_at >= start_week,
             )
             .scalar()
         ) or 0
 
-        gps_points = (
-            db.query(GPSLocation)
-            .filter(
-                GPSLocation.rider_id == rider.id,
-                GPSLocation.timestamp >= start_week,
-            )
-            .all()
-        )
-
-        total_km = compute(gps_points)
+        total_km = week_km.get(rider.id, 0.0)
 
         km_per_hour = round(total_km / total_hours, 2) if total_hours > 0 else 0
 
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, status
 from app.core.deps import get_current_admin
-from app.models.gps import GPSLocation
-from app.db.session import SessionLocal
+from app.db.session import AsyncSessionLocal
+from app.models.user import User
+from app.services.gps_buffer import gps_buffer
+from app.services.dead_band import dead_band
+from app.services.last_fix_cache import last_fix_cache
 from datetime import datetime
 
 router = APIRouter()
@@ -12,31 +15,32 @@ active_riders = {}  # rider_id -> {"lat": .., "lng": .., "time": ..}
 
 @router.websocket("/ws/location/{rider_id}")
 async def rider_location_ws(websocket: WebSocket, rider_id: int):
+    # unknown ids would fail the gps_locations foreign key at flush time
+    async with AsyncSessionLocal() as db:
+        rider = await db.get(User, rider_id)
+    if rider is None or rider.role != "rider":
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
     await websocket.accept()
     try:
         while True:
             data = await websocket.receive_json()
             lat = data["latitude"]
             lng = data["longitude"]
+            now = datetime.utcnow()
 
             # Update in-memory
             active_riders[rider_id] = {
                 "latitude": lat,
                 "longitude": lng,
-                "time": datetime.utcnow()
+                "time": now
             }
 
-            # Save to DB
-            db = SessionLocal()
-            point = GPSLocation(
-                rider_id=rider_id,
-                latitude=lat,
-                longitude=lng,
-                timestamp=datetime.utcnow()
-            )
-            db.add(point)
-            db.commit()
-            db.close()
+            # Save to DB (write-behind, waits only when the buffer is full),
+            # unless the dead-band merges it into the last stored fix
+            if dead_band.accept(rider_id, lat, lng, now, last_fix_cache.get(rider_id)):
+                await gps_buffer.put(rider_id, lat, lng, now)
 
     except WebSocketDisconnect:
         active_riders.pop(rider_id, None)
@@ -44,5 +48,15 @@ async def rider_location_ws(websocket: WebSocket, rider_id: int):
 
 # ✅ C3: Admin fetches all live rider locations
 @router.get("/admin/live")
-def admin_live_locations(admin=Depends(get_current_admin)):
+async def admin_live_locations(admin=Depends(get_current_admin)):
     return active_riders
+
+
+@router.get("/admin/buffer")
+async def admin_buffer_stats(admin=Depends(get_current_admin)):
+    return gps_buffer.stats()
+
+
+@router.get("/admin/dead-band")
+async def admin_dead_band_stats(admin=Depends(get_current_admin)):
+    return dead_band.stats()
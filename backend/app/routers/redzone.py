@@ -1,120 +1,122 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.core.deps import get_current_admin
 from app.models.redzone import RedZone
-from app.schemas.redzone import RedZoneCreate, RedZoneRead
+from app.schemas.redzone import RedZoneCreate, RedZoneRead, RedZoneUpdate
 
-from app.tracking_state import rider_state
 from app.red_zone_service import (
-    compute_zone_loads,
-    get_all_red_zones,
-    update_zone_weight
+    reload_zones,
+    update_zone_weight,
+    zone_catalogue,
 )
+from app.services.zone_pressure import zone_pressure
 
 router = APIRouter()
 
 # -------------------------------
-# DB RED ZONE CRUD (UNCHANGED)
+# DB RED ZONE CRUD
+# (every write republishes the in-memory zone catalogue)
 # -------------------------------
 @router.post("/", response_model=RedZoneRead, status_code=201)
-def create_red_zone(
+async def create_red_zone(
     data: RedZoneCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin=Depends(get_current_admin)
 ):
     zone = RedZone(**data.model_dump())
     db.add(zone)
-    db.commit()
-    db.refresh(zone)
+    await db.commit()
+    await db.refresh(zone)
+    await db.run_sync(reload_zones)
     return zone
 
 
 @router.get("/", response_model=List[RedZoneRead])
-def list_red_zones(
-    db: Session = Depends(get_db),
+async def list_red_zones(
+    db: AsyncSession = Depends(get_async_db),
     admin=Depends(get_current_admin)
 ):
-    return db.query(RedZone).all()
+    result = await db.execute(select(RedZone))
+    return result.scalars().all()
 
 
 @router.put("/{zone_id}", response_model=RedZoneRead)
-def update_red_zone(
+async def update_red_zone(
     zone_id: int,
-    data: RedZoneCreate,
-    db: Session = Depends(get_db),
+    data: RedZoneUpdate,
+    db: AsyncSession = Depends(get_async_db),
     admin=Depends(get_current_admin)
 ):
-    zone = db.query(RedZone).filter(RedZone.id == zone_id).first()
+    zone = await db.get(RedZone, zone_id)
     if not zone:
         raise HTTPException(status_code=404, detail="Zone not found")
 
-    for key, value in data.model_dump().items():
+    # fields left out keep their stored value
+    for key, value in data.model_dump(exclude_unset=True).items():
         setattr(zone, key, value)
 
-    db.commit()
-    db.refresh(zone)
+    if not zone.polygon and not zone.radius_meters:
+        await db.rollback()
+        raise HTTPException(status_code=422, detail="give radius_meters or polygon")
+
+    await db.commit()
+    await db.refresh(zone)
+    await db.run_sync(reload_zones)
     return zone
 
 
 @router.delete("/{zone_id}")
-def delete_red_zone(
+async def delete_red_zone(
     zone_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin=Depends(get_current_admin)
 ):
-    zone = db.query(RedZone).filter(RedZone.id == zone_id).first()
+    zone = await db.get(RedZone, zone_id)
     if not zone:
         raise HTTPException(status_code=404, detail="Zone not found")
 
-    db.delete(zone)
-    db.commit()
+    await db.delete(zone)
+    await db.commit()
+    await db.run_sync(reload_zones)
     return {"message": "Zone deleted"}
 
+@router.get("/catalogue")
+async def red_zone_catalogue(admin=Depends(get_current_admin)):
+    catalogue = zone_catalogue()
+    return {
+        "version": catalogue.version,
+        "loaded_at": catalogue.loaded_at,
+        "zones": catalogue.zones,
+    }
+
 # -------------------------------
 # 🔥 LIVE ZONE STATUS (STEP C4)
 # -------------------------------
 @router.get("/status")
-def red_zone_status():
-    loads = compute_zone_loads(rider_state)
-    zones = get_all_red_zones()
-
-    result = []
-    for zone in zones:
-        load = loads.get(zone["id"], {})
-        pressure = load.get("pressure", 0)
-
-        if pressure < 0.8:
-            color = "green"
-        elif pressure <= 1.2:
-            color = "yellow"
-        else:
-            color = "red"
-
-        result.append({
-            "id": zone["id"],
-            "lat": zone["lat"],
-            "lon": zone["lon"],
-            "radius": zone["radius"],
-            "weight": zone["weight"],
-            "pressure": pressure,
-            "color": color,
-        })
-
-    return result
+async def red_zone_status():
+    # latest published snapshot (app/services/zone_pressure.py)
+    return zone_pressure.snapshot().zones
+
+
+@router.get("/status/metrics")
+async def red_zone_status_metrics(admin=Depends(get_current_admin)):
+    return zone_pressure.metrics()
 
 # -------------------------------
 # 🧠 STEP C7 — UPDATE ZONE WEIGHT (LIVE)
 # -------------------------------
 @router.put("/weight/{zone_id}")
-def update_zone_weight_api(
+async def update_zone_weight_api(
     zone_id: str,
     weight: int,
+    db: AsyncSession = Depends(get_async_db),
     admin=Depends(get_current_admin)
 ):
-    zone = update_zone_weight(zone_id, weight)
+    zone = await db.run_sync(update_zone_weight, zone_id, weight)
     if not zone:
         raise HTTPException(status_code=404, detail="Zone not found")
 
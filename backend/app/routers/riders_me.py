@@ -6,9 +6,8 @@ from datetime import datetime, timedelta
 from app.core.deps import get_current_rider
 from app.models.user import User
 from app.models.shift import ShiftBooking
-from app.models.gps import GPSLocation
 from app.db.session import get_db
-from app.routers.tracking import compute
+from app.services.distance_cache import cached_rider_km
 
 router = APIRouter()
 
@@ -65,16 +64,7 @@ def rider_stats(
     # -----------------------
     # WEEK DISTANCE
     # -----------------------
-    gps_points = (
-        db.query(GPSLocation)
-        .filter(
-            GPSLocation.rider_id == current_rider.id,
-            GPSLocation.timestamp >= start_week,
-        )
-        .all()
-    )
-
-    week_km = compute(gps_points) if gps_points else 0
+    week_km = cached_rider_km(db, current_rider.id, start_week)
 
     # -----------------------
     # PERFORMANCE TIER
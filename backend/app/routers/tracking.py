@@ -1,43 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime, timedelta
-
-from app.db.session import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+
+from app.db.session import get_async_db
 from app.core.deps import get_current_rider, get_current_admin
-from app.schemas.gps import GPSCreate, GPSRead
+from app.schemas.gps import (
+    GPSCreate,
+    GPSRead,
+    GPSBatchCreate,
+    GatewayGPSBatchCreate,
+    GPSBatchResult,
+    GPSHistoryPage,
+)
 from app.models.gps import GPSLocation
 from app.models.user import User
 from app.models.notifications import MovementNotification
 from app.utils.gps import haversine  # for distance calc
+from app.services.gps_ingest import (
+    MIN_UPDATE_SECONDS,
+    STAGNANT_MINUTES,
+    STAGNANT_DISTANCE_METERS,
+    MAX_BATCH_FIXES,
+    ingest_fixes,
+)
+from app.services.last_fix_cache import LastFix, last_fix_cache
+from app.services.distance_engine import path_km
+from app.services.distance_range import distance_between
+from app.services.distance_cache import cached_rider_km, distance_cache
+from app.services.odometer import odometer
+from app.services.dead_band import dead_band
+from app.services.routes import rider_route
+from app.services.gps_history import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    history_page,
+    history_rows,
+    export_history,
+    decode_cursor,
+)
 
 
 router = APIRouter()
 
-# CONFIG
-MIN_UPDATE_SECONDS = 30            # rider must wait 30s between updates
-STAGNANT_MINUTES = 8               # alert if standing still 8 min
-STAGNANT_DISTANCE_METERS = 30      # consider “no movement” if < 30 m
-
 
 # ------------------------------------
 # 1. Rider GPS update
 # ------------------------------------
 @router.post("/update", response_model=GPSRead)
-def update_location(
+async def update_location(
     data: GPSCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     rider: User = Depends(get_current_rider)
 ):
     now = datetime.utcnow()
 
     # previous position
-    last = (
-        db.query(GPSLocation)
-        .filter(GPSLocation.rider_id == rider.id)
-        .order_by(GPSLocation.timestamp.desc())
-        .first()
-    )
+    last = await last_fix_cache.aget_or_load(db, rider.id)
 
     # enforce 30 sec rule
     if last and last.timestamp > now - timedelta(seconds=MIN_UPDATE_SECONDS):
@@ -46,6 +67,10 @@ def update_location(
             detail=f"Wait {MIN_UPDATE_SECONDS}s before next GPS update"
         )
 
+    # barely moved: merged into the last stored point, nothing written
+    if not dead_band.accept(rider.id, data.latitude, data.longitude, now, last):
+        return last
+
     # store new point
     new_point = GPSLocation(
         rider_id=rider.id,
@@ -53,8 +78,13 @@ def update_location(
         longitude=data.longitude,
     )
     db.add(new_point)
-    db.commit()
-    db.refresh(new_point)
+    await db.commit()
+    await db.refresh(new_point)
+
+    odometer.record(LastFix(
+        new_point.id, new_point.rider_id,
+        new_point.latitude, new_point.longitude, new_point.timestamp
+    ))
 
     # No stagnation check if it’s the first point
     if not last:
@@ -78,26 +108,65 @@ def update_location(
             message="You are stationary too long — move to active area!"
         )
         db.add(notif)
-        db.commit()
+        await db.commit()
 
     return new_point
 
 
+# ------------------------------------
+# 1b. Rider GPS batch update
+# ------------------------------------
+@router.post("/update/batch", response_model=GPSBatchResult)
+async def update_location_batch(
+    data: GPSBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+    rider: User = Depends(get_current_rider)
+):
+    if len(data.fixes) > MAX_BATCH_FIXES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_FIXES} fixes per batch"
+        )
+
+    accepted, rejected = await db.run_sync(ingest_fixes, [
+        (i, rider.id, f.latitude, f.longitude, f.timestamp)
+        for i, f in enumerate(data.fixes)
+    ])
+    return {"accepted": accepted, "rejected": rejected}
+
+
+# ------------------------------------
+# 1c. Gateway GPS batch update (many riders)
+# ------------------------------------
+@router.post("/gateway/batch", response_model=GPSBatchResult)
+async def gateway_location_batch(
+    data: GatewayGPSBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(get_current_admin)
+):
+    if len(data.fixes) > MAX_BATCH_FIXES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_FIXES} fixes per batch"
+        )
+
+    accepted, rejected = await db.run_sync(ingest_fixes, [
+        (i, f.rider_id, f.latitude, f.longitude, f.timestamp)
+        for i, f in enumerate(data.fixes)
+    ])
+    return {"accepted": accepted, "rejected": rejected}
+
+
 # ------------------------------------
 # 2. ADMIN: Latest rider location
 # ------------------------------------
 @router.get("/latest/{rider_id}", response_model=GPSRead)
-def get_latest_location(
+async def get_latest_location(
     rider_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin=Depends(get_current_admin)
 ):
-    loc = (
-        db.query(GPSLocation)
-        .filter(GPSLocation.rider_id == rider_id)
-        .order_by(GPSLocation.timestamp.desc())
-        .first()
-    )
+    loc = await last_fix_cache.aget_or_load(db, rider_id)
     if not loc:
         raise HTTPException(status_code=404, detail="No GPS data found")
     return loc
@@ -107,16 +176,61 @@ def get_latest_location(
 # 3. ADMIN: Rider GPS history
 # ------------------------------------
 @router.get("/history/{rider_id}", response_model=List[GPSRead])
-def get_history(
+async def get_history(
+    rider_id: int,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(get_current_admin)
+):
+    # unpaged list, kept for existing clients; new code should page
+    return await history_rows(db, rider_id, _naive_utc(from_), _naive_utc(to))
+
+
+@router.get("/history/{rider_id}/page", response_model=GPSHistoryPage)
+async def get_history_page(
+    rider_id: int,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(get_current_admin)
+):
+    try:
+        return await history_page(
+            db, rider_id, _naive_utc(from_), _naive_utc(to),
+            cursor, limit, descending=order == "desc",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/history/{rider_id}/export")
+async def export_rider_history(
     rider_id: int,
-    db: Session = Depends(get_db),
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
     admin=Depends(get_current_admin)
 ):
-    return (
-        db.query(GPSLocation)
-        .filter(GPSLocation.rider_id == rider_id)
-        .order_by(GPSLocation.timestamp.desc())
-        .all()
+    if cursor is not None:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_history(
+            rider_id, format, _naive_utc(from_), _naive_utc(to),
+            cursor, descending=order == "desc",
+        ),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=rider_{rider_id}_history.{format}"},
     )
 
 
@@ -124,149 +238,180 @@ def get_history(
 # 4. Rider — Distance Today
 # ------------------------------------
 @router.get("/distance/today")
-def distance_today(
-    db: Session = Depends(get_db),
+async def distance_today(
+    db: AsyncSession = Depends(get_async_db),
     rider: User = Depends(get_current_rider)
 ):
-    today = datetime.utcnow().date()
-    points = (
-        db.query(GPSLocation)
-        .filter(GPSLocation.rider_id == rider.id)
-        .filter(GPSLocation.timestamp >= today)
-        .order_by(GPSLocation.timestamp)
-        .all()
-    )
-    return {"km_today": compute(points)}
+    km = await db.run_sync(cached_rider_km, rider.id, datetime.utcnow().date())
+    return {"km_today": round(km, 3)}
 
 
 # ------------------------------------
 # 5. Rider — Distance Reports
 # ------------------------------------
+@router.get("/me/distance")
+async def rider_distance_range(
+    from_: datetime = Query(..., alias="from"),
+    to: Optional[datetime] = None,
+    rider=Depends(get_current_rider),
+    db: AsyncSession = Depends(get_async_db)
+):
+    start, end = _range(from_, to)
+    # no 'to': open window, kept current by the odometer
+    km = await db.run_sync(cached_rider_km, rider.id, start, end if to else None)
+    return {"from": start, "to": end, "km": round(km, 3)}
+
+
 @router.get("/me/distance/today")
-def rider_distance_today(
+async def rider_distance_today(
     rider=Depends(get_current_rider),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    pts = (
-        db.query(GPSLocation)
-        .filter(GPSLocation.rider_id == rider.id, GPSLocation.timestamp >= start)
-        .order_by(GPSLocation.timestamp)
-        .all()
-    )
-    return {"date": start.date(), "km": compute(pts)}
+    today = datetime.utcnow().date()
+    km = await db.run_sync(cached_rider_km, rider.id, today)
+    return {"date": today, "km": round(km, 3)}
 
 
 @router.get("/me/distance/week")
-def rider_distance_week(
+async def rider_distance_week(
     rider=Depends(get_current_rider),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     start = datetime.utcnow() - timedelta(days=7)
-    pts = (
-        db.query(GPSLocation)
-        .filter(GPSLocation.rider_id == rider.id, GPSLocation.timestamp >= start)
-        .order_by(GPSLocation.timestamp)
-        .all()
-    )
-    return {"from": start.date(), "km": compute(pts)}
+    km = await db.run_sync(cached_rider_km, rider.id, start)
+    return {"from": start.date(), "km": round(km, 3)}
 
 
 @router.get("/me/distance/month")
-def rider_distance_month(
+async def rider_distance_month(
     rider=Depends(get_current_rider),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     start = datetime.utcnow() - timedelta(days=30)
-    pts = (
-        db.query(GPSLocation)
-        .filter(GPSLocation.rider_id == rider.id, GPSLocation.timestamp >= start)
-        .order_by(GPSLocation.timestamp)
-        .all()
-    )
-    return {"from": start.date(), "km": compute(pts)}
+    km = await db.run_sync(cached_rider_km, rider.id, start)
+    return {"from": start.date(), "km": round(km, 3)}
 
 
 # ------------------------------------
 # Shared distance computation
 # ------------------------------------
+# (app/services/distance_range.py answers ranges from the rollups,
+#  per-rider windows go through app/services/distance_cache.py;
+#  compute() is kept for callers that already hold one rider's points)
 def compute(points):
-    total = 0.0
-    for p1, p2 in zip(points, points[1:]):
-        total += haversine(
-            p1.latitude, p1.longitude,
-            p2.latitude, p2.longitude
-        )
-    return round(total, 3)
+    return round(path_km(
+        [p.latitude for p in points],
+        [p.longitude for p in points],
+    ), 3)
+
+
+def _naive_utc(value):
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _range(start, end):
+    """
+    Naive UTC [start, end); `end` defaults to now.
+    """
+    start, end = _naive_utc(start), _naive_utc(end or datetime.utcnow())
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    return start, end
 
 
 # ------------------------------------
 # 6. Admin — Leaderboards
 # ------------------------------------
+@router.get("/admin/distance")
+async def admin_distance_range(
+    from_: datetime = Query(..., alias="from"),
+    to: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(get_current_admin)
+):
+    start, end = _range(from_, to)
+    return await report_for(db, start, limit, offset, end=end)
+
+
 @router.get("/admin/distance/day")
-def admin_distance_day(
-    db: Session = Depends(get_db),
+async def admin_distance_day(
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
     admin=Depends(get_current_admin)
 ):
     start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    return report_for(db, start)
+    return await report_for(db, start, limit, offset)
 
 
 @router.get("/admin/distance/week")
-def admin_distance_week(
-    db: Session = Depends(get_db),
+async def admin_distance_week(
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
     admin=Depends(get_current_admin)
 ):
     start = datetime.utcnow() - timedelta(days=7)
-    return report_for(db, start)
+    return await report_for(db, start, limit, offset)
 
 
 @router.get("/admin/distance/month")
-def admin_distance_month(
-    db: Session = Depends(get_db),
+async def admin_distance_month(
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
     admin=Depends(get_current_admin)
 ):
     start = datetime.utcnow() - timedelta(days=30)
-    return report_for(db, start)
+    return await report_for(db, start, limit, offset)
 
 
-def report_for(db: Session, start):
-    riders = db.query(User).filter(User.role == "rider").all()
-    board = []
+@router.get("/admin/distance-cache")
+async def admin_distance_cache_stats(admin=Depends(get_current_admin)):
+    return distance_cache.stats()
 
-    for r in riders:
-        points = (
-            db.query(GPSLocation)
-            .filter(GPSLocation.rider_id == r.id, GPSLocation.timestamp >= start)
-            .order_by(GPSLocation.timestamp)
-            .all()
-        )
-        board.append({
-            "login_id": r.login_id,
-            "rider_id": r.id,
-            "km": compute(points)
-        })
-    return sorted(board, key=lambda x: x["km"], reverse=True)
+
+async def report_for(db: AsyncSession, start, limit=None, offset=0, end=None):
+    """
+    Riders by distance in [start, end) (riders without points at 0 km).
+    Totals come from the hour/day/week rollups in a few grouped queries.
+    """
+    totals = await db.run_sync(distance_between, start, end or datetime.utcnow())
+    riders = (await db.execute(
+        select(User.login_id, User.id).where(User.role == "rider")
+    )).all()
+
+    rows = sorted(
+        ((login_id, rider_id, totals.get(rider_id, 0.0)) for login_id, rider_id in riders),
+        key=lambda r: (-r[2], r[1]),
+    )
+    rows = rows[offset:offset + limit if limit else None]
+
+    return [
+        {"login_id": login_id, "rider_id": rider_id, "km": round(km, 3)}
+        for login_id, rider_id, km in rows
+    ]
 
 
 # ------------------------------------
-# 7. ADMIN — View Rider Route Today
+# 7. ADMIN — View Rider Route
 # ------------------------------------
 @router.get("/admin/route/{rider_id}")
-def admin_route(
+async def admin_route(
     rider_id: int,
-    db: Session = Depends(get_db),
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    tolerance: Optional[float] = Query(None, ge=0, description="simplification tolerance in meters"),
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="map zoom, sets tolerance to ~1px"),
+    format: str = Query("json", pattern="^(json|polyline)$"),
+    db: AsyncSession = Depends(get_async_db),
     admin=Depends(get_current_admin)
 ):
-    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    pts = (
-        db.query(GPSLocation)
-        .filter(GPSLocation.rider_id == rider_id, GPSLocation.timestamp >= start)
-        .order_by(GPSLocation.timestamp)
-        .all()
-    )
-    return [{
-        "lat": p.latitude,
-        "lng": p.longitude,
-        "time": p.timestamp
-    } for p in pts]
+    # defaults to today so far, unsimplified
+    start = from_ or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start, end = _range(start, to)
+    return await rider_route(db, rider_id, start, end, tolerance, zoom, format)
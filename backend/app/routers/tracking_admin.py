@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from datetime import date
+from datetime import date, timedelta
 
 from app.db.session import get_db
 from app.core.deps import get_current_admin
-from app.models.daily_distance import DailyDistance
+from app.services.distance import compute_daily_distance
+from app.services.distance_cache import cached_rider_km
 
 router = APIRouter()
 
@@ -15,7 +16,17 @@ def rider_daily_distance(
     db: Session = Depends(get_db),
     admin=Depends(get_current_admin)
 ):
-    rec = db.query(DailyDistance).filter_by(rider_id=rider_id, date=day).first()
-    if not rec:
-        return {"rider_id": rider_id, "date": day, "distance": 0}
-    return {"rider_id": rider_id, "date": day, "distance": rec.distance_km}
+    km = cached_rider_km(db, rider_id, day, day + timedelta(days=1))
+    return {"rider_id": rider_id, "date": day, "distance": km}
+
+
+# rebuild a day from raw GPS points (reconciliation)
+@router.post("/daily/{rider_id}/rebuild")
+def rebuild_rider_daily_distance(
+    rider_id: int,
+    day: date,
+    db: Session = Depends(get_db),
+    admin=Depends(get_current_admin)
+):
+    total = compute_daily_distance(db, rider_id, day)
+    return {"rider_id": rider_id, "date": day, "distance": total}
@@ -1,4 +1,6 @@
 from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
 
 class GPSCreate(BaseModel):
     latitude: float
@@ -12,3 +14,56 @@ class GPSRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# -------------------------------
+# Batch ingest
+# -------------------------------
+class GPSFix(BaseModel):
+    latitude: float
+    longitude: float
+    timestamp: Optional[datetime] = None  # device time (UTC), defaults to server time
+
+
+class GPSBatchCreate(BaseModel):
+    fixes: List[GPSFix]
+
+
+class GatewayGPSFix(GPSFix):
+    rider_id: int
+
+
+class GatewayGPSBatchCreate(BaseModel):
+    fixes: List[GatewayGPSFix]
+
+
+class GPSBatchAccepted(BaseModel):
+    index: int
+    id: int
+    rider_id: int
+    latitude: float
+    longitude: float
+    timestamp: datetime
+
+
+class GPSBatchRejected(BaseModel):
+    index: int
+    rider_id: int
+    reason: str
+
+
+class GPSBatchResult(BaseModel):
+    accepted: List[GPSBatchAccepted]
+    rejected: List[GPSBatchRejected]
+
+
+# -------------------------------
+# History (keyset pages)
+# -------------------------------
+class GPSHistoryPoint(GPSRead):
+    timestamp: datetime
+
+
+class GPSHistoryPage(BaseModel):
+    items: List[GPSHistoryPoint]
+    next_cursor: Optional[str] = None   # pass back as ?cursor= for the next page
@@ -1,16 +1,47 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional, Tuple
 
 class RedZoneBase(BaseModel):
     name: str
     latitude: float
     longitude: float
-    radius_meters: int
+    radius_meters: Optional[int] = None
+    polygon: Optional[List[Tuple[float, float]]] = None     # [[lat, lon], ...]
+    weight: int = Field(1, ge=1, le=5)
     is_active: Optional[bool] = True
 
+    @model_validator(mode="after")
+    def check_shape(self):
+        if self.polygon is not None and len(self.polygon) < 3:
+            raise ValueError("polygon needs at least 3 vertices")
+        if self.polygon is None and not self.radius_meters:
+            raise ValueError("give radius_meters or polygon")
+        return self
+
 class RedZoneCreate(RedZoneBase):
     pass
 
+class RedZoneUpdate(BaseModel):
+    """
+    Partial update: only the fields sent are changed.
+    """
+    name: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    radius_meters: Optional[int] = None
+    polygon: Optional[List[Tuple[float, float]]] = None
+    weight: Optional[int] = Field(None, ge=1, le=5)
+    is_active: Optional[bool] = None
+
+    @model_validator(mode="after")
+    def check_polygon(self):
+        for field in ("name", "latitude", "longitude", "weight"):
+            if field in self.model_fields_set and getattr(self, field) is None:
+                raise ValueError(f"{field} cannot be null")
+        if self.polygon is not None and len(self.polygon) < 3:
+            raise ValueError("polygon needs at least 3 vertices")
+        return self
+
 class RedZoneRead(RedZoneBase):
     id: int
 
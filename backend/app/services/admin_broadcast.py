@@ -0,0 +1,338 @@
+# backend/app/services/admin_broadcast.py
+
+import asyncio
+import math
+import time
+
+from app.core.config import (
+    ADMIN_TICK_MS,
+    ADMIN_QUEUE_SIZE,
+    ADMIN_MAX_LAG_TICKS,
+    ADMIN_FULL_SNAPSHOT_TICKS,
+    ADMIN_GRID_CELL_DEG,
+    ADMIN_CLUSTER_SPAN_DEG,
+    ADMIN_CLUSTER_MAX_MARKERS,
+    ADMIN_CLUSTER_DIVISIONS,
+)
+from app.red_zone_service import get_all_red_zones
+from app.services.zone_pressure import zone_pressure
+from app.utils.geo import bbox_around
+from app.utils.spatial_grid import SpatialGrid
+from app.utils.tasks import cancel_and_wait
+
+
+class Subscription:
+    """
+    What an admin is looking at: a bbox (south, west, north, east),
+    a set of rider ids, or nothing (= every rider).
+    """
+
+    def __init__(self, bbox=None, rider_ids=None):
+        self.bbox = bbox
+        self.rider_ids = rider_ids
+
+    @classmethod
+    def from_message(cls, data):
+        """
+        {"type": "SUBSCRIBE", "bbox": [s, w, n, e]}
+        {"type": "SUBSCRIBE", "zone_id": "zone_1"}
+        {"type": "SUBSCRIBE", "rider_ids": ["rider_101", ...]}
+        {"type": "SUBSCRIBE"}                      -> everything
+        """
+        if data.get("bbox") is not None:
+            south, west, north, east = (float(v) for v in data["bbox"])
+            if south > north or west > east:
+                raise ValueError("bbox must be [south, west, north, east]")
+            return cls(bbox=(south, west, north, east))
+
+        if data.get("zone_id") is not None:
+            for zone in get_all_red_zones():
+                if zone["id"] == data["zone_id"]:
+                    return cls(bbox=bbox_around(zone["lat"], zone["lon"], zone["radius"]))
+            raise ValueError(f"unknown zone {data['zone_id']}")
+
+        if data.get("rider_ids") is not None:
+            return cls(rider_ids={str(r) for r in data["rider_ids"]})
+
+        return cls()
+
+    @property
+    def wide(self):
+        if not self.bbox:
+            return False
+        south, west, north, east = self.bbox
+        return max(north - south, east - west) > ADMIN_CLUSTER_SPAN_DEG
+
+    def contains(self, lat, lon):
+        south, west, north, east = self.bbox
+        return south <= lat <= north and west <= lon <= east
+
+
+class AdminClient:
+    """
+    One admin socket with its own bounded outbox and sender task,
+    so a slow browser only ever delays itself.
+    """
+
+    def __init__(self, ws, queue_size=ADMIN_QUEUE_SIZE):
+        self.ws = ws
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.subscription = Subscription()
+        self.visible = set()            # riders currently shown (bbox views)
+        self.lagging_ticks = 0
+        self.dropped = 0
+        self.closed = False
+        self.task = None
+
+    def offer(self, message):
+        """
+        Non-blocking enqueue. When the outbox is full the oldest message is
+        dropped (the periodic full snapshot repairs the gap).
+        Returns False once the client is too far behind.
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            self.lagging_ticks += 1
+        else:
+            self.lagging_ticks = 0
+
+        self.queue.put_nowait(message)
+        return self.lagging_ticks < ADMIN_MAX_LAG_TICKS
+
+    async def run(self):
+        try:
+            while True:
+                message = await self.queue.get()
+                await self.ws.send_json(message)
+        except Exception:
+            pass
+        finally:
+            self.closed = True
+
+
+class AdminBroadcaster:
+    """
+    Collects rider positions and pushes one batched message per admin
+    per tick, containing only the latest fix of each rider that moved
+    and only the riders inside that admin's subscription. Zone pressure
+    goes to every admin as a ZONE_PRESSURE message whenever the
+    published snapshot's version moves.
+    """
+
+    def __init__(self, tick_ms=ADMIN_TICK_MS, full_snapshot_ticks=ADMIN_FULL_SNAPSHOT_TICKS):
+        self.tick_seconds = tick_ms / 1000
+        self.full_snapshot_ticks = full_snapshot_ticks
+
+        self.grid = SpatialGrid(ADMIN_GRID_CELL_DEG)
+        self._dirty = set()
+        self.clients = set()
+
+        self.tick = 0
+        self.zone_version = None
+        self._task = None
+
+    # -------------------------------
+    # Producers
+    # -------------------------------
+    def publish(self, rider_id, lat, lon):
+        self.grid.update(rider_id, lat, lon)
+        self._dirty.add(rider_id)
+
+    def remove(self, rider_id):
+        self.grid.remove(rider_id)
+        self._dirty.add(rider_id)
+
+    # -------------------------------
+    # Admin sockets
+    # -------------------------------
+    def register(self, ws):
+        client = AdminClient(ws)
+        client.task = asyncio.create_task(client.run())
+        self.clients.add(client)
+
+        # new admins start from the full picture
+        self._offer(client, self._message_for(client, set(), full=True))
+        self._offer(client, self._zone_message(zone_pressure.snapshot()))
+        return client
+
+    def unregister(self, client):
+        self.clients.discard(client)
+        if client.task:
+            client.task.cancel()
+
+    def subscribe(self, client, data):
+        client.subscription = Subscription.from_message(data)
+        client.visible = set()
+        self._offer(client, self._message_for(client, set(), full=True))
+
+    # -------------------------------
+    # Tick loop
+    # -------------------------------
+    async def start(self):
+        if not self._task:
+            # admins get the current zones when they register
+            self.zone_version = zone_pressure.snapshot().version
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        await cancel_and_wait(task)
+        for client in list(self.clients):
+            self.unregister(client)
+            await cancel_and_wait(client.task)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            self.broadcast()
+
+    def broadcast(self):
+        self.tick += 1
+        full = self.full_snapshot_ticks > 0 and self.tick % self.full_snapshot_ticks == 0
+
+        zones = zone_pressure.snapshot()
+        if zones.version != self.zone_version:
+            self.zone_version = zones.version
+            message = self._zone_message(zones)
+            for client in list(self.clients):
+                self._offer(client, message)
+
+        dirty = self._dirty
+        self._dirty = set()
+        if not dirty and not full:
+            return
+
+        shared = None   # the unfiltered message is built once for all "everything" admins
+        for client in list(self.clients):
+            if client.subscription.bbox is None and client.subscription.rider_ids is None:
+                if shared is None:
+                    shared = self._message_for(client, dirty, full)
+                message = shared
+            else:
+                message = self._message_for(client, dirty, full)
+
+            self._offer(client, message)
+
+    def _offer(self, client, message):
+        if message is None:
+            return
+        if client.closed or not client.offer(message):
+            print("🔴 Admin dropped (too slow)")
+            self.unregister(client)
+            asyncio.create_task(_close_quietly(client.ws))
+
+    # -------------------------------
+    # Per-subscription messages
+    # -------------------------------
+    def _position(self, rider_id):
+        lat, lon = self.grid.position(rider_id)
+        return {"rider_id": rider_id, "lat": lat, "lon": lon}
+
+    def _message(self, full, **payload):
+        return {
+            "tick": self.tick,
+            "full": full,
+            "server_time": time.time(),
+            **payload,
+        }
+
+    def _zone_message(self, snapshot):
+        return self._message(
+            True,
+            type="ZONE_PRESSURE",
+            version=snapshot.version,
+            zones=list(snapshot.zones),
+        )
+
+    def _message_for(self, client, dirty, full):
+        sub = client.subscription
+
+        # everything / explicit riders
+        if sub.bbox is None:
+            ids = self.grid.points.keys() if full else dirty
+            if sub.rider_ids is not None:
+                ids = [r for r in ids if r in sub.rider_ids]
+            riders = [self._position(r) for r in ids if r in self.grid]
+            removed = [r for r in dirty if r not in self.grid]
+            if not riders and not removed and not full:
+                return None
+            return self._message(full, type="POSITIONS", riders=riders, removed=removed)
+
+        # viewport
+        if full or sub.wide or len(client.visible) > ADMIN_CLUSTER_MAX_MARKERS:
+            in_view = set(self.grid.query_bbox(*sub.bbox))
+        else:
+            in_view = {
+                r for r in dirty
+                if r in self.grid and sub.contains(*self.grid.position(r))
+            }
+            left = {r for r in dirty if r in client.visible and r not in in_view}
+            if not in_view and not left:
+                return None
+            client.visible = (client.visible - left) | in_view
+            return self._message(
+                full,
+                type="POSITIONS",
+                riders=[self._position(r) for r in in_view],
+                removed=sorted(left),
+            )
+
+        touched = bool(dirty & (in_view | client.visible))
+        if not full and not touched:
+            return None
+
+        previous = client.visible
+        client.visible = in_view
+
+        if sub.wide or len(in_view) > ADMIN_CLUSTER_MAX_MARKERS:
+            return self._message(
+                full,
+                type="CLUSTERS",
+                total=len(in_view),
+                clusters=self._clusters(in_view, sub.bbox),
+            )
+
+        return self._message(
+            full,
+            type="POSITIONS",
+            riders=[self._position(r) for r in in_view],
+            removed=sorted(previous - in_view),
+        )
+
+    def _clusters(self, rider_ids, bbox):
+        south, west, north, east = bbox
+        size = max(north - south, east - west) / ADMIN_CLUSTER_DIVISIONS or 1
+
+        buckets = {}
+        for rider_id in rider_ids:
+            lat, lon = self.grid.position(rider_id)
+            key = (math.floor((lat - south) / size), math.floor((lon - west) / size))
+            bucket = buckets.setdefault(key, [0, 0.0, 0.0])
+            bucket[0] += 1
+            bucket[1] += lat
+            bucket[2] += lon
+
+        return [
+            {"lat": round(s_lat / n, 6), "lon": round(s_lon / n, 6), "count": n}
+            for n, s_lat, s_lon in buckets.values()
+        ]
+
+    def stats(self):
+        return {
+            "tick": self.tick,
+            "riders": len(self.grid),
+            "admins": len(self.clients),
+            "lagging": sum(1 for c in self.clients if c.lagging_ticks),
+            "dropped_messages": sum(c.dropped for c in self.clients),
+        }
+
+
+async def _close_quietly(ws):
+    try:
+        await ws.close(code=1013)  # try again later
+    except Exception:
+        pass
+
+
+admin_broadcaster = AdminBroadcaster()
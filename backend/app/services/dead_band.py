@@ -0,0 +1,111 @@
+# backend/app/services/dead_band.py
+
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+
+from app.core.config import (
+    DEADBAND_ENABLED,
+    DEADBAND_METERS,
+    DEADBAND_MIN_SECONDS,
+    DEADBAND_HEARTBEAT_SECONDS,
+    DEADBAND_MAX_RIDERS,
+)
+from app.utils.geo import distance_meters
+
+
+_Kept = namedtuple("_Kept", "latitude longitude timestamp")
+
+
+class DeadBandFilter:
+    """
+    Ingest-time trajectory compression.
+
+    A fix is stored only if it moved at least `meters` from the rider's
+    last stored fix (and came at least `min_seconds` after it). Dropped
+    fixes are merged into that stored one, which also removes GPS jitter
+    from distance sums. One fix is always kept every `heartbeat_seconds`,
+    so a rider standing still still gets a point per heartbeat and the
+    stagnation rule (STAGNANT_MINUTES) keeps firing.
+
+    At most `max_riders` riders are tracked; the least recently seen is
+    evicted and falls back to the `last` fix passed by the caller.
+    Fleet totals survive eviction, per-rider counts do not.
+    """
+
+    def __init__(
+        self,
+        enabled=DEADBAND_ENABLED,
+        meters=DEADBAND_METERS,
+        min_seconds=DEADBAND_MIN_SECONDS,
+        heartbeat_seconds=DEADBAND_HEARTBEAT_SECONDS,
+        max_riders=DEADBAND_MAX_RIDERS,
+    ):
+        self.enabled = enabled
+        self.meters = meters
+        self.min_interval = timedelta(seconds=min_seconds)
+        self.heartbeat = timedelta(seconds=heartbeat_seconds)
+
+        self.max_riders = max_riders
+
+        self._riders = OrderedDict()    # rider_id -> [last stored fix, kept, dropped]
+        self.kept = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def accept(self, rider_id, lat, lng, ts, last=None):
+        """
+        True if the fix should be stored. `last` is the rider's last stored
+        fix when the filter has not seen the rider yet (e.g. from the
+        last-fix cache).
+        """
+        if not self.enabled:
+            return True
+
+        with self._lock:
+            entry = self._riders.get(rider_id)
+            if entry is None:
+                entry = self._riders[rider_id] = [None, 0, 0]
+                if len(self._riders) > self.max_riders:
+                    self._riders.popitem(last=False)
+            else:
+                self._riders.move_to_end(rider_id)
+
+            ref = entry[0] or last
+            keep = (
+                ref is None
+                or ts - ref.timestamp >= self.heartbeat
+                or (
+                    ts - ref.timestamp >= self.min_interval
+                    and distance_meters(ref.latitude, ref.longitude, lat, lng) >= self.meters
+                )
+            )
+
+            if keep:
+                entry[0] = _Kept(lat, lng, ts)
+                entry[1] += 1
+                self.kept += 1
+            else:
+                entry[2] += 1
+                self.dropped += 1
+            return keep
+
+    def stats(self):
+        with self._lock:
+            riders = {
+                rider_id: {"kept": kept, "dropped": dropped}
+                for rider_id, (_, kept, dropped) in self._riders.items()
+            }
+            kept, dropped = self.kept, self.dropped
+        return {
+            "enabled": self.enabled,
+            "meters": self.meters,
+            "heartbeat_seconds": int(self.heartbeat.total_seconds()),
+            "kept": kept,
+            "dropped": dropped,
+            "saved_ratio": round(dropped / (kept + dropped), 3) if kept + dropped else 0,
+            "riders": riders,
+        }
+
+
+dead_band = DeadBandFilter()
@@ -1,27 +1,304 @@
+"""
+Distance rollups: hourly_distance, daily_distance, weekly_distance.
+
+A segment counts in the hour, day and week of its end point, including
+one that started the day before (so a day's rebuild also reads each
+rider's last point of the previous day). The live odometer
+(app/services/odometer.py) adds to the buckets as fixes arrive. Closed
+days are rebuilt from raw points by the fleet rollup: one ordered,
+streamed pass over the day's gps_locations, bulk writes of the hour and
+day rows, the week refreshed from its days, and a checkpoint row in
+distance_rollup_days, all in one transaction. Re-running a day gives the same rows; a backfill that stops
+halfway resumes at the first day without a checkpoint.
+
+Runs nightly inside the app (DISTANCE_ROLLUP_AT), or by hand:
+
+    python -m app.services.distance                      # every day not rolled up yet
+    python -m app.services.distance --from 2026-09-01 --to 2026-09-30 [--force]
+"""
+
+import argparse
+import asyncio
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from datetime import date
+from datetime import date, datetime, time, timedelta
+
+from app.core.config import DISTANCE_ROLLUP_AT, DISTANCE_ROLLUP_CHUNK_ROWS
+from app.models.daily_distance import (
+    HourlyDistance,
+    DailyDistance,
+    WeeklyDistance,
+    DistanceRollupDay,
+)
 from app.models.gps import GPSLocation
-from app.models.daily_distance import DailyDistance
-from app.utils import haversine
+from app.services.distance_engine import stream_km_by_rider, hour_start
+from app.utils.tasks import cancel_and_wait
+
+
+BUCKET_KEYS = {
+    HourlyDistance: ("rider_id", "hour"),
+    DailyDistance: ("rider_id", "date"),
+    WeeklyDistance: ("rider_id", "week_start"),
+}
+
+
+def day_bounds(day: date):
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def hour_floor(ts: datetime):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def week_start(day: date):
+    return day - timedelta(days=day.weekday())
+
+
+def upsert_distance(db: Session, model, rows, increment=False):
+    """
+    Writes {rider_id, <bucket>, distance_km} rows into a distance table.
+    increment=True adds to the stored value (odometer flushes),
+    otherwise the stored value is replaced (rebuilds).
+    Caller commits.
+    """
+    if not rows:
+        return
+    keys = BUCKET_KEYS[model]
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(model)
+        value = stmt.excluded.distance_km
+        if increment:
+            value = model.distance_km + value
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={"distance_km": value},
+        )
+        db.execute(stmt, rows)
+        return
+
+    # other dialects: row by row
+    for row in rows:
+        record = db.query(model).filter_by(**{k: row[k] for k in keys}).first()
+        if record is None:
+            db.add(model(**row))
+        elif increment:
+            record.distance_km = (record.distance_km or 0) + row["distance_km"]
+        else:
+            record.distance_km = row["distance_km"]
+
+
+# -------------------------------
+# Rebuild from raw points
+# -------------------------------
+def rebuild_day(db: Session, day: date, rider_ids=None, chunk_rows=DISTANCE_ROLLUP_CHUNK_ROWS):
+    """
+    Replaces the hourly and daily rows of `day` (for the given riders, or
+    everyone) with values computed from raw points in one streamed pass,
+    then refreshes the week. Returns {rider_id: km}. Caller commits.
+    """
+    start, end = day_bounds(day)
+    by_hour = stream_km_by_rider(db, rider_ids, start, end, chunk_rows=chunk_rows, by_hour=True)
+
+    totals = {}
+    for (rider_id, _), km in by_hour.items():
+        totals[rider_id] = totals.get(rider_id, 0.0) + km
+
+    hourly = db.query(HourlyDistance).filter(HourlyDistance.hour >= start, HourlyDistance.hour < end)
+    daily = db.query(DailyDistance).filter(DailyDistance.date == day)
+    if rider_ids is not None:
+        hourly = hourly.filter(HourlyDistance.rider_id.in_(rider_ids))
+        daily = daily.filter(DailyDistance.rider_id.in_(rider_ids))
+    hourly.delete(synchronize_session=False)
+    daily.delete(synchronize_session=False)
+
+    upsert_distance(db, HourlyDistance, [
+        {"rider_id": rider_id, "hour": hour_start(hour), "distance_km": km}
+        for (rider_id, hour), km in by_hour.items()
+    ])
+    upsert_distance(db, DailyDistance, [
+        {"rider_id": rider_id, "date": day, "distance_km": km}
+        for rider_id, km in totals.items()
+    ])
+    refresh_week(db, week_start(day), rider_ids)
+    return totals
+
+
+def refresh_week(db: Session, monday: date, rider_ids=None):
+    """
+    weekly_distance = sum of the week's daily_distance rows.
+    """
+    sums = (
+        db.query(DailyDistance.rider_id, func.sum(DailyDistance.distance_km))
+        .filter(DailyDistance.date >= monday, DailyDistance.date < monday + timedelta(days=7))
+    )
+    weekly = db.query(WeeklyDistance).filter(WeeklyDistance.week_start == monday)
+    if rider_ids is not None:
+        sums = sums.filter(DailyDistance.rider_id.in_(rider_ids))
+        weekly = weekly.filter(WeeklyDistance.rider_id.in_(rider_ids))
+    sums = sums.group_by(DailyDistance.rider_id).all()
+
+    weekly.delete(synchronize_session=False)
+    upsert_distance(db, WeeklyDistance, [
+        {"rider_id": rider_id, "week_start": monday, "distance_km": km or 0.0}
+        for rider_id, km in sums
+    ])
+
 
 def compute_daily_distance(db: Session, rider_id: int, day: date):
-    points = db.query(GPSLocation).filter(
-        GPSLocation.rider_id == rider_id,
-        GPSLocation.timestamp >= day,
-        GPSLocation.timestamp < day.replace(day=day.day+1)
-    ).order_by(GPSLocation.timestamp.asc()).all()
-
-    total = 0
-    for p1, p2 in zip(points, points[1:]):
-        total += haversine(p1.latitude, p1.longitude, p2.longitude)
-
-    # store or update
-    record = db.query(DailyDistance).filter_by(rider_id=rider_id, date=day).first()
-    if record:
-        record.distance_km = total
-    else:
-        record = DailyDistance(rider_id=rider_id, date=day, distance_km=total)
-        db.add(record)
+    """
+    Rebuilds one rider's day from raw points (reconciliation).
+    Meant for closed days; for today the live odometer keeps adding on top.
+    """
+    from app.services.odometer import odometer
+    from app.services.distance_cache import distance_cache
 
+    total = rebuild_day(db, day, [rider_id]).get(rider_id, 0.0)
     db.commit()
+
+    # the rebuilt rows already contain anything this process had pending
+    odometer.discard(rider_id, day)
+    distance_cache.invalidate_day(rider_id, day)
     return total
+
+
+# -------------------------------
+# Fleet-wide rollup
+# -------------------------------
+def rollup_day(db: Session, day: date, force=False, chunk_rows=DISTANCE_ROLLUP_CHUNK_ROWS):
+    """
+    Rebuilds every rider's hourly/daily rows for `day` in one pass.
+    Skips days that already have a checkpoint unless force=True.
+    """
+    from app.services.odometer import odometer
+    from app.services.distance_cache import distance_cache
+
+    if not force and db.get(DistanceRollupDay, day) is not None:
+        return None
+
+    totals = rebuild_day(db, day, chunk_rows=chunk_rows)
+    checkpoint = db.merge(DistanceRollupDay(
+        date=day,
+        riders=len(totals),
+        distance_km=sum(totals.values()),
+        completed_at=datetime.utcnow(),
+    ))
+    db.commit()
+
+    for rider_id in totals:
+        odometer.discard(rider_id, day)
+    distance_cache.invalidate(None, *day_bounds(day))
+
+    return {"date": day, "riders": checkpoint.riders, "distance_km": round(checkpoint.distance_km, 3)}
+
+
+def last_closed_day():
+    return datetime.utcnow().date() - timedelta(days=1)
+
+
+def rollup_range(db: Session, first: date, last: date, force=False):
+    """
+    Backfills [first, last], capped at yesterday (today belongs to the
+    odometer). Returns the days that were rolled up.
+    """
+    last = min(last, last_closed_day())
+    done = []
+    day = first
+    while day <= last:
+        result = rollup_day(db, day, force=force)
+        if result is not None:
+            print(f"📏 Distance rollup {day}: {result['riders']} riders, {result['distance_km']} km")
+            done.append(result)
+        day += timedelta(days=1)
+    return done
+
+
+def rollup_pending(db: Session):
+    """
+    Rolls up every closed day after the latest checkpoint
+    (or since the first stored point, on a fresh database).
+    """
+    latest = db.query(func.max(DistanceRollupDay.date)).scalar()
+    if latest is not None:
+        first = latest + timedelta(days=1)
+    else:
+        first_point = db.query(func.min(GPSLocation.timestamp)).scalar()
+        if first_point is None:
+            return []
+        first = first_point.date()
+    return rollup_range(db, first, last_closed_day())
+
+
+class DistanceRollupJob:
+    """
+    Runs `rollup_pending` once a day at DISTANCE_ROLLUP_AT (UTC).
+    Several workers may run it; checkpoints make the extra runs no-ops.
+    """
+
+    def __init__(self, at=DISTANCE_ROLLUP_AT):
+        self.at = datetime.strptime(at, "%H:%M").time() if at else None
+        self._task = None
+
+    async def start(self):
+        if self.at and not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        await cancel_and_wait(task)
+
+    def seconds_until_next(self, now=None):
+        now = now or datetime.utcnow()
+        run_at = datetime.combine(now.date(), self.at)
+        if run_at <= now:
+            run_at += timedelta(days=1)
+        return (run_at - now).total_seconds()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.seconds_until_next())
+            try:
+                await asyncio.to_thread(_rollup_pending_now)
+            except Exception as e:
+                print(f"⚠️ Distance rollup failed: {e}")
+
+
+def _rollup_pending_now():
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return rollup_pending(db)
+    finally:
+        db.close()
+
+
+distance_rollup = DistanceRollupJob()
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+    import app.models.user, app.models.shift  # noqa: F401 (mapper relationships)
+
+    parser = argparse.ArgumentParser(description="daily_distance rollup / backfill")
+    parser.add_argument("--from", dest="first", type=date.fromisoformat)
+    parser.add_argument("--to", dest="last", type=date.fromisoformat, default=None)
+    parser.add_argument("--force", action="store_true", help="redo days that have a checkpoint")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.first:
+            done = rollup_range(db, args.first, args.last or last_closed_day(), force=args.force)
+        else:
+            done = rollup_pending(db)
+        print(f"rolled up {len(done)} day(s)")
+    finally:
+        db.close()
@@ -0,0 +1,149 @@
+# backend/app/services/distance_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from sqlalchemy.orm import Session
+
+from app.core.config import DISTANCE_CACHE_SIZE, DISTANCE_CACHE_TTL_SECONDS
+
+
+def window_start(value):
+    """
+    Cache-friendly start of a window: dates become midnight, rolling
+    starts ("now - 7 days") are floored to the minute.
+    """
+    if not isinstance(value, datetime):
+        return datetime.combine(value, datetime.min.time())
+    return value.replace(second=0, microsecond=0)
+
+
+class DistanceCache:
+    """
+    LRU of one rider's km over a window, keyed (rider_id, start, end).
+    end=None is an open window ("up to now").
+
+    The odometer calls `extend` for every segment it counts, which adds
+    the km to the rider's windows that contain the segment's end, so
+    "today" and "this week" stay current without a recompute. A fix the
+    odometer cannot count (older than the last one) drops the rider's
+    windows containing it, and day rebuilds drop the windows touching
+    that day. Entries also expire after DISTANCE_CACHE_TTL_SECONDS, which
+    bounds staleness from fixes ingested by other workers.
+    """
+
+    def __init__(self, max_entries=DISTANCE_CACHE_SIZE, ttl_seconds=DISTANCE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()       # (rider_id, start, end) -> [km, stored_at]
+        self._by_rider = {}                 # rider_id -> {keys of that rider}
+        self._generation = {}               # rider_id -> changes seen
+        self._epoch = 0                     # fleet-wide invalidations
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # -------------------------------
+    # Read side
+    # -------------------------------
+    def rider_km(self, db: Session, rider_id, start, end=None, now=None):
+        start = window_start(start)
+        if end is not None and not isinstance(end, datetime):
+            end = window_start(end)
+        key = (rider_id, start, end)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            generation = self._generation_of(rider_id)
+
+        from app.services.distance_range import rider_distance_between
+
+        now = now or datetime.utcnow()
+        km = rider_distance_between(db, rider_id, start, end or now, now=now)
+
+        with self._lock:
+            # a fix counted while we computed may or may not be in `km`
+            if self._generation_of(rider_id) == generation:
+                self._entries[key] = [km, time.monotonic()]
+                self._entries.move_to_end(key)
+                self._by_rider.setdefault(rider_id, set()).add(key)
+                while len(self._entries) > self.max_entries:
+                    self._drop(next(iter(self._entries)))
+        return km
+
+    def _drop(self, key):
+        del self._entries[key]
+        keys = self._by_rider.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_rider[key[0]]
+
+    # -------------------------------
+    # Ingest side
+    # -------------------------------
+    def extend(self, rider_id, timestamp, km):
+        """
+        Adds a counted segment ending at `timestamp` to the rider's windows.
+        """
+        with self._lock:
+            self._generation[rider_id] = self._generation.get(rider_id, 0) + 1
+            for key in self._by_rider.get(rider_id, ()):
+                _, start, end = key
+                if start <= timestamp and (end is None or timestamp < end):
+                    self._entries[key][0] += km
+
+    def invalidate(self, rider_id=None, start=None, end=None):
+        """
+        Drops the windows of `rider_id` (None = every rider) that overlap
+        [start, end) (None = unbounded).
+        """
+        with self._lock:
+            if rider_id is not None:
+                self._generation[rider_id] = self._generation.get(rider_id, 0) + 1
+            else:
+                self._epoch += 1
+
+            if rider_id is not None:
+                keys = list(self._by_rider.get(rider_id, ()))
+            else:
+                keys = list(self._entries)
+
+            for key in keys:
+                _, w_start, w_end = key
+                if end is not None and w_start >= end:
+                    continue
+                if start is not None and w_end is not None and w_end <= start:
+                    continue
+                self._drop(key)
+
+    def invalidate_day(self, rider_id, day: date):
+        start = datetime.combine(day, datetime.min.time())
+        self.invalidate(rider_id, start, start + timedelta(days=1))
+
+    def _generation_of(self, rider_id):
+        return self._epoch, self._generation.get(rider_id, 0)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+distance_cache = DistanceCache()
+
+
+def cached_rider_km(db: Session, rider_id, start, end=None, now=None):
+    return distance_cache.rider_km(db, rider_id, start, end, now=now)
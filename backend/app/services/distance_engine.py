@@ -0,0 +1,366 @@
+# backend/app/services/distance_engine.py
+"""
+Distance over stored GPS points.
+
+Only (rider_id, latitude, longitude, timestamp) is selected, as plain
+rows, ordered by rider then time. Segment lengths are computed with NumPy
+in one pass; for many riders at once the segments that jump from one
+rider to the next are masked out and the rest summed per rider.
+
+Bucketed totals (hours, days, the rollup tables) count a segment in the
+bucket of its end point. A segment may start on the day before the one
+it ends in, so a day's first segment is not lost at midnight; a longer
+gap between two points is not counted as distance.
+"""
+
+import numpy as np
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, union_all, Date, cast
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.gps import GPSLocation
+
+
+EARTH_RADIUS_KM = 6371
+DAY = timedelta(days=1)
+
+POINT_COLUMNS = (
+    GPSLocation.rider_id,
+    GPSLocation.latitude,
+    GPSLocation.longitude,
+    GPSLocation.timestamp,
+)
+
+
+def points_stmt(rider_ids=None, start=None, end=None):
+    """
+    SELECT of the point columns for the given riders (None = all)
+    in [start, end), ordered by rider and time.
+    """
+    stmt = select(*POINT_COLUMNS)
+    if rider_ids is not None:
+        stmt = stmt.where(GPSLocation.rider_id.in_(list(rider_ids)))
+    if start is not None:
+        stmt = stmt.where(GPSLocation.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(GPSLocation.timestamp < end)
+    return stmt.order_by(GPSLocation.rider_id, GPSLocation.timestamp, GPSLocation.id)
+
+
+def segment_since(ts):
+    """
+    Earliest start point of a counted segment ending at `ts`: midnight
+    of the day before.
+    """
+    return datetime.combine(ts.date(), datetime.min.time()) - DAY
+
+
+def previous_points_stmt(rider_ids, since, before):
+    """
+    SELECT of each rider's last point in [since, before), with its id.
+    """
+    ranked = select(
+        *POINT_COLUMNS,
+        GPSLocation.id,
+        func.row_number().over(
+            partition_by=GPSLocation.rider_id,
+            order_by=(GPSLocation.timestamp.desc(), GPSLocation.id.desc()),
+        ).label("rank"),
+    ).where(GPSLocation.timestamp >= since, GPSLocation.timestamp < before)
+    if rider_ids is not None:
+        ranked = ranked.where(GPSLocation.rider_id.in_(list(rider_ids)))
+    ranked = ranked.subquery("ranked")
+    return select(
+        ranked.c.rider_id, ranked.c.latitude, ranked.c.longitude, ranked.c.timestamp, ranked.c.id,
+    ).where(ranked.c.rank == 1)
+
+
+def lead_in_points_stmt(rider_ids, start, end):
+    """
+    `points_stmt` plus each rider's last point before `start` (since
+    `segment_since(start)`), so the segment into the window's first
+    point can be counted.
+    """
+    window = select(*POINT_COLUMNS, GPSLocation.id).where(
+        GPSLocation.timestamp >= start, GPSLocation.timestamp < end,
+    )
+    if rider_ids is not None:
+        window = window.where(GPSLocation.rider_id.in_(list(rider_ids)))
+    points = union_all(
+        previous_points_stmt(rider_ids, segment_since(start), start), window,
+    ).subquery("points")
+    return (
+        select(points.c.rider_id, points.c.latitude, points.c.longitude, points.c.timestamp)
+        .order_by(points.c.rider_id, points.c.timestamp, points.c.id)
+    )
+
+
+# -------------------------------
+# Vectorized math
+# -------------------------------
+def segment_km(lat, lon):
+    """
+    Haversine length of every consecutive segment (n points -> n-1 values).
+    """
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    if lat.size < 2:
+        return np.zeros(0)
+
+    d_lat = lat[1:] - lat[:-1]
+    d_lon = lon[1:] - lon[:-1]
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(d_lon / 2) ** 2
+    a = np.clip(a, 0.0, 1.0)
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def path_km(lat, lon):
+    """
+    Length of one rider's path, points in time order.
+    """
+    return float(segment_km(lat, lon).sum())
+
+
+def grouped_km(rider_ids, lat, lon, buckets=None):
+    """
+    {rider_id: km} for points sorted by rider then time.
+    Riders with a single point get 0.
+
+    With `buckets` (one int per point, e.g. `hour_index`) the result is
+    {(rider_id, bucket): km}; a segment counts in its end point's bucket.
+    """
+    rider_ids = np.asarray(rider_ids)
+    if rider_ids.size == 0:
+        return {}
+
+    segments = segment_km(lat, lon)
+    same_rider = rider_ids[1:] == rider_ids[:-1]
+    segments = np.where(same_rider, segments, 0.0)
+
+    if buckets is None:
+        riders, group = np.unique(rider_ids, return_inverse=True)
+        totals = np.bincount(group[1:], weights=segments, minlength=riders.size)
+        return {int(r): float(km) for r, km in zip(riders, totals)}
+
+    keys = np.stack([rider_ids, np.asarray(buckets, dtype=np.int64)], axis=1)
+    keys, group = np.unique(keys, axis=0, return_inverse=True)
+    group = group.ravel()
+    totals = np.bincount(group[1:], weights=segments, minlength=len(keys))
+    return {(int(r), int(b)): float(km) for (r, b), km in zip(keys, totals)}
+
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def hour_index(timestamps):
+    """
+    Hours since the epoch for naive UTC datetimes.
+    """
+    return np.array(timestamps, dtype="datetime64[us]").astype("datetime64[h]").astype(np.int64)
+
+
+def hour_start(index):
+    return EPOCH + timedelta(hours=int(index))
+
+
+def rows_to_arrays(rows, with_hours=False):
+    """
+    Point rows -> (rider_ids, lat, lon) arrays (+ hour_index with_hours).
+    """
+    if not rows:
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0))
+        return empty + (np.zeros(0, dtype=np.int64),) if with_hours else empty
+
+    rider_ids, lat, lon, ts = zip(*rows)
+    arrays = (
+        np.fromiter(rider_ids, dtype=np.int64, count=len(rows)),
+        np.fromiter(lat, dtype=np.float64, count=len(rows)),
+        np.fromiter(lon, dtype=np.float64, count=len(rows)),
+    )
+    if with_hours:
+        return arrays + (hour_index(ts),)
+    return arrays
+
+
+def rows_km(rows):
+    """
+    {rider_id: km} for point rows (as returned by `points_stmt`).
+    """
+    return grouped_km(*rows_to_arrays(rows))
+
+
+class GroupedReducer:
+    """
+    `grouped_km` over a stream of row chunks (sorted by rider then time).
+    The last point of each chunk is carried into the next one, so a rider
+    split across chunks loses no segment. by_hour=True keys the totals
+    by (rider_id, hour_index).
+    """
+
+    def __init__(self, by_hour=False):
+        self.by_hour = by_hour
+        self.totals = {}
+        self.points = 0
+        self._carry = None      # last point's arrays, length 1
+
+    def feed(self, rows):
+        if not rows:
+            return
+        arrays = rows_to_arrays(rows, with_hours=self.by_hour)
+        self.points += len(rows)
+
+        if self._carry is not None:
+            arrays = tuple(np.concatenate((c, a)) for c, a in zip(self._carry, arrays))
+
+        for key, km in grouped_km(*arrays).items():
+            self.totals[key] = self.totals.get(key, 0.0) + km
+
+        self._carry = tuple(a[-1:] for a in arrays)
+
+
+# -------------------------------
+# In SQL (Postgres)
+# -------------------------------
+def haversine_km_sql(lat1, lon1, lat2, lon2):
+    """
+    Haversine as a SQL expression (same formula as `segment_km`).
+    """
+    a = (
+        func.power(func.sin(func.radians(lat2 - lat1) / 2), 2)
+        + func.cos(func.radians(lat1)) * func.cos(func.radians(lat2))
+        * func.power(func.sin(func.radians(lon2 - lon1) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(func.least(a, 1.0)))
+
+
+def km_by_rider_subquery(start, end, rider_ids=None):
+    """
+    (rider_id, km) of the segments ending in [start, end), computed by
+    the database: LAG() over each rider's points in time order (from the
+    day before `start`), haversine per segment, SUM per rider. Same
+    segments as the rollups, including the ones across midnight.
+    """
+    window = {
+        "partition_by": GPSLocation.rider_id,
+        "order_by": (GPSLocation.timestamp, GPSLocation.id),
+    }
+    segments = select(
+        GPSLocation.rider_id,
+        GPSLocation.latitude,
+        GPSLocation.longitude,
+        GPSLocation.timestamp,
+        func.lag(GPSLocation.latitude).over(**window).label("prev_lat"),
+        func.lag(GPSLocation.longitude).over(**window).label("prev_lon"),
+        func.lag(GPSLocation.timestamp).over(**window).label("prev_ts"),
+    ).where(
+        GPSLocation.timestamp >= segment_since(start),
+        GPSLocation.timestamp < end,
+    )
+    if rider_ids is not None:
+        segments = segments.where(GPSLocation.rider_id.in_(list(rider_ids)))
+    segments = segments.subquery("segments")
+
+    km = func.sum(haversine_km_sql(
+        segments.c.prev_lat, segments.c.prev_lon,
+        segments.c.latitude, segments.c.longitude,
+    ))
+    return (
+        select(segments.c.rider_id, func.coalesce(km, 0.0).label("km"))
+        .where(
+            segments.c.timestamp >= start,
+            # the segment may start on the day before its end point's day
+            segments.c.prev_ts >= cast(segments.c.timestamp, Date) - 1,
+        )
+        .group_by(segments.c.rider_id)
+        .subquery("rider_km")
+    )
+
+
+# -------------------------------
+# DB helpers
+# -------------------------------
+def fetch_points(db: Session, rider_ids=None, start=None, end=None):
+    return db.execute(points_stmt(rider_ids, start, end)).all()
+
+
+async def afetch_points(db: AsyncSession, rider_ids=None, start=None, end=None):
+    return (await db.execute(points_stmt(rider_ids, start, end))).all()
+
+
+def km_by_rider(db: Session, rider_ids=None, start=None, end=None):
+    return rows_km(fetch_points(db, rider_ids, start, end))
+
+
+def previous_points(db: Session, rider_ids, since, before):
+    """
+    Each rider's last point in [since, before), as point rows.
+    """
+    if not rider_ids:
+        return []
+    latest = (
+        select(GPSLocation.rider_id, func.max(GPSLocation.timestamp).label("timestamp"))
+        .where(
+            GPSLocation.rider_id.in_(list(rider_ids)),
+            GPSLocation.timestamp >= since,
+            GPSLocation.timestamp < before,
+        )
+        .group_by(GPSLocation.rider_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(*POINT_COLUMNS)
+        .join(latest, (GPSLocation.rider_id == latest.c.rider_id)
+              & (GPSLocation.timestamp == latest.c.timestamp))
+        .order_by(GPSLocation.id)
+    ).all()
+    # ties on timestamp: highest id wins
+    return list({row.rider_id: row for row in rows}.values())
+
+
+def span_km(db: Session, start, end, rider_ids=None, by_hour=False):
+    """
+    Distance of the segments that END in [start, end), a span inside one
+    day: the points in the span plus each rider's previous point (since
+    the day before).
+    """
+    rows = fetch_points(db, rider_ids, start, end)
+    if not rows:
+        return {}
+
+    seen = {row.rider_id for row in rows}
+    previous = previous_points(db, seen, segment_since(start), start)
+    rows = sorted(previous + list(rows), key=lambda r: (r.rider_id, r.timestamp))
+    totals = grouped_km(*rows_to_arrays(rows, with_hours=True))
+    return _in_window(totals, start, by_hour)
+
+
+def _in_window(hour_totals, start, by_hour):
+    """
+    Drops the buckets of lead-in points (before `start`) from
+    {(rider_id, hour_index): km}, summed per rider unless by_hour.
+    """
+    first_hour = int(hour_index([start])[0])
+    totals = {}
+    for (rider_id, hour), km in hour_totals.items():
+        if hour < first_hour:
+            continue
+        key = (rider_id, hour) if by_hour else rider_id
+        totals[key] = totals.get(key, 0.0) + km
+    return totals
+
+
+def stream_km_by_rider(db: Session, rider_ids, start, end, chunk_rows=50000, by_hour=False):
+    """
+    Distance of the segments that END in [start, end), a window inside
+    one day, with the points read through a server-side cursor in
+    chunks, so memory does not grow with the window.
+    """
+    result = db.execute(
+        lead_in_points_stmt(rider_ids, start, end).execution_options(yield_per=chunk_rows)
+    )
+    reducer = GroupedReducer(by_hour=True)
+    for chunk in result.partitions():
+        reducer.feed(chunk)
+    return _in_window(reducer.totals, start, by_hour)
+
@@ -0,0 +1,196 @@
+# backend/app/services/distance_range.py
+"""
+Distance for any [start, end) interval.
+
+The interval is cut into the coarsest buckets that fit: whole ISO weeks,
+then whole days, then whole hours. Only what is left at the edges (less
+than an hour on each side) is computed from raw points. A day's buckets
+are trusted when the day has a rollup checkpoint, or is today (kept by
+the odometer); other days are computed from raw points too.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.daily_distance import (
+    HourlyDistance,
+    DailyDistance,
+    WeeklyDistance,
+    DistanceRollupDay,
+)
+from app.services.distance import day_bounds, hour_floor, week_start
+from app.services.distance_engine import km_by_rider_subquery, span_km, stream_km_by_rider
+from app.services.odometer import odometer
+
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+WEEK = timedelta(days=7)
+
+
+def _as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, time.min)
+
+
+def covered_days(db: Session, first: date, last: date, today=None):
+    days = {
+        d for (d,) in
+        db.query(DistanceRollupDay.date)
+        .filter(DistanceRollupDay.date >= first, DistanceRollupDay.date <= last)
+        .all()
+    }
+    days.add(today or datetime.utcnow().date())
+    return days
+
+
+def plan_range(start: datetime, end: datetime, covered):
+    """
+    Splits [start, end) into (weeks, days, hours, spans).
+    weeks/days/hours are bucket keys; spans are raw (a, b) pieces,
+    each inside one day.
+    """
+    weeks, days, hours, spans = [], [], [], []
+
+    day = start.date()
+    while datetime.combine(day, time.min) < end:
+        d0, d1 = day_bounds(day)
+        a, b = max(start, d0), min(end, d1)
+
+        if day not in covered:
+            spans.append((a, b))
+        elif (a, b) == (d0, d1):
+            monday = week_start(day)
+            if (
+                day == monday
+                and d0 + WEEK <= end
+                and all(monday + timedelta(days=i) in covered for i in range(7))
+            ):
+                weeks.append(day)
+                day += timedelta(days=7)
+                continue
+            days.append(day)
+        else:
+            h0 = hour_floor(a) if a == hour_floor(a) else hour_floor(a) + HOUR
+            h1 = hour_floor(b)
+            if h0 >= h1:
+                spans.append((a, b))
+            else:
+                if a < h0:
+                    spans.append((a, h0))
+                hour = h0
+                while hour < h1:
+                    hours.append(hour)
+                    hour += HOUR
+                if h1 < b:
+                    spans.append((h1, b))
+
+        day += timedelta(days=1)
+
+    return weeks, days, hours, spans
+
+
+# -------------------------------
+# Pieces
+# -------------------------------
+def _bucket_km(db: Session, model, column, keys, rider_ids):
+    if not keys:
+        return {}
+    q = db.query(model.rider_id, func.sum(model.distance_km)).filter(column.in_(keys))
+    if rider_ids is not None:
+        q = q.filter(model.rider_id.in_(rider_ids))
+    return {rider_id: km or 0.0 for rider_id, km in q.group_by(model.rider_id).all()}
+
+
+def _pending_km(weeks, days, hours, rider_ids):
+    weeks, days, hours = set(weeks), set(days), set(hours)
+    wanted = set(rider_ids) if rider_ids is not None else None
+    totals = defaultdict(float)
+
+    for rider_id, hour, km in odometer.pending():
+        if wanted is not None and rider_id not in wanted:
+            continue
+        if hour in hours or hour.date() in days or week_start(hour.date()) in weeks:
+            totals[rider_id] += km
+    return totals
+
+
+def _whole_day_runs(spans):
+    """
+    Merges raw spans that are whole consecutive days into (start, end) runs.
+    """
+    runs, partial = [], []
+    for a, b in spans:
+        if b - a == DAY and a.time() == time.min:
+            if runs and runs[-1][1] == a:
+                runs[-1] = (runs[-1][0], b)
+            else:
+                runs.append((a, b))
+        else:
+            partial.append((a, b))
+    return runs, partial
+
+
+def _raw_km(db: Session, spans, rider_ids):
+    totals = defaultdict(float)
+    runs, partial = _whole_day_runs(spans)
+
+    for a, b in runs:
+        if db.get_bind().dialect.name == "postgresql":
+            sub = km_by_rider_subquery(a, b, rider_ids)
+            pieces = dict(db.execute(select(sub.c.rider_id, sub.c.km)).all())
+        else:
+            pieces = {}
+            day = a
+            while day < b:
+                for rider_id, km in stream_km_by_rider(db, rider_ids, day, day + DAY).items():
+                    pieces[rider_id] = pieces.get(rider_id, 0.0) + km
+                day += DAY
+        for rider_id, km in pieces.items():
+            totals[rider_id] += km
+
+    for a, b in partial:
+        for rider_id, km in span_km(db, a, b, rider_ids).items():
+            totals[rider_id] += km
+
+    return totals
+
+
+# -------------------------------
+# API
+# -------------------------------
+def distance_between(db: Session, start, end, rider_ids=None, now=None):
+    """
+    {rider_id: km} of the segments that end in [start, end).
+    rider_ids=None means every rider with distance in the range.
+    """
+    start, end = _as_datetime(start), _as_datetime(end)
+    now = now or datetime.utcnow()
+    end = min(end, now)
+    if start >= end:
+        return {}
+    if rider_ids is not None:
+        rider_ids = list(rider_ids)
+
+    covered = covered_days(db, start.date(), end.date(), today=now.date())
+    weeks, days, hours, spans = plan_range(start, end, covered)
+
+    totals = defaultdict(float)
+    parts = (
+        _bucket_km(db, WeeklyDistance, WeeklyDistance.week_start, weeks, rider_ids),
+        _bucket_km(db, DailyDistance, DailyDistance.date, days, rider_ids),
+        _bucket_km(db, HourlyDistance, HourlyDistance.hour, hours, rider_ids),
+        _pending_km(weeks, days, hours, rider_ids),
+        _raw_km(db, spans, rider_ids),
+    )
+    for part in parts:
+        for rider_id, km in part.items():
+            totals[rider_id] += km
+    return dict(totals)
+
+
+def rider_distance_between(db: Session, rider_id, start, end, now=None):
+    return distance_between(db, start, end, [rider_id], now=now).get(rider_id, 0.0)
@@ -0,0 +1,185 @@
+# backend/app/services/gps_buffer.py
+
+import asyncio
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import (
+    GPS_BUFFER_MAX_ROWS,
+    GPS_BUFFER_FLUSH_ROWS,
+    GPS_BUFFER_FLUSH_MS,
+)
+from app.db.session import AsyncSessionLocal
+from app.models.gps import GPSLocation
+from app.services.last_fix_cache import LastFix
+from app.services.odometer import odometer
+
+
+FLUSH_RETRY_SECONDS = 1
+FLUSH_MAX_RETRIES = 5
+
+_STOP = object()
+
+
+class GPSWriteBuffer:
+    """
+    Write-behind buffer for GPS points.
+
+    Sockets `await put(...)` into a bounded queue; one background flusher
+    drains it every `flush_ms` or `flush_rows` rows and writes the batch with
+    a single bulk insert on the async engine. When the DB falls behind the queue fills up and
+    `put` waits, which pushes back on the sending sockets.
+
+    If the bulk insert hits a constraint (e.g. a rider id that does not
+    exist), the batch is written row by row and only the offending rows
+    are dropped.
+    """
+
+    def __init__(
+        self,
+        max_rows=GPS_BUFFER_MAX_ROWS,
+        flush_rows=GPS_BUFFER_FLUSH_ROWS,
+        flush_ms=GPS_BUFFER_FLUSH_MS,
+    ):
+        self.max_rows = max_rows
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_ms / 1000
+
+        # points put before start() wait here for the flusher
+        self._queue = asyncio.Queue(maxsize=max_rows)
+        self._task = None
+
+        self.flushed_rows = 0
+        self.dropped_rows = 0
+        self.flushes = 0
+
+    # -------------------------------
+    # Lifecycle
+    # -------------------------------
+    async def start(self):
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Flushes everything queued so far, then stops the flusher.
+        """
+        if not self._task:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    # -------------------------------
+    # Producer side
+    # -------------------------------
+    async def put(self, rider_id, latitude, longitude, timestamp):
+        await self._queue.put({
+            "rider_id": rider_id,
+            "latitude": latitude,
+            "longitude": longitude,
+            "timestamp": timestamp,
+        })
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "max_rows": self.max_rows,
+            "flushed_rows": self.flushed_rows,
+            "dropped_rows": self.dropped_rows,
+            "flushes": self.flushes,
+        }
+
+    # -------------------------------
+    # Flusher
+    # -------------------------------
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            first = await self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = [first]
+            stopping = False
+            deadline = loop.time() + self.flush_seconds
+
+            while len(batch) < self.flush_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is _STOP:
+                    stopping = True
+                    break
+                batch.append(row)
+
+            await self._flush(batch)
+
+            if stopping:
+                return
+
+    async def _flush(self, rows):
+        for attempt in range(1, FLUSH_MAX_RETRIES + 1):
+            try:
+                await self._write(rows)
+                self.flushed_rows += len(rows)
+                self.flushes += 1
+                return
+            except IntegrityError:
+                written = await self._write_each(rows)
+                self.flushed_rows += written
+                self.dropped_rows += len(rows) - written
+                self.flushes += 1
+                print(f"⚠️ GPS buffer dropped {len(rows) - written} rows that violate constraints")
+                return
+            except Exception as e:
+                print(f"⚠️ GPS buffer flush failed ({attempt}/{FLUSH_MAX_RETRIES}): {e}")
+                await asyncio.sleep(FLUSH_RETRY_SECONDS * attempt)
+
+        self.dropped_rows += len(rows)
+        print(f"❌ GPS buffer dropped {len(rows)} rows")
+
+    async def _write(self, rows):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                insert(GPSLocation).returning(GPSLocation.id, sort_by_parameter_order=True),
+                rows,
+            )
+            ids = result.scalars().all()
+            await db.commit()
+
+        self._record(zip(ids, rows))
+
+    async def _write_each(self, rows):
+        """
+        Inserts rows one at a time (a savepoint each), skipping the ones
+        that violate a constraint. Returns how many were written.
+        """
+        written = []
+        async with AsyncSessionLocal() as db:
+            for row in rows:
+                try:
+                    async with db.begin_nested():
+                        result = await db.execute(insert(GPSLocation).returning(GPSLocation.id), [row])
+                        written.append((result.scalar_one(), row))
+                except IntegrityError:
+                    continue
+            await db.commit()
+
+        self._record(written)
+        return len(written)
+
+    def _record(self, stored):
+        for point_id, row in stored:
+            odometer.record(LastFix(
+                point_id, row["rider_id"], row["latitude"], row["longitude"], row["timestamp"]
+            ))
+
+
+gps_buffer = GPSWriteBuffer()
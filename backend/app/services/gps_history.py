@@ -0,0 +1,141 @@
+# backend/app/services/gps_history.py
+"""
+GPS history reads, keyset-paginated on (timestamp, id).
+
+A cursor is the (timestamp, id) of the last row of a page, so the next
+page is an index range scan on (rider_id, timestamp) however deep it is.
+Exports stream the same query from a server-side cursor, chunk by chunk.
+"""
+
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+from app.models.gps import GPSLocation
+
+
+HISTORY_COLUMNS = (
+    GPSLocation.id,
+    GPSLocation.rider_id,
+    GPSLocation.latitude,
+    GPSLocation.longitude,
+    GPSLocation.timestamp,
+)
+CSV_HEADER = ["id", "rider_id", "latitude", "longitude", "timestamp"]
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+EXPORT_CHUNK_ROWS = 5000
+
+
+def encode_cursor(timestamp, point_id):
+    raw = f"{timestamp.isoformat()}|{point_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Raises ValueError on anything that is not a cursor we issued.
+    """
+    try:
+        ts, point_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(ts), int(point_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def history_stmt(rider_id, start=None, end=None, cursor=None, descending=True):
+    stmt = select(*HISTORY_COLUMNS).where(GPSLocation.rider_id == rider_id)
+    if start is not None:
+        stmt = stmt.where(GPSLocation.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(GPSLocation.timestamp < end)
+
+    if cursor is not None:
+        ts, point_id = decode_cursor(cursor)
+        if descending:
+            after = or_(
+                GPSLocation.timestamp < ts,
+                and_(GPSLocation.timestamp == ts, GPSLocation.id < point_id),
+            )
+        else:
+            after = or_(
+                GPSLocation.timestamp > ts,
+                and_(GPSLocation.timestamp == ts, GPSLocation.id > point_id),
+            )
+        stmt = stmt.where(after)
+
+    if descending:
+        return stmt.order_by(GPSLocation.timestamp.desc(), GPSLocation.id.desc())
+    return stmt.order_by(GPSLocation.timestamp, GPSLocation.id)
+
+
+async def history_rows(db: AsyncSession, rider_id, start=None, end=None):
+    """
+    Every point in the range, newest first (the original list response).
+    """
+    rows = (await db.execute(history_stmt(rider_id, start, end))).all()
+    return [row._asdict() for row in rows]
+
+
+async def history_page(db: AsyncSession, rider_id, start=None, end=None,
+                       cursor=None, limit=DEFAULT_PAGE_SIZE, descending=True):
+    stmt = history_stmt(rider_id, start, end, cursor, descending).limit(limit + 1)
+    rows = (await db.execute(stmt)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.timestamp, last.id)
+
+    return {"items": [row._asdict() for row in rows], "next_cursor": next_cursor}
+
+
+# -------------------------------
+# Streaming export
+# -------------------------------
+def _ndjson(rows):
+    return "".join(
+        json.dumps({
+            "id": r.id,
+            "rider_id": r.rider_id,
+            "latitude": r.latitude,
+            "longitude": r.longitude,
+            "timestamp": r.timestamp.isoformat() if r.timestamp else None,
+        }) + "\n"
+        for r in rows
+    )
+
+
+def _csv(rows, header=False):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(CSV_HEADER)
+    for r in rows:
+        writer.writerow([r.id, r.rider_id, r.latitude, r.longitude,
+                         r.timestamp.isoformat() if r.timestamp else ""])
+    return buf.getvalue()
+
+
+async def export_history(rider_id, fmt="ndjson", start=None, end=None,
+                         cursor=None, descending=True, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Async generator of NDJSON / CSV text chunks, one per `chunk_rows`.
+    Opens its own session: it runs while the response is being sent.
+    """
+    stmt = history_stmt(rider_id, start, end, cursor, descending)
+
+    if fmt == "csv":
+        yield _csv([], header=True)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=chunk_rows))
+        async for rows in result.partitions():
+            yield _csv(rows) if fmt == "csv" else _ndjson(rows)
@@ -0,0 +1,168 @@
+# backend/app/services/gps_ingest.py
+
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.gps import GPSLocation
+from app.models.user import User
+from app.models.notifications import MovementNotification
+from app.utils.gps import haversine
+from app.services.last_fix_cache import LastFix, last_fix_cache
+from app.services.odometer import odometer
+
+
+# CONFIG
+MIN_UPDATE_SECONDS = 30            # rider must wait 30s between updates
+STAGNANT_MINUTES = 8               # alert if standing still 8 min
+STAGNANT_DISTANCE_METERS = 30      # consider “no movement” if < 30 m
+
+MAX_BATCH_FIXES = 500              # fixes accepted per batch request
+MAX_CLOCK_SKEW_SECONDS = 60        # device clocks may run slightly ahead
+
+STAGNANT_MESSAGE = "You are stationary too long — move to active area!"
+
+_Point = namedtuple("_Point", "latitude longitude timestamp")
+
+
+def is_stagnant(last, lat, lng, ts):
+    """
+    Returns minutes stopped if the move from `last` to (lat, lng, ts)
+    breaks the stagnation rule, else None.
+    """
+    meters = haversine(last.latitude, last.longitude, lat, lng) * 1000
+    mins_stopped = (ts - last.timestamp).total_seconds() / 60
+
+    if meters < STAGNANT_DISTANCE_METERS and mins_stopped >= STAGNANT_MINUTES:
+        return mins_stopped
+    return None
+
+
+def _normalize_timestamp(ts, now):
+    if ts is None:
+        return now
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def ingest_fixes(db: Session, fixes, now=None):
+    """
+    Validates and stores a batch of GPS fixes.
+
+    `fixes` is a list of (index, rider_id, latitude, longitude, timestamp).
+    The 30s rule and the stagnation rule are checked in memory against the
+    rider's last known fix (from the last-fix cache) and the fixes accepted
+    before it in the same batch; a fix older than the rider's stored one
+    is rejected as out_of_order rather than too_frequent. All accepted points and notifications are written with one bulk
+    insert each and a single commit.
+
+    Returns (accepted, rejected) lists of dicts.
+    """
+    now = now or datetime.utcnow()
+    max_ts = now + timedelta(seconds=MAX_CLOCK_SKEW_SECONDS)
+
+    accepted = []
+    rejected = []
+
+    # -------------------------
+    # PER-FIX VALIDATION
+    # -------------------------
+    by_rider = {}
+    for index, rider_id, lat, lng, ts in fixes:
+        ts = _normalize_timestamp(ts, now)
+
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            rejected.append({"index": index, "rider_id": rider_id, "reason": "invalid_coordinates"})
+            continue
+        if ts > max_ts:
+            rejected.append({"index": index, "rider_id": rider_id, "reason": "future_timestamp"})
+            continue
+
+        by_rider.setdefault(rider_id, []).append((ts, index, lat, lng))
+
+    if not by_rider:
+        return accepted, rejected
+
+    # unknown riders would fail the whole insert on the FK
+    known = {
+        r.id for r in
+        db.query(User.id)
+        .filter(User.id.in_(list(by_rider)), User.role == "rider")
+        .all()
+    }
+    for rider_id in [r for r in by_rider if r not in known]:
+        for ts, index, lat, lng in by_rider.pop(rider_id):
+            rejected.append({"index": index, "rider_id": rider_id, "reason": "unknown_rider"})
+
+    last_points = last_fix_cache.get_many(db, list(by_rider)) if by_rider else {}
+
+    # -------------------------
+    # RULES (IN MEMORY)
+    # -------------------------
+    point_rows = []
+    point_meta = []
+    notif_rows = []
+
+    for rider_id, items in by_rider.items():
+        items.sort(key=lambda x: (x[0], x[1]))
+        last = last_points.get(rider_id)
+
+        for ts, index, lat, lng in items:
+            # older than what is stored (late gateway batch, backfill)
+            if last and ts < last.timestamp:
+                rejected.append({"index": index, "rider_id": rider_id, "reason": "out_of_order"})
+                continue
+            if last and ts < last.timestamp + timedelta(seconds=MIN_UPDATE_SECONDS):
+                rejected.append({"index": index, "rider_id": rider_id, "reason": "too_frequent"})
+                continue
+
+            point_rows.append({
+                "rider_id": rider_id,
+                "latitude": lat,
+                "longitude": lng,
+                "timestamp": ts,
+            })
+            point_meta.append(index)
+
+            if last:
+                mins_stopped = is_stagnant(last, lat, lng, ts)
+                if mins_stopped is not None:
+                    notif_rows.append({
+                        "rider_id": rider_id,
+                        "last_lat": lat,
+                        "last_lng": lng,
+                        "minutes_stopped": int(mins_stopped),
+                        "message": STAGNANT_MESSAGE,
+                    })
+
+            last = _Point(lat, lng, ts)
+
+    # -------------------------
+    # BULK WRITE
+    # -------------------------
+    if point_rows:
+        ids = db.execute(
+            insert(GPSLocation).returning(GPSLocation.id, sort_by_parameter_order=True),
+            point_rows,
+        ).scalars().all()
+
+        for index, point_id, row in zip(point_meta, ids, point_rows):
+            accepted.append({"index": index, "id": point_id, **row})
+
+    if notif_rows:
+        db.execute(insert(MovementNotification), notif_rows)
+
+    if point_rows or notif_rows:
+        db.commit()
+
+    # per rider in time order, as built above
+    for item in accepted:
+        odometer.record(LastFix(
+            item["id"], item["rider_id"], item["latitude"], item["longitude"], item["timestamp"]
+        ))
+
+    accepted.sort(key=lambda x: x["index"])
+    rejected.sort(key=lambda x: x["index"])
+    return accepted, rejected
@@ -0,0 +1,218 @@
+# backend/app/services/gps_partitions.py
+"""
+Range partitions for gps_locations (Postgres only).
+
+gps_locations is partitioned on `timestamp`, one partition per day or month
+(GPS_PARTITION_INTERVAL). Partition names carry their start date
+(gps_locations_p20261018 / gps_locations_p202610) so maintenance can work
+out their bounds without parsing catalog expressions. The interval must
+stay the same once partitions exist, otherwise new bounds overlap old ones.
+
+A DEFAULT partition (gps_locations_default) catches rows no range covers,
+e.g. a device clock far in the future or a missed maintenance run, so the
+insert still succeeds. Creating the range for such rows later moves them
+out of the default partition.
+
+Run maintenance from cron / a scheduler:
+
+    python -m app.services.gps_partitions
+"""
+
+import argparse
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+
+from app.core.config import (
+    GPS_PARTITION_INTERVAL,
+    GPS_PARTITIONS_AHEAD,
+    GPS_RETENTION_DAYS,
+    GPS_RETENTION_MODE,
+)
+
+
+PARENT_TABLE = "gps_locations"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+
+
+# -------------------------------
+# Period helpers
+# -------------------------------
+def period_start(day: date, interval=GPS_PARTITION_INTERVAL):
+    if interval == "day":
+        return day
+    return day.replace(day=1)
+
+
+def next_period(start: date, interval=GPS_PARTITION_INTERVAL):
+    if interval == "day":
+        return start + timedelta(days=1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_name(start: date, interval=GPS_PARTITION_INTERVAL):
+    fmt = "%Y%m%d" if interval == "day" else "%Y%m"
+    return f"{PARENT_TABLE}_p{start.strftime(fmt)}"
+
+
+def _parse_partition_start(name, interval=GPS_PARTITION_INTERVAL):
+    suffix = name.rsplit("_p", 1)[-1]
+    try:
+        if interval == "day":
+            return datetime.strptime(suffix, "%Y%m%d").date()
+        return datetime.strptime(suffix, "%Y%m").date()
+    except ValueError:
+        return None
+
+
+# -------------------------------
+# Catalog
+# -------------------------------
+def is_partitioned(conn):
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :name)"
+    ), {"name": PARENT_TABLE}).scalar()
+
+
+def list_partitions(conn):
+    rows = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :name ORDER BY child.relname"
+    ), {"name": PARENT_TABLE}).all()
+    return [r[0] for r in rows]
+
+
+# -------------------------------
+# Maintenance
+# -------------------------------
+def create_default_partition(conn):
+    conn.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{DEFAULT_PARTITION}" PARTITION OF {PARENT_TABLE} DEFAULT'
+    ))
+
+
+def _table_exists(conn, name):
+    return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f'"{name}"'}).scalar()
+
+
+def _default_has_rows(conn, lower: date, upper: date):
+    if not _table_exists(conn, DEFAULT_PARTITION):
+        return False
+    return conn.execute(text(
+        f'SELECT EXISTS (SELECT 1 FROM "{DEFAULT_PARTITION}" '
+        "WHERE timestamp >= :lower AND timestamp < :upper)"
+    ), {"lower": lower, "upper": upper}).scalar()
+
+
+def create_partitions(conn, start: date, end: date, interval=GPS_PARTITION_INTERVAL):
+    """
+    Creates every partition covering [start, end]. Idempotent.
+    The (rider_id, timestamp) index is inherited from the parent.
+    """
+    created = []
+    current = period_start(start, interval)
+
+    while current <= end:
+        upper = next_period(current, interval)
+        name = partition_name(current, interval)
+        bounds = f"FOR VALUES FROM ('{current.isoformat()}') TO ('{upper.isoformat()}')"
+
+        if _table_exists(conn, name) or not _default_has_rows(conn, current, upper):
+            conn.execute(text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} {bounds}'
+            ))
+        else:
+            # Postgres refuses a range whose rows sit in the default
+            # partition, so move them into the new table before attaching it
+            conn.execute(text(
+                f'CREATE TABLE "{name}" (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)'
+            ))
+            conn.execute(text(
+                f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+                "WHERE timestamp >= :lower AND timestamp < :upper RETURNING *) "
+                f'INSERT INTO "{name}" SELECT * FROM moved'
+            ), {"lower": current, "upper": upper})
+            conn.execute(text(f'ALTER TABLE {PARENT_TABLE} ATTACH PARTITION "{name}" {bounds}'))
+
+        created.append(name)
+        current = upper
+
+    return created
+
+
+def ensure_future_partitions(conn, today=None, ahead=GPS_PARTITIONS_AHEAD, interval=GPS_PARTITION_INTERVAL):
+    today = today or datetime.utcnow().date()
+    end = period_start(today, interval)
+    for _ in range(ahead):
+        end = next_period(end, interval)
+    return create_partitions(conn, today, end, interval)
+
+
+def expire_partitions(
+    conn,
+    retention_days=GPS_RETENTION_DAYS,
+    mode=GPS_RETENTION_MODE,
+    today=None,
+    interval=GPS_PARTITION_INTERVAL,
+):
+    """
+    Detaches (or drops) partitions whose whole range is older than the
+    retention period. Detached tables stay around for archiving.
+    """
+    if retention_days <= 0:
+        return []
+
+    today = today or datetime.utcnow().date()
+    cutoff = today - timedelta(days=retention_days)
+    expired = []
+
+    for name in list_partitions(conn):
+        start = _parse_partition_start(name, interval)
+        if start is None or next_period(start, interval) > cutoff:
+            continue
+
+        if mode == "drop":
+            conn.execute(text(f'DROP TABLE "{name}"'))
+        else:
+            conn.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}"'))
+        expired.append(name)
+
+    return expired
+
+
+def run_maintenance(engine, retention_days=GPS_RETENTION_DAYS, mode=GPS_RETENTION_MODE, ahead=GPS_PARTITIONS_AHEAD):
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return None
+        create_default_partition(conn)
+        created = ensure_future_partitions(conn, ahead=ahead)
+        expired = expire_partitions(conn, retention_days=retention_days, mode=mode)
+    return {"created": created, "expired": expired}
+
+
+if __name__ == "__main__":
+    from app.db.session import engine
+
+    parser = argparse.ArgumentParser(description="gps_locations partition maintenance")
+    parser.add_argument("--ahead", type=int, default=GPS_PARTITIONS_AHEAD)
+    parser.add_argument("--retention-days", type=int, default=GPS_RETENTION_DAYS)
+    parser.add_argument("--mode", choices=["detach", "drop"], default=GPS_RETENTION_MODE)
+    args = parser.parse_args()
+
+    result = run_maintenance(
+        engine,
+        retention_days=args.retention_days,
+        mode=args.mode,
+        ahead=args.ahead,
+    )
+    if result is None:
+        print("gps_locations is not partitioned, run `alembic upgrade head` first")
+    else:
+        print(f"created/kept: {', '.join(result['created']) or '-'}")
+        print(f"expired ({args.mode}): {', '.join(result['expired']) or '-'}")
@@ -0,0 +1,147 @@
+# backend/app/services/last_fix_cache.py
+
+import threading
+from collections import OrderedDict, namedtuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import LAST_FIX_CACHE_SIZE
+from app.models.gps import GPSLocation
+
+
+LastFix = namedtuple("LastFix", "id rider_id latitude longitude timestamp")
+
+_COLUMNS = (
+    GPSLocation.id,
+    GPSLocation.rider_id,
+    GPSLocation.latitude,
+    GPSLocation.longitude,
+    GPSLocation.timestamp,
+)
+
+
+def query_last_fixes(db: Session, rider_ids=None):
+    """
+    Latest stored point per rider in one query
+    (DISTINCT ON for Postgres, max-timestamp join elsewhere).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        q = (
+            db.query(*_COLUMNS)
+            .distinct(GPSLocation.rider_id)
+            .order_by(GPSLocation.rider_id, GPSLocation.timestamp.desc(), GPSLocation.id.desc())
+        )
+        if rider_ids is not None:
+            q = q.filter(GPSLocation.rider_id.in_(rider_ids))
+        return [LastFix(*row) for row in q.all()]
+
+    latest = db.query(
+        GPSLocation.rider_id,
+        func.max(GPSLocation.timestamp).label("timestamp"),
+    )
+    if rider_ids is not None:
+        latest = latest.filter(GPSLocation.rider_id.in_(rider_ids))
+    latest = latest.group_by(GPSLocation.rider_id).subquery()
+
+    rows = (
+        db.query(*_COLUMNS)
+        .join(
+            latest,
+            (GPSLocation.rider_id == latest.c.rider_id)
+            & (GPSLocation.timestamp == latest.c.timestamp),
+        )
+        .order_by(GPSLocation.id)
+        .all()
+    )
+    # ties on timestamp: highest id wins
+    return list({row.rider_id: LastFix(*row) for row in rows}.values())
+
+
+class LastFixCache:
+    """
+    Last known fix per rider, shared by every ingest path.
+
+    Writers call `put` (through `odometer.record`) after storing a point; readers use `get_many` /
+    `get_or_load`, which fall back to the DB only for riders that are not
+    cached (never seen, or evicted by the LRU bound).
+    """
+
+    def __init__(self, max_size=LAST_FIX_CACHE_SIZE):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, rider_id):
+        with self._lock:
+            fix = self._data.get(rider_id)
+            if fix is not None:
+                self._data.move_to_end(rider_id)
+            return fix
+
+    def put(self, fix: LastFix):
+        with self._lock:
+            current = self._data.get(fix.rider_id)
+            # late writes (e.g. buffered flushes) never replace a newer fix
+            if current is not None and current.timestamp > fix.timestamp:
+                self._data.move_to_end(fix.rider_id)
+                return
+            self._data[fix.rider_id] = fix
+            self._data.move_to_end(fix.rider_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def _split(self, rider_ids):
+        found = {}
+        missing = []
+        for rider_id in rider_ids:
+            fix = self.get(rider_id)
+            if fix is None:
+                missing.append(rider_id)
+            else:
+                found[rider_id] = fix
+        return found, missing
+
+    def _fill(self, found, fixes):
+        for fix in fixes:
+            self.put(fix)
+            found[fix.rider_id] = fix
+        return found
+
+    def get_many(self, db: Session, rider_ids):
+        """
+        {rider_id: LastFix} for riders that have any stored point.
+        """
+        found, missing = self._split(rider_ids)
+        if missing:
+            self._fill(found, query_last_fixes(db, missing))
+        return found
+
+    def get_or_load(self, db: Session, rider_id):
+        return self.get_many(db, [rider_id]).get(rider_id)
+
+    async def aget_many(self, db: AsyncSession, rider_ids):
+        found, missing = self._split(rider_ids)
+        if missing:
+            self._fill(found, await db.run_sync(query_last_fixes, missing))
+        return found
+
+    async def aget_or_load(self, db: AsyncSession, rider_id):
+        return (await self.aget_many(db, [rider_id])).get(rider_id)
+
+    def warm(self, db: Session):
+        fixes = sorted(query_last_fixes(db), key=lambda f: f.timestamp)
+        # most recent riders end up at the MRU end
+        for fix in fixes[-self.max_size:]:
+            self.put(fix)
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+last_fix_cache = LastFixCache()
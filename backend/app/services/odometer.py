@@ -0,0 +1,148 @@
+# backend/app/services/odometer.py
+
+import asyncio
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy.orm import Session
+
+from app.core.config import ODOMETER_FLUSH_SECONDS
+from app.db.session import AsyncSessionLocal
+from app.models.daily_distance import HourlyDistance, DailyDistance, WeeklyDistance
+from app.services.distance import upsert_distance, hour_floor, week_start
+from app.services.distance_cache import distance_cache
+from app.services.distance_engine import segment_since
+from app.services.last_fix_cache import LastFix, last_fix_cache
+from app.utils.gps import haversine
+from app.utils.tasks import cancel_and_wait
+
+
+class Odometer:
+    """
+    Running distance per rider and hour, fed by the ingest paths.
+
+    Each stored fix adds the segment from the rider's previous fix (taken
+    from the last-fix cache) to a pending (rider, hour) total. A background
+    task adds pending totals to the hourly, daily and weekly tables every
+    few seconds, in one transaction, so the three always agree.
+
+    A segment counts in the hour of its fix, also when it started the day
+    before; a longer gap, and fixes older than the rider's last one, are
+    left out, as they are when a day is rebuilt from raw points. Anything
+    missed (cold cache, several workers writing the same rider) is
+    repaired by `compute_daily_distance` / the nightly rollup.
+    """
+
+    def __init__(self, flush_seconds=ODOMETER_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._pending = defaultdict(float)      # (rider_id, hour) -> km
+        self._flushing = {}                     # batch being written
+        self._lock = threading.Lock()
+        self._task = None
+
+    # -------------------------------
+    # Ingest side
+    # -------------------------------
+    def record(self, fix: LastFix):
+        """
+        Counts the segment ending at `fix` and makes it the rider's last fix.
+        Call once per stored point, after the commit, in time order.
+        """
+        prev = last_fix_cache.get(fix.rider_id)
+        last_fix_cache.put(fix)
+
+        if prev is not None and fix.timestamp < prev.timestamp:
+            # late fix: changes raw-point answers around it, up to the
+            # next day's first segment
+            day = fix.timestamp.date()
+            distance_cache.invalidate_day(fix.rider_id, day)
+            distance_cache.invalidate_day(fix.rider_id, day + timedelta(days=1))
+            return 0.0
+        if prev is None or fix.timestamp == prev.timestamp:
+            return 0.0
+        if prev.timestamp < segment_since(fix.timestamp):
+            return 0.0
+
+        km = haversine(prev.latitude, prev.longitude, fix.latitude, fix.longitude)
+        with self._lock:
+            self._pending[(fix.rider_id, hour_floor(fix.timestamp))] += km
+        distance_cache.extend(fix.rider_id, fix.timestamp, km)
+        return km
+
+    # -------------------------------
+    # Read side
+    # -------------------------------
+    def pending(self):
+        """
+        [(rider_id, hour, km)] not yet in the distance tables.
+        """
+        with self._lock:
+            items = list(self._pending.items()) + list(self._flushing.items())
+        return [(rider_id, hour, km) for (rider_id, hour), km in items]
+
+    def discard(self, rider_id, day: date):
+        with self._lock:
+            for key in [k for k in self._pending if k[0] == rider_id and k[1].date() == day]:
+                del self._pending[key]
+
+    # -------------------------------
+    # Flusher
+    # -------------------------------
+    async def start(self):
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        # a flush interrupted here puts its batch back before we flush again
+        await cancel_and_wait(task)
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
+
+    async def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            batch = self._flushing = dict(self._pending)
+            self._pending.clear()
+
+        written = False
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.run_sync(_add_increments, batch)
+                await db.commit()
+            written = True
+        except Exception as e:
+            print(f"⚠️ Odometer flush failed, retrying next tick: {e}")
+        finally:
+            with self._lock:
+                if not written:
+                    # failed or cancelled: back into pending
+                    for key, km in batch.items():
+                        self._pending[key] += km
+                self._flushing = {}
+
+
+def _add_increments(db: Session, batch):
+    days = defaultdict(float)
+    weeks = defaultdict(float)
+    for (rider_id, hour), km in batch.items():
+        days[(rider_id, hour.date())] += km
+        weeks[(rider_id, week_start(hour.date()))] += km
+
+    upsert_distance(db, HourlyDistance, [
+        {"rider_id": r, "hour": hour, "distance_km": km} for (r, hour), km in batch.items()
+    ], increment=True)
+    upsert_distance(db, DailyDistance, [
+        {"rider_id": r, "date": day, "distance_km": km} for (r, day), km in days.items()
+    ], increment=True)
+    upsert_distance(db, WeeklyDistance, [
+        {"rider_id": r, "week_start": monday, "distance_km": km} for (r, monday), km in weeks.items()
+    ], increment=True)
+
+
+odometer = Odometer()
@@ -0,0 +1,110 @@
+# backend/app/services/routes.py
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import ROUTE_CACHE_SIZE
+from app.services.distance_engine import afetch_points
+from app.utils.polyline import encode, meters_per_pixel, simplify
+
+
+class RouteCache:
+    """
+    LRU of built routes. Only simplified routes of one closed UTC day
+    are cached (see `cacheable`): no new points arrive for them, and
+    each entry stays small.
+    """
+
+    def __init__(self, max_size=ROUTE_CACHE_SIZE):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            route = self._data.get(key)
+            if route is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+            return route
+
+    def put(self, key, route):
+        with self._lock:
+            self._data[key] = route
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def stats(self):
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+route_cache = RouteCache()
+
+
+def _tolerance(rows, tolerance_m, zoom):
+    if tolerance_m is not None:
+        return tolerance_m
+    if zoom is not None and rows:
+        # about one pixel at that zoom
+        return meters_per_pixel(rows[0].latitude, zoom)
+    return 0
+
+
+def build_route(rows, tolerance_m=None, zoom=None, fmt="json"):
+    """
+    Point rows (time order) -> simplified route.
+    fmt="json": [{lat, lng, time}]; fmt="polyline": encoded polyline.
+    """
+    lats = [r.latitude for r in rows]
+    lons = [r.longitude for r in rows]
+    keep = simplify(lats, lons, _tolerance(rows, tolerance_m, zoom))
+
+    if fmt == "polyline":
+        return {
+            "polyline": encode([lats[i] for i in keep], [lons[i] for i in keep]),
+            "points": len(keep),
+            "raw_points": len(rows),
+            "start_time": rows[0].timestamp if rows else None,
+            "end_time": rows[-1].timestamp if rows else None,
+        }
+
+    return [{
+        "lat": lats[i],
+        "lng": lons[i],
+        "time": rows[i].timestamp
+    } for i in keep]
+
+
+def cacheable(start, end, tolerance_m=None, zoom=None, now=None):
+    """
+    True for a simplified route of exactly one UTC day that has ended.
+    Raw routes and arbitrary ranges are built on every request.
+    """
+    today = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    midnight = start == start.replace(hour=0, minute=0, second=0, microsecond=0)
+    simplified = bool(tolerance_m) or zoom is not None
+    return midnight and end - start == timedelta(days=1) and end <= today and simplified
+
+
+async def rider_route(db: AsyncSession, rider_id, start, end, tolerance_m=None, zoom=None, fmt="json"):
+    cached = cacheable(start, end, tolerance_m, zoom)
+    key = (rider_id, start, tolerance_m, zoom, fmt)
+
+    if cached:
+        route = route_cache.get(key)
+        if route is not None:
+            return route
+
+    rows = await afetch_points(db, [rider_id], start=start, end=end)
+    route = build_route(rows, tolerance_m, zoom, fmt)
+
+    if cached:
+        route_cache.put(key, route)
+    return route
@@ -6,10 +6,11 @@ from sqlalchemy import desc
 
 from app.models.shift import ShiftBooking
 from app.models.shift import ShiftTemplate
-from app.models.gps import GpsLocation
-from app.models.redzone import RedZone
-from app.models.notifications import Notification
-from app.routers.tracking import compute
+from app.models.gps import GPSLocation
+from app.models.notifications import MovementNotification
+from app.red_zone_service import get_zone_for_rider
+from app.services.last_fix_cache import last_fix_cache
+from app.services.distance_engine import fetch_points, rows_to_arrays, path_km
 
 
 MIN_PARTIAL_HOURS = 2
@@ -25,7 +26,8 @@ def is_gps_data_valid(gps_points):
     if len(gps_points) < 2:
         return True
 
-    total_distance = compute(gps_points)
+    _, lat, lon = rows_to_arrays(gps_points)
+    total_distance = path_km(lat, lon)
     total_time_hours = (
         (gps_points[-1].timestamp - gps_points[0].timestamp).total_seconds() / 3600
     )
@@ -72,16 +74,12 @@ def calculate_shift_metrics(db: Session, booking_id):
     if not shift:
         return
 
-    # Fetch GPS points during shift window
-    gps_points = (
-        db.query(GpsLocation)
-        .filter(
-            GpsLocation.rider_id == booking.rider_id,
-            GpsLocation.timestamp >= shift.start_time,
-            GpsLocation.timestamp <= shift.end_time,
-        )
-        .order_by(GpsLocation.timestamp.asc())
-        .all()
+    # Fetch GPS points during shift window (plain rows, end inclusive)
+    gps_points = fetch_points(
+        db,
+        [booking.rider_id],
+        start=shift.start_time,
+        end=shift.end_time + timedelta(microseconds=1),
     )
 
     # -------------------------
@@ -141,7 +139,8 @@ def calculate_shift_metrics(db: Session, booking_id):
     # -------------------------
     # LOW PRODUCTIVITY CHECK (NEW)
     # -------------------------
-    total_km = compute(gps_points)
+    _, lat, lon = rows_to_arrays(gps_points)
+    total_km = path_km(lat, lon)
     km_per_hour = total_km / worked_hours if worked_hours > 0 else 0
 
     if km_per_hour < MIN_KM_PER_HOUR:
@@ -164,10 +163,10 @@ def check_zone_and_notify(db: Session, rider_id):
     - or outside red zone
     """
 
-    last_gps = (
-        db.query(GpsLocation)
-        .filter(GpsLocation.rider_id == rider_id)
-        .order_by(desc(GpsLocation.timestamp))
+    last_gps = last_fix_cache.get(rider_id) or (
+        db.query(GPSLocation)
+        .filter(GPSLocation.rider_id == rider_id)
+        .order_by(desc(GPSLocation.timestamp))
         .first()
     )
 
@@ -180,26 +179,18 @@ def check_zone_and_notify(db: Session, rider_id):
     if last_gps.timestamp < now - timedelta(minutes=IDLE_MINUTES):
         message = "You are idle. Move towards a high-demand zone to get more orders."
     else:
-        # Check if inside active red zone
-        red_zones = db.query(RedZone).filter(RedZone.active == True).all()
-
-        inside_red_zone = False
-        for zone in red_zones:
-            if zone.contains(last_gps.latitude, last_gps.longitude):
-                inside_red_zone = True
-                break
-
-        if inside_red_zone:
+        # Check if inside an active red zone (in-memory zone catalogue)
+        if get_zone_for_rider(last_gps.latitude, last_gps.longitude):
             return
 
         message = "High demand nearby. Move towards a red zone to increase orders."
 
     # Notification cooldown
     recent_notification = (
-        db.query(Notification)
+        db.query(MovementNotification)
         .filter(
-            Notification.rider_id == rider_id,
-            Notification.created_at >= now - timedelta(minutes=NOTIFICATION_COOLDOWN_MINUTES),
+            MovementNotification.rider_id == rider_id,
+            MovementNotification.created_at >= now - timedelta(minutes=NOTIFICATION_COOLDOWN_MINUTES),
         )
         .first()
     )
@@ -207,10 +198,12 @@ def check_zone_and_notify(db: Session, rider_id):
     if recent_notification:
         return
 
-    notification = Notification(
+    notification = MovementNotification(
         rider_id=rider_id,
+        last_lat=last_gps.latitude,
+        last_lng=last_gps.longitude,
+        minutes_stopped=int((now - last_gps.timestamp).total_seconds() // 60),
         message=message,
-        type="ZONE_NUDGE",
     )
 
     db.add(notification)
@@ -0,0 +1,132 @@
+# backend/app/services/zone_pressure.py
+
+import asyncio
+import time
+from collections import namedtuple
+
+from app.core.config import ZONE_PRESSURE_INTERVAL_MS
+from app.red_zone_service import zone_catalogue, zone_occupancy
+from app.utils.tasks import cancel_and_wait
+
+
+ZonePressure = namedtuple(
+    "ZonePressure",
+    "version catalogue riders zones loads computed_at compute_ms",
+)
+
+
+def pressure_color(pressure):
+    if pressure < 0.8:
+        return "green"
+    if pressure <= 1.2:
+        return "yellow"
+    return "red"
+
+
+def build_snapshot(version, catalogue, loads, riders, compute_ms=0.0):
+    zones = tuple(
+        {
+            "id": zone["id"],
+            "lat": zone["lat"],
+            "lon": zone["lon"],
+            "radius": zone["radius"],
+            "weight": zone["weight"],
+            "pressure": loads.get(zone["id"], {}).get("pressure", 0),
+            "color": pressure_color(loads.get(zone["id"], {}).get("pressure", 0)),
+        }
+        for zone in catalogue.zones
+    )
+    return ZonePressure(version, catalogue, riders, zones, loads, time.time(), compute_ms)
+
+
+class ZonePressureScheduler:
+    """
+    Recomputes zone loads every ZONE_PRESSURE_INTERVAL_MS and publishes
+    them as one ZonePressure snapshot. Readers (redirects, the status
+    endpoint, the admin feed) all get the same answer for a given
+    version, and none of them computes anything.
+
+    A snapshot is never changed after it is published. The version
+    only moves when the zones or their loads changed, so consumers can
+    skip resending an unchanged picture.
+    """
+
+    def __init__(self, interval_ms=ZONE_PRESSURE_INTERVAL_MS):
+        self.interval_seconds = interval_ms / 1000
+        self._snapshot = None
+        self._task = None
+        self.runs = 0
+        self.failures = 0
+
+    async def start(self):
+        if not self._task:
+            await asyncio.to_thread(self.refresh)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        await cancel_and_wait(task)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                # the store may be shared memory or redis
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                self.failures += 1
+                print(f"⚠️ Zone pressure refresh failed: {e}")
+
+    def refresh(self):
+        started = time.perf_counter()
+        catalogue = zone_catalogue()
+        loads = zone_occupancy.loads(catalogue)
+        riders = len(zone_occupancy.store)
+        compute_ms = (time.perf_counter() - started) * 1000
+
+        previous = self._snapshot
+        version = 1
+        if previous is not None:
+            changed = previous.catalogue is not catalogue or previous.loads != loads
+            version = previous.version + 1 if changed else previous.version
+
+        self._snapshot = build_snapshot(version, catalogue, loads, riders, compute_ms)
+        self.runs += 1
+        return self._snapshot
+
+    # -------------------------------
+    # Read side
+    # -------------------------------
+    def snapshot(self):
+        """
+        Latest snapshot (computed on the spot if the task never ran).
+        """
+        return self._snapshot or self.refresh()
+
+    def nearest_under_served(self, lat, lon):
+        """
+        Nearest zone with pressure < 1.0 in the current snapshot.
+        """
+        snapshot = self.snapshot()
+
+        def under_served(zone):
+            load = snapshot.loads.get(zone["id"])
+            return bool(load) and load["pressure"] < 1.0
+
+        return snapshot.catalogue.grid.nearest(lat, lon, accept=under_served)
+
+    def metrics(self):
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "catalogue_version": snapshot.catalogue.version if snapshot else None,
+            "riders": snapshot.riders if snapshot else 0,
+            "age_ms": round((time.time() - snapshot.computed_at) * 1000, 1) if snapshot else None,
+            "compute_ms": round(snapshot.compute_ms, 3) if snapshot else None,
+            "interval_ms": self.interval_seconds * 1000,
+            "runs": self.runs,
+            "failures": self.failures,
+        }
+
+
+zone_pressure = ZonePressureScheduler()
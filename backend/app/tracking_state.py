@@ -1,14 +1,554 @@
-# tracking_state.py (NEW, SMALL FILE)
-import time
-
-rider_state = {}
+# tracking_state.py
 """
+Live rider state, one record per connected rider:
+
 {
   rider_id: {
     lat,
     lon,
     last_move_time,
-    last_update
+    last_update,
+    last_alert: {STATIONARY, REDIRECT, POST_DELIVERY}
   }
 }
+
+`rider_state` is a RiderStateStore. The default keeps the dict in process;
+"shm" shares it between uvicorn workers on one host and "redis" between
+hosts (RIDER_STATE_BACKEND).
+
+Each store also keeps the red zone every rider is in and a rider count
+per zone, updated as riders change zone (`set_zone`), so zone loads are
+read without classifying every rider again.
 """
+
+import struct
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
+
+from app.core.config import (
+    RIDER_STATE_BACKEND,
+    RIDER_STATE_SHM_NAME,
+    RIDER_STATE_SHM_SLOTS,
+    RIDER_STATE_REDIS_URL,
+    RIDER_STATE_REDIS_PREFIX,
+)
+from app.utils.geo import distance_meters
+
+
+MOVE_THRESHOLD_METERS = 20
+ALERT_TYPES = ("STATIONARY", "REDIRECT", "POST_DELIVERY")
+
+
+def _new_state(lat, lon, now):
+    return {
+        "lat": lat,
+        "lon": lon,
+        "last_move_time": now,
+        "last_update": now,
+        "last_alert": {kind: 0 for kind in ALERT_TYPES},
+    }
+
+
+def _apply_fix(state, lat, lon, now, move_threshold):
+    """
+    Position only moves when the rider really moved, so GPS jitter
+    does not reset the idle timer.
+    """
+    if state is None:
+        return _new_state(lat, lon, now)
+
+    if distance_meters(state["lat"], state["lon"], lat, lon) > move_threshold:
+        state["last_move_time"] = now
+        state["lat"] = lat
+        state["lon"] = lon
+
+    state["last_update"] = now
+    return state
+
+
+class RiderStateStore(ABC):
+    """
+    Interface every backend implements. Updates are atomic per rider;
+    `positions()` is the bulk read used for zone loads.
+
+    `blocking` stores do network I/O on every call: async code runs
+    their methods in a worker thread instead of on the event loop.
+    """
+
+    blocking = False
+
+    @abstractmethod
+    def update_position(self, rider_id, lat, lon, now, move_threshold=MOVE_THRESHOLD_METERS):
+        """Applies a fix and returns the rider's new state."""
+
+    @abstractmethod
+    def get(self, rider_id):
+        """The rider's state, or None."""
+
+    @abstractmethod
+    def mark_alert(self, rider_id, kind, now):
+        """Stamps the time an alert of `kind` was sent."""
+
+    @abstractmethod
+    def remove(self, rider_id):
+        """Forgets the rider and takes them out of their zone."""
+
+    @abstractmethod
+    def positions(self):
+        """{rider_id: {"lat", "lon"}} for every rider."""
+
+    @abstractmethod
+    def set_zone(self, rider_id, zone_id):
+        """
+        Records the zone the rider is in (None = none) and moves them
+        between zone counters. Returns the previous zone.
+        """
+
+    @abstractmethod
+    def zone_counts(self):
+        """{zone_id: riders} for zones with at least one rider."""
+
+    def __len__(self):
+        return len(self.positions())
+
+    def __contains__(self, rider_id):
+        return self.get(rider_id) is not None
+
+
+# -------------------------------
+# In-process (default)
+# -------------------------------
+class InMemoryRiderStateStore(RiderStateStore):
+
+    def __init__(self):
+        self._data = {}
+        self._zones = {}                        # rider_id -> zone_id
+        self._zone_counts = defaultdict(int)    # zone_id -> riders
+        self._lock = threading.Lock()
+
+    def update_position(self, rider_id, lat, lon, now, move_threshold=MOVE_THRESHOLD_METERS):
+        with self._lock:
+            state = _apply_fix(self._data.get(rider_id), lat, lon, now, move_threshold)
+            self._data[rider_id] = state
+            return state
+
+    def get(self, rider_id):
+        return self._data.get(rider_id)
+
+    def mark_alert(self, rider_id, kind, now):
+        with self._lock:
+            state = self._data.get(rider_id)
+            if state is not None:
+                state["last_alert"][kind] = now
+
+    def remove(self, rider_id):
+        with self._lock:
+            self._data.pop(rider_id, None)
+            self._move_zone(self._zones.pop(rider_id, None), None)
+
+    def positions(self):
+        return {rid: {"lat": s["lat"], "lon": s["lon"]} for rid, s in list(self._data.items())}
+
+    def set_zone(self, rider_id, zone_id):
+        with self._lock:
+            if rider_id not in self._data:
+                return None
+            previous = self._zones.get(rider_id)
+            self._zones[rider_id] = zone_id
+            self._move_zone(previous, zone_id)
+            return previous
+
+    def _move_zone(self, old, new):
+        if old == new:
+            return
+        if old is not None:
+            self._zone_counts[old] -= 1
+            if self._zone_counts[old] <= 0:
+                del self._zone_counts[old]
+        if new is not None:
+            self._zone_counts[new] += 1
+
+    def zone_counts(self):
+        with self._lock:
+            return dict(self._zone_counts)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, rider_id):
+        return rider_id in self._data
+
+
+# -------------------------------
+# Shared memory (workers on one host)
+# -------------------------------
+class SharedMemoryRiderStateStore(RiderStateStore):
+    """
+    Fixed-size open-addressing table in a named shared memory block.
+    Every worker attaches to the same block; a flock on a lock file
+    serialises readers and writers across processes. A second, small table after
+    the riders holds the per-zone counters.
+    """
+
+    HEADER = struct.Struct("<II")       # magic, slot count
+    SLOT = struct.Struct("<B32s7d32s")  # flag, rider_id, lat, lon, move, update, 3 alerts, zone_id
+    ZONE_SLOT = struct.Struct("<32sq")  # zone_id, riders
+    ZONE_SLOTS = 1024
+    MAGIC = 0x52535432
+    EMPTY, USED, DELETED = 0, 1, 2
+    ID_BYTES = 32
+
+    def __init__(self, name=RIDER_STATE_SHM_NAME, slots=RIDER_STATE_SHM_SLOTS):
+        import fcntl
+        from multiprocessing import shared_memory, resource_tracker
+
+        self._fcntl = fcntl
+        self._lock_file = open(f"/tmp/{name}.lock", "a+")
+        self._thread_lock = threading.Lock()
+
+        # creation and header init happen under the host-wide lock
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            try:
+                size = self.HEADER.size + self.SLOT.size * slots + self.ZONE_SLOT.size * self.ZONE_SLOTS
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+                self.HEADER.pack_into(self._shm.buf, 0, self.MAGIC, slots)
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=name)
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+        magic, self.slots = self.HEADER.unpack_from(self._shm.buf, 0)
+        if magic != self.MAGIC:
+            raise RuntimeError(f"shared memory block {name} is not a rider state table")
+
+        # the block outlives any single worker
+        resource_tracker.unregister(self._shm._name, "shared_memory")
+
+        self._buf = self._shm.buf
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            self._fcntl.flock(self._lock_file, self._fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                self._fcntl.flock(self._lock_file, self._fcntl.LOCK_UN)
+
+    def _key(self, rider_id):
+        key = str(rider_id).encode()
+        if len(key) > self.ID_BYTES:
+            raise ValueError(f"rider id longer than {self.ID_BYTES} bytes: {rider_id}")
+        return key.ljust(self.ID_BYTES, b"\0")
+
+    def _offset(self, index):
+        return self.HEADER.size + index * self.SLOT.size
+
+    def _read(self, index):
+        return self.SLOT.unpack_from(self._buf, self._offset(index))
+
+    def _write(self, index, flag, key, values, zone=b""):
+        self.SLOT.pack_into(self._buf, self._offset(index), flag, key, *values, zone)
+
+    def _find(self, key, for_insert=False):
+        start = zlib.crc32(key) % self.slots
+        first_free = None
+
+        for step in range(self.slots):
+            index = (start + step) % self.slots
+            flag, slot_key = self._read(index)[:2]
+
+            if flag == self.EMPTY:
+                if for_insert:
+                    return first_free if first_free is not None else index
+                return None
+            if flag == self.DELETED:
+                if first_free is None:
+                    first_free = index
+            elif slot_key == key:
+                return index
+
+        if for_insert and first_free is not None:
+            return first_free
+        if for_insert:
+            raise RuntimeError("rider state shared memory is full")
+        return None
+
+    @staticmethod
+    def _to_state(values):
+        lat, lon, move, update, *alerts = values
+        return {
+            "lat": lat,
+            "lon": lon,
+            "last_move_time": move,
+            "last_update": update,
+            "last_alert": dict(zip(ALERT_TYPES, alerts)),
+        }
+
+    @staticmethod
+    def _to_values(state):
+        return (
+            state["lat"], state["lon"], state["last_move_time"], state["last_update"],
+            *(state["last_alert"][kind] for kind in ALERT_TYPES),
+        )
+
+    # API -----------------------------
+    def update_position(self, rider_id, lat, lon, now, move_threshold=MOVE_THRESHOLD_METERS):
+        key = self._key(rider_id)
+        with self._locked():
+            index = self._find(key)
+            slot = self._read(index) if index is not None else None
+            current = self._to_state(slot[2:9]) if slot is not None else None
+            state = _apply_fix(current, lat, lon, now, move_threshold)
+            if index is None:
+                index = self._find(key, for_insert=True)
+            self._write(index, self.USED, key, self._to_values(state), slot[9] if slot else b"")
+            return state
+
+    def get(self, rider_id):
+        key = self._key(rider_id)
+        # readers lock too: a slot read mid-write would mix two fixes
+        with self._locked():
+            index = self._find(key)
+            if index is None:
+                return None
+            return self._to_state(self._read(index)[2:9])
+
+    def mark_alert(self, rider_id, kind, now):
+        key = self._key(rider_id)
+        with self._locked():
+            index = self._find(key)
+            if index is None:
+                return
+            slot = self._read(index)
+            state = self._to_state(slot[2:9])
+            state["last_alert"][kind] = now
+            self._write(index, self.USED, key, self._to_values(state), slot[9])
+
+    def remove(self, rider_id):
+        key = self._key(rider_id)
+        with self._locked():
+            index = self._find(key)
+            if index is not None:
+                self._bump_zone(self._read(index)[9], -1)
+                self._write(index, self.DELETED, key, (0.0,) * 7)
+
+    def positions(self):
+        result = {}
+        with self._locked():
+            table = bytes(self._buf[self.HEADER.size:self._offset(self.slots)])
+        for flag, key, lat, lon, *_ in self.SLOT.iter_unpack(table):
+            if flag == self.USED:
+                result[key.rstrip(b"\0").decode()] = {"lat": lat, "lon": lon}
+        return result
+
+    def set_zone(self, rider_id, zone_id):
+        key = self._key(rider_id)
+        zone = self._key(zone_id) if zone_id is not None else bytes(self.ID_BYTES)
+        with self._locked():
+            index = self._find(key)
+            if index is None:
+                return None
+            slot = self._read(index)
+            previous = slot[9]
+            if previous != zone:
+                self._bump_zone(previous, -1)
+                self._bump_zone(zone, 1)
+                self._write(index, self.USED, key, slot[2:9], zone)
+            return self._decode(previous)
+
+    def zone_counts(self):
+        counts = {}
+        with self._locked():
+            table = bytes(self._buf[self._zone_offset(0):self._zone_offset(self.ZONE_SLOTS)])
+        for zone, riders in self.ZONE_SLOT.iter_unpack(table):
+            if riders > 0:
+                counts[self._decode(zone)] = riders
+        return counts
+
+    @staticmethod
+    def _decode(key):
+        key = key.rstrip(b"\0")
+        return key.decode() if key else None
+
+    def _zone_offset(self, index):
+        return self._offset(self.slots) + index * self.ZONE_SLOT.size
+
+    def _bump_zone(self, zone, delta):
+        """
+        Adds delta to a zone's counter (caller holds the lock). Zone slots
+        are never freed; a zone that empties keeps its slot at 0.
+        """
+        if not zone.rstrip(b"\0"):
+            return
+        start = zlib.crc32(zone) % self.ZONE_SLOTS
+        for step in range(self.ZONE_SLOTS):
+            offset = self._zone_offset((start + step) % self.ZONE_SLOTS)
+            slot_zone, riders = self.ZONE_SLOT.unpack_from(self._buf, offset)
+            if slot_zone == zone or not slot_zone.rstrip(b"\0"):
+                self.ZONE_SLOT.pack_into(self._buf, offset, zone, max(riders + delta, 0))
+                return
+        raise RuntimeError("rider state shared memory has no room for more zones")
+
+    def close(self, unlink=False):
+        self._buf = None
+        self._shm.close()
+        if unlink:
+            from multiprocessing import resource_tracker
+
+            # unlink() unregisters the block, which __init__ already did
+            resource_tracker.register(self._shm._name, "shared_memory")
+            self._shm.unlink()
+
+
+# -------------------------------
+# Redis protocol (any host)
+# -------------------------------
+class RedisRiderStateStore(RiderStateStore):
+    """
+    One hash per rider plus a `positions` hash for bulk reads and a
+    `zone_counts` hash of riders per zone.
+    Works with any Redis-protocol server; pass `client` to use a stand-in
+    (it must be created with decode_responses=True). A memory:// url
+    uses the in-process LocalRedis.
+    """
+
+    def __init__(self, url=RIDER_STATE_REDIS_URL, prefix=RIDER_STATE_REDIS_PREFIX, client=None):
+        if client is None and url.startswith("memory://"):
+            from app.utils.local_redis import LocalRedis
+            client = LocalRedis()
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, decode_responses=True)
+
+        self.client = client
+        # a server round trip per call; the in-process stand-in never waits
+        self.blocking = not getattr(client, "in_process", False)
+        self.prefix = prefix
+        self.positions_key = f"{prefix}:rider_positions"
+        self.zone_counts_key = f"{prefix}:zone_counts"
+
+    def _key(self, rider_id):
+        return f"{self.prefix}:rider:{rider_id}"
+
+    @staticmethod
+    def _to_state(raw):
+        if not raw:
+            return None
+        return {
+            "lat": float(raw["lat"]),
+            "lon": float(raw["lon"]),
+            "last_move_time": float(raw["last_move_time"]),
+            "last_update": float(raw["last_update"]),
+            "last_alert": {kind: float(raw.get(f"alert:{kind}", 0)) for kind in ALERT_TYPES},
+        }
+
+    @staticmethod
+    def _to_mapping(state):
+        mapping = {
+            "lat": state["lat"],
+            "lon": state["lon"],
+            "last_move_time": state["last_move_time"],
+            "last_update": state["last_update"],
+        }
+        for kind in ALERT_TYPES:
+            mapping[f"alert:{kind}"] = state["last_alert"][kind]
+        return mapping
+
+    def update_position(self, rider_id, lat, lon, now, move_threshold=MOVE_THRESHOLD_METERS):
+        key = self._key(rider_id)
+        result = {}
+
+        # optimistic transaction: retried if another worker touched the rider
+        def apply(pipe):
+            state = _apply_fix(self._to_state(pipe.hgetall(key)), lat, lon, now, move_threshold)
+            pipe.multi()
+            pipe.hset(key, mapping=self._to_mapping(state))
+            pipe.hset(self.positions_key, str(rider_id), f"{state['lat']},{state['lon']}")
+            result["state"] = state
+
+        self.client.transaction(apply, key)
+        return result["state"]
+
+    def get(self, rider_id):
+        return self._to_state(self.client.hgetall(self._key(rider_id)))
+
+    def mark_alert(self, rider_id, kind, now):
+        key = self._key(rider_id)
+
+        def apply(pipe):
+            if not pipe.exists(key):
+                return
+            pipe.multi()
+            pipe.hset(key, f"alert:{kind}", now)
+
+        self.client.transaction(apply, key)
+
+    def remove(self, rider_id):
+        key = self._key(rider_id)
+
+        def apply(pipe):
+            zone = pipe.hget(key, "zone")
+            pipe.multi()
+            pipe.delete(key)
+            pipe.hdel(self.positions_key, str(rider_id))
+            if zone:
+                pipe.hincrby(self.zone_counts_key, zone, -1)
+
+        self.client.transaction(apply, key)
+
+    def positions(self):
+        result = {}
+        for rider_id, value in self.client.hgetall(self.positions_key).items():
+            lat, lon = value.split(",")
+            result[rider_id] = {"lat": float(lat), "lon": float(lon)}
+        return result
+
+    def set_zone(self, rider_id, zone_id):
+        key = self._key(rider_id)
+        result = {}
+
+        def apply(pipe):
+            if not pipe.exists(key):
+                return
+            previous = pipe.hget(key, "zone") or None
+            result["previous"] = previous
+            if previous == zone_id:
+                return
+            pipe.multi()
+            pipe.hset(key, "zone", zone_id or "")
+            if previous:
+                pipe.hincrby(self.zone_counts_key, previous, -1)
+            if zone_id:
+                pipe.hincrby(self.zone_counts_key, zone_id, 1)
+
+        self.client.transaction(apply, key)
+        return result.get("previous")
+
+    def zone_counts(self):
+        counts = {}
+        for zone_id, riders in self.client.hgetall(self.zone_counts_key).items():
+            if int(riders) > 0:
+                counts[zone_id] = int(riders)
+        return counts
+
+    def __len__(self):
+        return self.client.hlen(self.positions_key)
+
+    def __contains__(self, rider_id):
+        return bool(self.client.hexists(self.positions_key, str(rider_id)))
+
+
+def create_rider_state_store(backend=RIDER_STATE_BACKEND):
+    if backend == "shm":
+        return SharedMemoryRiderStateStore()
+    if backend == "redis":
+        return RedisRiderStateStore()
+    return InMemoryRiderStateStore()
+
+
+rider_state = create_rider_state_store()
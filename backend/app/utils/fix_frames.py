@@ -0,0 +1,140 @@
+import struct
+from collections import namedtuple
+
+# -------------------------------
+# Binary fix frames ("fleet.fix.v1")
+# -------------------------------
+# One WebSocket binary message = one frame carrying 1..n fixes.
+#
+#   header  <BBHI  version, flags, count, seq of first fix
+#   fix 0   <iiq   lat, lon in microdegrees, client time in epoch ms
+#   fix i   <hhH   delta lat, delta lon (microdegrees), delta time (ms)
+#
+# With FLAG_DELTA_FIRST the first fix is also a delta, against the last fix
+# of the previous frame on the same connection. Sequence numbers are
+# consecutive inside a frame, so retransmitted frames can be dropped.
+
+SUBPROTOCOL = "fleet.fix.v1"
+VERSION = 1
+
+FLAG_DELTA_FIRST = 0x01
+
+HEADER = struct.Struct("<BBHI")
+ABSOLUTE = struct.Struct("<iiq")
+DELTA = struct.Struct("<hhH")
+
+SCALE = 1_000_000
+MAX_DELTA = 32767
+MAX_DT_MS = 65535
+MAX_FIXES_PER_FRAME = 255
+
+Fix = namedtuple("Fix", "seq lat lon ts_ms")
+
+
+class FrameError(ValueError):
+    pass
+
+
+def to_micro(value):
+    return int(round(value * SCALE))
+
+
+class FrameDecoder:
+    """
+    Per-connection decoder (keeps the previous fix for delta frames).
+    """
+
+    def __init__(self):
+        self.prev = None        # (lat_e6, lon_e6, ts_ms)
+        self.last_seq = None
+
+    def decode(self, data: bytes):
+        if len(data) < HEADER.size:
+            raise FrameError("frame too short")
+
+        version, flags, count, seq = HEADER.unpack_from(data, 0)
+        if version != VERSION:
+            raise FrameError(f"unsupported frame version {version}")
+        if count == 0:
+            return []
+
+        delta_first = bool(flags & FLAG_DELTA_FIRST)
+        expected = HEADER.size + (count - 1) * DELTA.size
+        expected += DELTA.size if delta_first else ABSOLUTE.size
+        if len(data) != expected:
+            raise FrameError("frame length does not match fix count")
+        if delta_first and self.prev is None:
+            raise FrameError("delta frame without a previous fix")
+
+        offset = HEADER.size
+        if delta_first:
+            lat, lon, ts = self.prev
+        else:
+            lat, lon, ts = ABSOLUTE.unpack_from(data, offset)
+            offset += ABSOLUTE.size
+
+        fixes = []
+        for i in range(count):
+            if i > 0 or delta_first:
+                dlat, dlon, dt = DELTA.unpack_from(data, offset)
+                offset += DELTA.size
+                lat, lon, ts = lat + dlat, lon + dlon, ts + dt
+
+            fix_seq = seq + i
+            if self.last_seq is None or fix_seq > self.last_seq:
+                fixes.append(Fix(fix_seq, lat / SCALE, lon / SCALE, ts))
+                self.last_seq = fix_seq
+                # a replayed frame must not move the delta base back
+                self.prev = (lat, lon, ts)
+
+        return fixes
+
+
+class FrameEncoder:
+    """
+    Client-side encoder (used by the simulator / load tool).
+    """
+
+    def __init__(self):
+        self.prev = None
+        self.seq = 0
+
+    def encode(self, fixes):
+        """
+        fixes: iterable of (lat, lon, ts_ms). Returns a list of frames;
+        a new frame starts whenever a delta does not fit.
+        """
+        frames = []
+        body = []
+        first_seq = self.seq
+        flags = 0
+
+        def flush():
+            if body:
+                frames.append(HEADER.pack(VERSION, flags, len(body), first_seq) + b"".join(body))
+
+        for lat, lon, ts_ms in fixes:
+            cur = (to_micro(lat), to_micro(lon), int(ts_ms))
+
+            delta = None
+            if self.prev is not None:
+                dlat, dlon, dt = (cur[0] - self.prev[0], cur[1] - self.prev[1], cur[2] - self.prev[2])
+                if abs(dlat) <= MAX_DELTA and abs(dlon) <= MAX_DELTA and 0 <= dt <= MAX_DT_MS:
+                    delta = DELTA.pack(dlat, dlon, dt)
+
+            if body and (delta is None or len(body) >= MAX_FIXES_PER_FRAME):
+                flush()
+                body = []
+                first_seq = self.seq
+
+            if not body:
+                flags = FLAG_DELTA_FIRST if delta is not None else 0
+                body.append(delta if delta is not None else ABSOLUTE.pack(*cur))
+            else:
+                body.append(delta)
+
+            self.prev = cur
+            self.seq += 1
+
+        flush()
+        return frames
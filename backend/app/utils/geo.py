@@ -8,3 +8,70 @@ def distance_meters(lat1, lon1, lat2, lon2):
 
     a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dl/2)**2
     return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def bbox_around(lat, lon, radius_m):
+    """
+    (south, west, north, east) box that contains a circle of radius_m.
+    """
+    dlat = radius_m / 111320
+    dlon = radius_m / (111320 * max(math.cos(math.radians(lat)), 1e-6))
+    return (lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+
+
+class PreparedPolygon:
+    """
+    Polygon of (lat, lon) vertices, preprocessed for repeated
+    point-in-polygon tests: a bounding box rejects most points, and the
+    edges are bucketed into latitude bands so a test only crosses the
+    edges of the point's band (even-odd ray cast towards the east).
+    Coordinates are treated as planar, which is fine at city scale.
+    """
+
+    def __init__(self, vertices):
+        points = [(float(lat), float(lon)) for lat, lon in vertices]
+        if len(points) > 1 and points[0] == points[-1]:
+            points.pop()    # closed ring given
+        if len(points) < 3:
+            raise ValueError("a polygon needs at least 3 vertices")
+
+        self.vertices = points
+        lats = [p[0] for p in points]
+        lons = [p[1] for p in points]
+        self.bbox = (min(lats), min(lons), max(lats), max(lons))
+
+        south, _, north, _ = self.bbox
+        edges = list(zip(points, points[1:] + points[:1]))
+        self.bands = max(1, min(len(edges) // 2, 256))
+        self.band_deg = (north - south) / self.bands or 1.0
+        self.band_edges = [[] for _ in range(self.bands)]
+
+        for (lat1, lon1), (lat2, lon2) in edges:
+            if lat1 == lat2:
+                continue    # horizontal edges never cross an eastward ray
+            first = self._band(min(lat1, lat2))
+            last = self._band(max(lat1, lat2))
+            for band in range(first, last + 1):
+                self.band_edges[band].append((lat1, lon1, lat2, lon2))
+
+    def _band(self, lat):
+        return min(max(int((lat - self.bbox[0]) / self.band_deg), 0), self.bands - 1)
+
+    def contains(self, lat, lon):
+        south, west, north, east = self.bbox
+        if not (south <= lat <= north and west <= lon <= east):
+            return False
+
+        inside = False
+        for lat1, lon1, lat2, lon2 in self.band_edges[self._band(lat)]:
+            if (lat1 > lat) != (lat2 > lat):
+                cross = lon1 + (lat - lat1) * (lon2 - lon1) / (lat2 - lat1)
+                if cross > lon:
+                    inside = not inside
+        return inside
+
+    def bounding_radius(self, lat, lon):
+        """
+        Meters from (lat, lon) to the farthest vertex.
+        """
+        return max(distance_meters(lat, lon, v_lat, v_lon) for v_lat, v_lon in self.vertices)
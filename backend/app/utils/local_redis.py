@@ -0,0 +1,123 @@
+# backend/app/utils/local_redis.py
+
+import threading
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the part of the redis-py client the rider
+    state store uses (hashes and `transaction`). Values come back as
+    strings, like a client created with decode_responses=True.
+
+    Used with RIDER_STATE_REDIS_URL=memory:// to run the redis backend
+    without a server; state is private to the process.
+    """
+
+    in_process = True
+
+    def __init__(self):
+        self._hashes = {}
+        self._lock = threading.RLock()
+
+    # -------------------------------
+    # Hash commands
+    # -------------------------------
+    def hgetall(self, key):
+        with self._lock:
+            return dict(self._hashes.get(key, {}))
+
+    def hget(self, key, field):
+        with self._lock:
+            return self._hashes.get(key, {}).get(str(field))
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        with self._lock:
+            fields = self._hashes.setdefault(key, {})
+            added = sum(1 for name in items if str(name) not in fields)
+            fields.update({str(name): str(v) for name, v in items.items()})
+            return added
+
+    def hdel(self, key, *fields):
+        with self._lock:
+            hash_ = self._hashes.get(key, {})
+            removed = sum(1 for field in fields if hash_.pop(str(field), None) is not None)
+            if not hash_:
+                self._hashes.pop(key, None)
+            return removed
+
+    def hincrby(self, key, field, amount=1):
+        with self._lock:
+            fields = self._hashes.setdefault(key, {})
+            value = int(fields.get(str(field), 0)) + amount
+            fields[str(field)] = str(value)
+            return value
+
+    def hlen(self, key):
+        with self._lock:
+            return len(self._hashes.get(key, {}))
+
+    def hexists(self, key, field):
+        with self._lock:
+            return str(field) in self._hashes.get(key, {})
+
+    def exists(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if key in self._hashes)
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self._hashes.pop(key, None) is not None)
+
+    # -------------------------------
+    # Transactions
+    # -------------------------------
+    def pipeline(self):
+        return LocalPipeline(self)
+
+    def transaction(self, func, *watches):
+        """
+        Runs `func(pipe)` and then the commands it queued after `multi()`.
+        The whole call holds the client lock, so nothing can change the
+        watched keys in between and there is never a retry.
+        """
+        with self._lock:
+            pipe = self.pipeline()
+            func(pipe)
+            return pipe.execute()
+
+
+class LocalPipeline:
+    """
+    Reads run immediately until `multi()`; after that commands are
+    queued and run by `execute()`.
+    """
+
+    COMMANDS = ("hgetall", "hget", "hset", "hdel", "hincrby", "hlen", "hexists", "exists", "delete")
+
+    def __init__(self, client):
+        self.client = client
+        self._queued = None
+
+    def multi(self):
+        self._queued = []
+
+    def execute(self):
+        queued, self._queued = self._queued or [], None
+        with self.client._lock:
+            return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in queued]
+
+    def __getattr__(self, name):
+        if name not in self.COMMANDS:
+            raise AttributeError(name)
+        command = getattr(self.client, name)
+        if self._queued is None:
+            return command
+
+        def queue(*args, **kwargs):
+            self._queued.append((name, args, kwargs))
+            return self
+
+        return queue
@@ -0,0 +1,100 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_M = 6371000
+
+
+def meters_per_pixel(lat, zoom):
+    """
+    Ground size of one pixel on a 256px web-mercator tile.
+    """
+    return 156543.03392 * math.cos(math.radians(lat)) / (2 ** zoom)
+
+
+def simplify(lats, lons, tolerance_m):
+    """
+    Douglas-Peucker. Returns the indices of the points to keep
+    (first and last always kept), in order.
+    """
+    n = len(lats)
+    if n < 3 or tolerance_m <= 0:
+        return list(range(n))
+
+    # local equirectangular projection, good enough for one city
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    x = EARTH_RADIUS_M * lon * math.cos(float(lat.mean()))
+    y = EARTH_RADIUS_M * lat
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+
+        dx, dy = x[j] - x[i], y[j] - y[i]
+        px, py = x[i + 1:j] - x[i], y[i + 1:j] - y[i]
+        length = math.hypot(dx, dy)
+        if length == 0:
+            dist = np.hypot(px, py)
+        else:
+            dist = np.abs(px * dy - py * dx) / length
+
+        k = int(dist.argmax())
+        if dist[k] > tolerance_m:
+            k += i + 1
+            keep[k] = True
+            stack.append((i, k))
+            stack.append((k, j))
+
+    return np.flatnonzero(keep).tolist()
+
+
+def _encode_value(value):
+    value = ~(value << 1) if value < 0 else value << 1
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def encode(lats, lons, precision=5):
+    """
+    Encoded polyline (the format used by Google / Leaflet plugins).
+    """
+    factor = 10 ** precision
+    out = []
+    prev_lat = prev_lon = 0
+    for lat, lon in zip(lats, lons):
+        ilat, ilon = int(round(lat * factor)), int(round(lon * factor))
+        out.append(_encode_value(ilat - prev_lat))
+        out.append(_encode_value(ilon - prev_lon))
+        prev_lat, prev_lon = ilat, ilon
+    return "".join(out)
+
+
+def decode(polyline, precision=5):
+    factor = 10 ** precision
+    coords = []
+    index = lat = lon = 0
+    while index < len(polyline):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(polyline[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        coords.append((lat / factor, lon / factor))
+    return coords
@@ -0,0 +1,227 @@
+import math
+from collections import defaultdict
+
+from app.utils.geo import PreparedPolygon
+
+
+class SpatialGrid:
+    """
+    Uniform lat/lon grid of points keyed by id.
+
+    Cells are `cell_deg` degrees on each side; a bbox query only visits the
+    cells the box overlaps (or the occupied cells, whichever is fewer).
+    """
+
+    def __init__(self, cell_deg=0.01):
+        self.cell_deg = cell_deg
+        self.cells = defaultdict(set)   # (row, col) -> {key}
+        self.points = {}                # key -> (lat, lon, cell)
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, key):
+        return key in self.points
+
+    def cell_of(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def cell_range(self, south, west, north, east):
+        r0, c0 = self.cell_of(south, west)
+        r1, c1 = self.cell_of(north, east)
+        return r0, c0, r1, c1
+
+    # -------------------------------
+    # Updates
+    # -------------------------------
+    def update(self, key, lat, lon):
+        cell = self.cell_of(lat, lon)
+        old = self.points.get(key)
+
+        if old is not None and old[2] != cell:
+            self._discard(key, old[2])
+
+        self.points[key] = (lat, lon, cell)
+        self.cells[cell].add(key)
+
+    def remove(self, key):
+        old = self.points.pop(key, None)
+        if old is not None:
+            self._discard(key, old[2])
+
+    def _discard(self, key, cell):
+        members = self.cells.get(cell)
+        if members is not None:
+            members.discard(key)
+            if not members:
+                del self.cells[cell]
+
+    # -------------------------------
+    # Queries
+    # -------------------------------
+    def position(self, key):
+        point = self.points.get(key)
+        return None if point is None else point[:2]
+
+    def query_bbox(self, south, west, north, east):
+        """
+        Keys of points inside the box.
+        """
+        r0, c0, r1, c1 = self.cell_range(south, west, north, east)
+        span = (r1 - r0 + 1) * (c1 - c0 + 1)
+
+        if span > len(self.cells):
+            cells = (
+                members for (r, c), members in self.cells.items()
+                if r0 <= r <= r1 and c0 <= c <= c1
+            )
+        else:
+            cells = (
+                self.cells[(r, c)]
+                for r in range(r0, r1 + 1)
+                for c in range(c0, c1 + 1)
+                if (r, c) in self.cells
+            )
+
+        found = []
+        for members in cells:
+            for key in members:
+                lat, lon, _ = self.points[key]
+                if south <= lat <= north and west <= lon <= east:
+                    found.append(key)
+        return found
+
+
+METERS_PER_DEG_LAT = 111194.9   # great-circle meters per degree (R = 6371 km)
+
+
+class ZoneGrid:
+    """
+    Read-only grid over zones ({"lat", "lon", "radius", ...}): circles,
+    or polygons when the zone has a "polygon" list of [lat, lon]
+    vertices (prepared once, see PreparedPolygon).
+
+    Each zone is listed in every cell its bbox overlaps, so a
+    point-in-zone check looks at one cell. Centers are also bucketed by
+    cell for nearest-zone queries, which search rings of cells outward
+    from the point and stop once no unvisited ring can beat the best
+    distance. Ties go to the zone listed first, like a scan of the list
+    would. Build a new grid when the zones change.
+    """
+
+    def __init__(self, zones, distance, cell_deg=0.01):
+        self.zones = list(zones)
+        self.distance = distance            # (lat1, lon1, lat2, lon2) -> meters
+        self.cell_deg = cell_deg
+        self.cover = defaultdict(list)      # cell -> [zone index] whose circle may reach it
+        self.centers = defaultdict(list)    # cell -> [zone index] centered in it
+        self.shapes = {}                    # zone index -> PreparedPolygon
+
+        for i, zone in enumerate(self.zones):
+            self.centers[self.cell_of(zone["lat"], zone["lon"])].append(i)
+            if zone.get("polygon"):
+                self.shapes[i] = PreparedPolygon(zone["polygon"])
+                south, west, north, east = self.shapes[i].bbox
+            else:
+                south, west, north, east = self._bbox(zone)
+            r0, c0 = self.cell_of(south, west)
+            r1, c1 = self.cell_of(north, east)
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    self.cover[(r, c)].append(i)
+
+        if self.centers:
+            rows = [r for r, _ in self.centers]
+            cols = [c for _, c in self.centers]
+            self._extent = (min(rows), min(cols), max(rows), max(cols))
+
+    def __len__(self):
+        return len(self.zones)
+
+    def cell_of(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def _bbox(self, zone):
+        # 1% margin over the exact circle
+        dlat = zone["radius"] * 1.01 / METERS_PER_DEG_LAT
+        dlon = dlat / max(math.cos(math.radians(min(abs(zone["lat"]) + dlat, 89.9))), 1e-6)
+        return (zone["lat"] - dlat, zone["lon"] - dlon, zone["lat"] + dlat, zone["lon"] + dlon)
+
+    # -------------------------------
+    # Queries
+    # -------------------------------
+    def containing(self, lat, lon):
+        """
+        First zone (in list order) that contains the point.
+        """
+        for i in self.cover.get(self.cell_of(lat, lon), ()):
+            shape = self.shapes.get(i)
+            if shape is not None:
+                if shape.contains(lat, lon):
+                    return self.zones[i]
+                continue
+            zone = self.zones[i]
+            if self.distance(lat, lon, zone["lat"], zone["lon"]) <= zone["radius"]:
+                return zone
+        return None
+
+    def nearest(self, lat, lon, accept=None):
+        """
+        Zone whose center (lat, lon) is nearest to the point, among those `accept`
+        returns True for (default: all).
+        """
+        if not self.centers:
+            return None
+
+        row, col = self.cell_of(lat, lon)
+        r_min, c_min, r_max, c_max = self._extent
+        last_ring = max(row - r_min, r_max - row, col - c_min, c_max - col)
+
+        # far from every zone the rings are mostly empty: scan the
+        # zones instead once the rings would cover more cells than hold one
+        budget = 4 * len(self.centers)
+        best = None     # (meters, index)
+        for k in range(last_ring + 1):
+            if best is not None and self._ring_floor(lat, k) > best[0]:
+                break
+            if (2 * k + 1) ** 2 > budget:
+                best = self._closest(lat, lon, range(len(self.zones)), accept, best)
+                break
+            for cell in self._ring(row, col, k):
+                best = self._closest(lat, lon, self.centers.get(cell, ()), accept, best)
+
+        return None if best is None else self.zones[best[1]]
+
+    def _closest(self, lat, lon, indexes, accept, best):
+        for i in indexes:
+            zone = self.zones[i]
+            if accept is not None and not accept(zone):
+                continue
+            candidate = (self.distance(lat, lon, zone["lat"], zone["lon"]), i)
+            if best is None or candidate < best:
+                best = candidate
+        return best
+
+    def _ring(self, row, col, k):
+        if k == 0:
+            yield (row, col)
+            return
+        for c in range(col - k, col + k + 1):
+            yield (row - k, c)
+            yield (row + k, c)
+        for r in range(row - k + 1, row + k):
+            yield (r, col - k)
+            yield (r, col + k)
+
+    def _ring_floor(self, lat, k):
+        """
+        Lower bound (meters) on the distance to any point in ring k:
+        k - 1 whole cells lie in between. Longitude degrees are scaled at
+        the ring's highest latitude, and 10% is kept as slack for the
+        difference between parallels and great circles.
+        """
+        if k <= 1:
+            return 0.0
+        top = min(abs(lat) + (k + 1) * self.cell_deg, 90.0)
+        side_deg = self.cell_deg * min(1.0, math.cos(math.radians(top)))
+        return 0.9 * (k - 1) * side_deg * METERS_PER_DEG_LAT
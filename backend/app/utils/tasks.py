@@ -0,0 +1,15 @@
+import asyncio
+
+
+async def cancel_and_wait(task):
+    """
+    Cancels a background task and waits for it to unwind, so its
+    cleanup (finally blocks, re-queued work) is done before we go on.
+    """
+    if task is None or task.done():
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
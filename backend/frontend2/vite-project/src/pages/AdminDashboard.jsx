@@ -20,15 +20,19 @@ export default function AdminDashboard() {
     ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data);
+        const riders = data.type === "POSITIONS" ? data.riders : [data];
+        if (data.full || riders.length === 0) return;
+
+        const time = new Date().toLocaleTimeString();
 
         // Keep last 20 alerts only
         setAlerts((prev) => [
-          {
-            time: new Date().toLocaleTimeString(),
-            message: `Rider ${data.rider_id} updated location`,
-          },
-          ...prev.slice(0, 19),
-        ]);
+          ...riders.map((r) => ({
+            time,
+            message: `Rider ${r.rider_id} updated location`,
+          })),
+          ...prev,
+        ].slice(0, 20));
       } catch {
         // ignore malformed messages
       }
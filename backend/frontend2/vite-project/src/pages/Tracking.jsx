@@ -81,8 +81,7 @@ export default function Tracking() {
       // 🔌 Admin WebSocket
       wsRef.current = new WebSocket("ws://127.0.0.1:8000/ws/admin");
 
-      wsRef.current.onmessage = (event) => {
-        const { rider_id, lat, lon } = JSON.parse(event.data);
+      const moveMarker = ({ rider_id, lat, lon }) => {
         if (!rider_id || lat == null || lon == null) return;
 
         if (!markersRef.current[rider_id]) {
@@ -100,6 +99,21 @@ export default function Tracking() {
           markersRef.current[rider_id].setLngLat([lon, lat]);
         }
       };
+
+      wsRef.current.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+
+        // batched tick: latest position of every rider that moved
+        if (data.type === "POSITIONS") {
+          data.riders.forEach(moveMarker);
+          (data.removed || []).forEach((riderId) => {
+            markersRef.current[riderId]?.remove();
+            delete markersRef.current[riderId];
+          });
+        } else if (data.type !== "CLUSTERS") {
+          moveMarker(data);
+        }
+      };
     });
 
     return () => {
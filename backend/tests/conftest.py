@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+
+# settings are read at import time: point the app at a throwaway SQLite
+# file before anything imports it (never at a real DATABASE_URL)
+_DB_DIR = tempfile.mkdtemp(prefix="fleet-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'fleet.db')}"
+os.environ["RIDER_STATE_BACKEND"] = "memory"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def db():
+    """
+    Session on an empty schema; the process-wide ingest caches are
+    cleared so tests do not see each other's fixes.
+    """
+    import app.main  # noqa: F401  registers every model
+    from app.db.session import Base, SessionLocal, engine
+    from app.services.distance_cache import distance_cache
+    from app.services.last_fix_cache import last_fix_cache
+    from app.services.odometer import odometer
+
+    Base.metadata.create_all(bind=engine)
+    last_fix_cache.clear()
+    odometer._pending.clear()
+    distance_cache.invalidate()
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def make_rider(db):
+    from app.models.user import User
+
+    def make(login_id="rider1", role="rider"):
+        user = User(login_id=login_id, email=f"{login_id}@fleet.test", hashed_password="x", role=role)
+        db.add(user)
+        db.commit()
+        return user
+
+    return make
@@ -0,0 +1,80 @@
+import asyncio
+
+from app.core.config import ADMIN_MAX_LAG_TICKS
+from app.services.admin_broadcast import AdminBroadcaster, AdminClient
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+
+def positions(ws):
+    return [m for m in ws.sent if m.get("type") == "POSITIONS"]
+
+
+def test_full_outbox_drops_the_oldest_message():
+    client = AdminClient(FakeSocket(), queue_size=2)
+
+    results = [client.offer({"n": n}) for n in range(2 + ADMIN_MAX_LAG_TICKS)]
+
+    assert [client.queue.get_nowait()["n"] for _ in range(2)] == [ADMIN_MAX_LAG_TICKS, ADMIN_MAX_LAG_TICKS + 1]
+    assert client.dropped == ADMIN_MAX_LAG_TICKS
+    assert results[-1] is False and all(results[:-1])
+
+
+def test_a_tick_carries_only_the_latest_fix_per_rider():
+    broadcaster = AdminBroadcaster(full_snapshot_ticks=0)
+    ws = FakeSocket()
+
+    async def run():
+        broadcaster.register(ws)
+        for lon in (13.40, 13.41, 13.42):
+            broadcaster.publish("rider_1", 52.5, lon)
+        broadcaster.broadcast()
+        broadcaster.broadcast()         # nothing moved: nothing sent
+        await asyncio.sleep(0)
+        await broadcaster.stop()
+
+    asyncio.run(run())
+
+    *_, tick = positions(ws)
+    assert tick["riders"] == [{"rider_id": "rider_1", "lat": 52.5, "lon": 13.42}]
+    assert len(positions(ws)) == 2      # initial full picture + one tick
+
+
+def test_removed_riders_are_announced():
+    broadcaster = AdminBroadcaster(full_snapshot_ticks=0)
+    ws = FakeSocket()
+
+    async def run():
+        broadcaster.register(ws)
+        broadcaster.publish("rider_1", 52.5, 13.4)
+        broadcaster.broadcast()
+        broadcaster.remove("rider_1")
+        broadcaster.broadcast()
+        await asyncio.sleep(0)
+        await broadcaster.stop()
+
+    asyncio.run(run())
+
+    assert positions(ws)[-1]["removed"] == ["rider_1"]
+    assert "rider_1" not in broadcaster.grid
+
+
+def test_stop_waits_for_the_sender_tasks():
+    broadcaster = AdminBroadcaster()
+
+    async def run():
+        await broadcaster.start()
+        client = broadcaster.register(FakeSocket())
+        await broadcaster.stop()
+        return client
+
+    client = asyncio.run(run())
+
+    assert client.task.done() and client.closed
+    assert not broadcaster.clients
@@ -0,0 +1,14 @@
+from app.core.config import async_database_url
+
+
+def test_postgres_urls_get_asyncpg_whatever_the_sync_driver():
+    assert async_database_url("postgresql://u:p%40ss@db:5432/fleet") == "postgresql+asyncpg://u:p%40ss@db:5432/fleet"
+    assert async_database_url("postgresql+psycopg2://u:p@db/fleet") == "postgresql+asyncpg://u:p@db/fleet"
+
+
+def test_sqlite_urls_get_aiosqlite():
+    assert async_database_url("sqlite:////tmp/fleet.db") == "sqlite+aiosqlite:////tmp/fleet.db"
+
+
+def test_other_databases_are_left_alone():
+    assert async_database_url("mysql://u@db/fleet") == "mysql://u@db/fleet"
@@ -0,0 +1,40 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.security import create_access_token
+from app.models.gps import GPSLocation
+from app.models.payroll import Payroll
+from app.services.distance_engine import km_by_rider
+
+
+def test_summary_totals_match_the_raw_points(db, make_rider):
+    from app.main import app
+
+    near, far, admin = make_rider("near"), make_rider("far"), make_rider("boss", role="admin")
+    # a few minutes ago: inside the week window whatever time the test runs
+    start = datetime.utcnow() - timedelta(minutes=10)
+    for rider, step in ((near, 0.001), (far, 0.01)):
+        db.add_all([
+            GPSLocation(rider_id=rider.id, latitude=52.5 + i * step, longitude=13.4,
+                        timestamp=start + timedelta(seconds=30 * i))
+            for i in range(10)
+        ])
+    db.add_all([
+        Payroll(rider_id=near.id, date=date.today(), amount=12.5, created_at=datetime.utcnow()),
+        Payroll(rider_id=far.id, date=date.today(), amount=7.25, created_at=datetime.utcnow()),
+        Payroll(rider_id=far.id, date=date.today(), amount=100,
+                created_at=datetime.utcnow() - timedelta(days=30)),
+    ])
+    db.commit()
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': admin.login_id, 'role': 'admin'})}"}
+    summary = TestClient(app).get("/dashboard/summary", headers=headers).json()
+
+    expected = km_by_rider(db, None, start - timedelta(minutes=1), datetime.utcnow())
+    assert summary["km_week"] == pytest.approx(sum(expected.values()), abs=1e-3)
+    assert summary["km_today"] <= summary["km_week"]
+    assert summary["pay_week"] == 19.75
+    assert [row["login_id"] for row in summary["leaderboard"]] == ["far", "near"]
+    assert summary["leaderboard"][0]["km"] == pytest.approx(expected[far.id], abs=1e-3)
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+from app.services.dead_band import DeadBandFilter
+from app.services.last_fix_cache import LastFix
+
+
+T0 = datetime(2026, 10, 18, 12, 0)
+STEP = 0.0001          # ~11 m of latitude
+
+
+def at(seconds):
+    return T0 + timedelta(seconds=seconds)
+
+
+def make(**kwargs):
+    return DeadBandFilter(**{"enabled": True, "meters": 15, "min_seconds": 0, "heartbeat_seconds": 480, **kwargs})
+
+
+def test_small_moves_are_merged_until_the_band_is_left():
+    band = make()
+
+    kept = [band.accept(1, 52.5 + i * STEP, 13.4, at(i * 30)) for i in range(5)]
+
+    # measured from the last kept fix, not the previous one
+    assert kept == [True, False, True, False, True]
+
+
+def test_heartbeat_keeps_a_standing_rider_alive():
+    band = make()
+    band.accept(1, 52.5, 13.4, at(0))
+
+    assert band.accept(1, 52.5, 13.4, at(479)) is False
+    assert band.accept(1, 52.5, 13.4, at(480)) is True
+
+
+def test_caller_reference_is_used_for_unknown_riders():
+    band = make()
+    last = LastFix(1, 1, 52.5, 13.4, at(0))
+
+    assert band.accept(1, 52.5, 13.4, at(30), last) is False
+
+
+def test_disabled_filter_keeps_everything():
+    band = make(enabled=False)
+
+    assert all(band.accept(1, 52.5, 13.4, at(i)) for i in range(3))
+
+
+def test_rider_state_is_bounded_but_totals_are_not():
+    band = make(max_riders=2)
+    for rider_id in range(5):
+        band.accept(rider_id, 52.5, 13.4, at(0))
+        band.accept(rider_id, 52.5, 13.4, at(1))
+
+    stats = band.stats()
+    assert sorted(stats["riders"]) == [3, 4]
+    assert (stats["kept"], stats["dropped"], stats["saved_ratio"]) == (5, 5, 0.5)
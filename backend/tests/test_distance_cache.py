@@ -0,0 +1,92 @@
+from datetime import date, datetime
+
+import pytest
+
+from app.services import distance_range
+from app.services.distance_cache import DistanceCache, window_start
+
+DAY = datetime(2026, 10, 5)
+WEEK = datetime(2026, 9, 29)
+
+
+@pytest.fixture
+def computed(monkeypatch):
+    """
+    Stands in for the rollup query: every miss is recorded and answers 1 km.
+    """
+    calls = []
+
+    def fake(db, rider_id, start, end, now=None):
+        calls.append((rider_id, start, end))
+        return 1.0
+
+    monkeypatch.setattr(distance_range, "rider_distance_between", fake)
+    return calls
+
+
+def test_window_start_floors_to_the_minute():
+    assert window_start(date(2026, 10, 5)) == DAY
+    assert window_start(datetime(2026, 10, 5, 9, 30, 41, 5)) == datetime(2026, 10, 5, 9, 30)
+
+
+def test_second_lookup_is_a_hit(computed):
+    cache = DistanceCache()
+
+    assert cache.rider_km(None, 1, DAY) == 1.0
+    assert cache.rider_km(None, 1, datetime(2026, 10, 5, 0, 0, 30)) == 1.0
+
+    assert len(computed) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_extend_adds_to_the_windows_containing_the_fix(computed):
+    cache = DistanceCache()
+    cache.rider_km(None, 1, DAY)
+    cache.rider_km(None, 1, WEEK, DAY)
+    cache.rider_km(None, 2, DAY)
+
+    cache.extend(1, datetime(2026, 10, 5, 12), 0.5)
+
+    assert cache.rider_km(None, 1, DAY) == 1.5
+    assert cache.rider_km(None, 1, WEEK, DAY) == 1.0     # ended before the fix
+    assert cache.rider_km(None, 2, DAY) == 1.0            # someone else
+    assert len(computed) == 3
+
+
+def test_invalidate_drops_only_overlapping_windows_of_the_rider(computed):
+    cache = DistanceCache()
+    cache.rider_km(None, 1, DAY)
+    cache.rider_km(None, 1, WEEK, DAY)
+    cache.rider_km(None, 2, DAY)
+
+    cache.invalidate_day(1, date(2026, 10, 5))
+
+    assert set(cache._entries) == {(1, WEEK, DAY), (2, DAY, None)}
+    assert cache._by_rider == {1: {(1, WEEK, DAY)}, 2: {(2, DAY, None)}}
+
+    cache.invalidate()
+    assert not cache._entries and not cache._by_rider
+
+
+def test_lru_eviction_keeps_the_rider_index_in_step(computed):
+    cache = DistanceCache(max_entries=2)
+    cache.rider_km(None, 1, DAY)
+    cache.rider_km(None, 2, DAY)
+    cache.rider_km(None, 1, DAY)         # 1 is now the most recent
+    cache.rider_km(None, 3, DAY)
+
+    assert set(cache._entries) == {(1, DAY, None), (3, DAY, None)}
+    assert set(cache._by_rider) == {1, 3}
+
+
+def test_result_is_not_stored_if_the_rider_changed_meanwhile(monkeypatch):
+    cache = DistanceCache()
+
+    def racing(db, rider_id, start, end, now=None):
+        cache.extend(rider_id, datetime(2026, 10, 5, 12), 0.5)
+        return 1.0
+
+    monkeypatch.setattr(distance_range, "rider_distance_between", racing)
+
+    assert cache.rider_km(None, 1, DAY) == 1.0
+    assert not cache._entries and not cache._by_rider
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.models.gps import GPSLocation
+from app.services.distance_engine import (
+    GroupedReducer,
+    grouped_km,
+    hour_index,
+    km_by_rider,
+    path_km,
+    segment_km,
+    span_km,
+    stream_km_by_rider,
+)
+from app.utils.gps import haversine
+
+
+def test_segments_match_the_scalar_haversine():
+    lat = [52.50, 52.51, 52.53, 52.53]
+    lon = [13.40, 13.42, 13.41, 13.45]
+
+    expected = [haversine(lat[i], lon[i], lat[i + 1], lon[i + 1]) for i in range(3)]
+
+    assert segment_km(lat, lon) == pytest.approx(expected)
+    assert path_km(lat, lon) == pytest.approx(sum(expected))
+    assert segment_km([52.5], [13.4]).size == 0
+
+
+def test_no_segment_between_two_riders():
+    totals = grouped_km([1, 1, 2, 2], [0.0, 0.01, 50.0, 50.0], [0.0, 0.0, 8.0, 8.01])
+
+    assert totals[1] == pytest.approx(haversine(0, 0, 0.01, 0))
+    assert totals[2] == pytest.approx(haversine(50, 8, 50, 8.01))
+
+
+def test_bucketed_segments_count_where_they_end():
+    ts = [datetime(2026, 10, 18, 9, 50), datetime(2026, 10, 18, 10, 5)]
+    hours = hour_index(ts)
+
+    totals = grouped_km([1, 1], [0.0, 0.01], [0.0, 0.0], hours)
+
+    assert set(totals) == {(1, int(hours[0])), (1, int(hours[1]))}
+    assert totals[(1, int(hours[0]))] == 0.0
+
+
+def test_chunked_reducer_equals_one_pass():
+    rng = np.random.default_rng(11)
+    riders = np.repeat([1, 2, 3], 40)
+    lat = 52.5 + rng.random(riders.size) * 0.05
+    lon = 13.4 + rng.random(riders.size) * 0.05
+    rows = list(zip(riders.tolist(), lat.tolist(), lon.tolist(), [datetime(2026, 10, 18)] * riders.size))
+
+    reducer = GroupedReducer()
+    for i in range(0, len(rows), 17):
+        reducer.feed(rows[i:i + 17])
+
+    expected = grouped_km(riders, lat, lon)
+    assert reducer.totals == pytest.approx(expected)
+    assert reducer.points == len(rows)
+
+
+def test_db_windows_count_the_segment_across_midnight(db, make_rider):
+    rider = make_rider()
+    start = datetime(2026, 10, 5, 23, 50)
+    db.add_all([
+        GPSLocation(rider_id=rider.id, latitude=52.50 + i * 0.001, longitude=13.4,
+                    timestamp=start + timedelta(minutes=5 * i))
+        for i in range(6)
+    ])
+    db.commit()
+    monday, tuesday, wednesday = (datetime(2026, 10, d) for d in (5, 6, 7))
+
+    whole = km_by_rider(db, [rider.id], monday, wednesday)[rider.id]
+    days = (
+        stream_km_by_rider(db, None, monday, tuesday)[rider.id]
+        + stream_km_by_rider(db, None, tuesday, wednesday)[rider.id]
+    )
+    spans = (
+        span_km(db, tuesday, tuesday + timedelta(minutes=10))[rider.id]
+        + span_km(db, tuesday + timedelta(minutes=10), wednesday)[rider.id]
+    )
+
+    assert days == pytest.approx(whole)
+    assert spans == pytest.approx(stream_km_by_rider(db, None, tuesday, wednesday)[rider.id])
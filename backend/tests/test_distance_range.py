@@ -0,0 +1,63 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.models.gps import GPSLocation
+from app.services.distance import rollup_day
+from app.services.distance_engine import km_by_rider
+from app.services.distance_range import distance_between, plan_range
+
+
+def days(first, count):
+    return {first + timedelta(days=i) for i in range(count)}
+
+
+def test_whole_covered_weeks_and_days():
+    start, end = datetime(2026, 10, 5), datetime(2026, 10, 14)       # Monday .. next Wednesday
+    weeks, whole_days, hours, spans = plan_range(start, end, days(date(2026, 10, 5), 9))
+
+    assert weeks == [date(2026, 10, 5)]
+    assert whole_days == [date(2026, 10, 12), date(2026, 10, 13)]
+    assert hours == [] and spans == []
+
+
+def test_partial_days_use_hours_and_raw_edges():
+    start, end = datetime(2026, 10, 5, 9, 30), datetime(2026, 10, 5, 12, 15)
+    weeks, whole_days, hours, spans = plan_range(start, end, {date(2026, 10, 5)})
+
+    assert hours == [datetime(2026, 10, 5, 10), datetime(2026, 10, 5, 11)]
+    assert spans == [(start, datetime(2026, 10, 5, 10)), (datetime(2026, 10, 5, 12), end)]
+    assert weeks == [] and whole_days == []
+
+
+def test_uncovered_days_are_raw_spans():
+    start, end = datetime(2026, 10, 5), datetime(2026, 10, 7)
+    weeks, whole_days, hours, spans = plan_range(start, end, {date(2026, 10, 6)})
+
+    assert spans == [(start, datetime(2026, 10, 6))]
+    assert whole_days == [date(2026, 10, 6)]
+
+
+def test_rollups_and_raw_points_give_the_same_answer(db, make_rider):
+    rider = make_rider()
+    start = datetime(2026, 10, 5, 22, 0)
+    db.add_all([
+        GPSLocation(rider_id=rider.id, latitude=52.5 + i * 0.001, longitude=13.4,
+                    timestamp=start + timedelta(minutes=7 * i))
+        for i in range(60)
+    ])
+    db.commit()
+    window = (datetime(2026, 10, 5), datetime(2026, 10, 12))
+    now = datetime(2026, 10, 20)
+
+    raw = distance_between(db, *window, now=now)[rider.id]
+    for day in days(date(2026, 10, 5), 7):
+        rollup_day(db, day)
+    rolled = distance_between(db, *window, now=now)[rider.id]
+
+    assert raw == pytest.approx(km_by_rider(db, [rider.id], *window)[rider.id])
+    assert rolled == pytest.approx(raw)
+    part = distance_between(db, datetime(2026, 10, 5, 23, 30), datetime(2026, 10, 6, 1, 10), now=now)
+    assert part[rider.id] == pytest.approx(
+        km_by_rider(db, [rider.id], datetime(2026, 10, 5, 23, 23), datetime(2026, 10, 6, 1, 10))[rider.id]
+    )
@@ -0,0 +1,35 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.db.session import AsyncSessionLocal
+from app.models.gps import GPSLocation
+from app.routers.tracking import report_for
+
+
+START = datetime(2026, 10, 5, 9, 0)
+
+
+def report(**kwargs):
+    async def run():
+        async with AsyncSessionLocal() as db:
+            return await report_for(db, START, end=START + timedelta(hours=2), **kwargs)
+
+    return asyncio.run(run())
+
+
+def test_leaderboard_order_zero_riders_and_paging(db, make_rider):
+    far, near, idle = make_rider("far"), make_rider("near"), make_rider("idle")
+    make_rider("boss", role="admin")
+    for rider, step in ((far, 0.01), (near, 0.001)):
+        db.add_all([
+            GPSLocation(rider_id=rider.id, latitude=52.5 + i * step, longitude=13.4,
+                        timestamp=START + timedelta(minutes=10 * i))
+            for i in range(4)
+        ])
+    db.commit()
+
+    rows = report()
+
+    assert [r["login_id"] for r in rows] == ["far", "near", "idle"]
+    assert rows[0]["km"] > rows[1]["km"] > 0 and rows[2]["km"] == 0
+    assert [r["login_id"] for r in report(limit=1, offset=1)] == ["near"]
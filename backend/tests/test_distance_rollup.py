@@ -0,0 +1,83 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.models.daily_distance import DailyDistance, DistanceRollupDay, HourlyDistance, WeeklyDistance
+from app.models.gps import GPSLocation
+from app.services.distance import DistanceRollupJob, rebuild_day, rollup_day, week_start
+from app.utils.gps import haversine
+
+
+MONDAY = date(2026, 10, 5)
+
+
+def add_track(db, rider_id, start, count, step_minutes=10):
+    db.add_all([
+        GPSLocation(rider_id=rider_id, latitude=52.50 + i * 0.001, longitude=13.4,
+                    timestamp=start + timedelta(minutes=step_minutes * i))
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def test_rebuild_writes_hours_day_and_week(db, make_rider):
+    rider = make_rider()
+    add_track(db, rider.id, datetime(2026, 10, 5, 9, 0), 7)    # 09:00 .. 10:00
+
+    totals = rebuild_day(db, MONDAY)
+    db.commit()
+
+    step = haversine(52.500, 13.4, 52.501, 13.4)
+    assert totals[rider.id] == pytest.approx(6 * step, rel=1e-3)
+    hours = dict(db.query(HourlyDistance.hour, HourlyDistance.distance_km))
+    assert hours[datetime(2026, 10, 5, 9)] == pytest.approx(5 * step, rel=1e-3)
+    assert hours[datetime(2026, 10, 5, 10)] == pytest.approx(step, rel=1e-3)
+    assert db.query(DailyDistance.distance_km).scalar() == pytest.approx(totals[rider.id])
+    week = db.query(WeeklyDistance).one()
+    assert (week.week_start, week.distance_km) == (week_start(MONDAY), pytest.approx(totals[rider.id]))
+
+
+def test_rebuild_does_not_touch_the_previous_day(db, make_rider):
+    rider = make_rider()
+    add_track(db, rider.id, datetime(2026, 10, 5, 23, 30), 6)   # 23:30 .. 00:20
+
+    monday = rebuild_day(db, MONDAY)[rider.id]
+    before = dict(db.query(HourlyDistance.hour, HourlyDistance.distance_km))
+    tuesday = rebuild_day(db, MONDAY + timedelta(days=1))[rider.id]
+    db.commit()
+
+    assert dict(db.query(HourlyDistance.hour, HourlyDistance.distance_km).filter(
+        HourlyDistance.hour < datetime(2026, 10, 6))) == before
+    assert monday + tuesday == pytest.approx(5 * haversine(52.500, 13.4, 52.501, 13.4), rel=1e-3)
+
+
+def test_rollup_is_checkpointed(db, make_rider):
+    rider = make_rider()
+    add_track(db, rider.id, datetime(2026, 10, 5, 9, 0), 3)
+
+    first = rollup_day(db, MONDAY)
+
+    assert first["riders"] == 1
+    assert db.get(DistanceRollupDay, MONDAY) is not None
+    assert rollup_day(db, MONDAY) is None
+    assert rollup_day(db, MONDAY, force=True)["distance_km"] == first["distance_km"]
+
+
+def test_next_run_time():
+    job = DistanceRollupJob(at="02:30")
+
+    assert job.seconds_until_next(datetime(2026, 10, 5, 2, 0)) == 30 * 60
+    assert job.seconds_until_next(datetime(2026, 10, 5, 3, 0)) == 23.5 * 3600
+
+
+def test_stop_waits_for_the_task():
+    job = DistanceRollupJob(at="02:30")
+
+    async def run():
+        await job.start()
+        task = job._task
+        await job.stop()
+        return task
+
+    assert asyncio.run(run()).done()
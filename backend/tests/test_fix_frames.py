@@ -0,0 +1,88 @@
+import pytest
+
+from app.utils.fix_frames import (
+    HEADER,
+    MAX_FIXES_PER_FRAME,
+    VERSION,
+    FrameDecoder,
+    FrameEncoder,
+    FrameError,
+)
+
+
+def decode_all(frames, decoder=None):
+    decoder = decoder or FrameDecoder()
+    return [fix for frame in frames for fix in decoder.decode(frame)]
+
+
+def test_round_trip_to_the_microdegree():
+    points = [(52.520008 + i * 0.0001, 13.404954 - i * 0.0002, 1_700_000_000_000 + i * 1000) for i in range(10)]
+
+    fixes = decode_all(FrameEncoder().encode(points))
+
+    assert [f.seq for f in fixes] == list(range(10))
+    for fix, (lat, lon, ts) in zip(fixes, points):
+        assert fix.lat == pytest.approx(lat, abs=1e-6)
+        assert fix.lon == pytest.approx(lon, abs=1e-6)
+        assert fix.ts_ms == ts
+
+
+def test_a_jump_starts_a_new_absolute_frame():
+    frames = FrameEncoder().encode([(52.5, 13.4, 0), (48.1, 11.6, 1000)])
+
+    assert len(frames) == 2
+    assert [round(f.lat, 1) for f in decode_all(frames)] == [52.5, 48.1]
+
+
+def test_long_runs_are_split_into_several_frames():
+    points = [(52.5, 13.4, i * 1000) for i in range(MAX_FIXES_PER_FRAME + 5)]
+
+    frames = FrameEncoder().encode(points)
+
+    assert len(frames) == 2
+    assert len(decode_all(frames)) == len(points)
+
+
+def test_later_batches_are_delta_frames_on_the_same_connection():
+    encoder, decoder = FrameEncoder(), FrameDecoder()
+    decode_all(encoder.encode([(52.5, 13.4, 0)]), decoder)
+
+    (frame,) = encoder.encode([(52.5001, 13.4, 1000)])
+
+    with pytest.raises(FrameError):
+        FrameDecoder().decode(frame)
+    (fix,) = decoder.decode(frame)
+    assert (fix.seq, fix.ts_ms) == (1, 1000)
+
+
+def test_retransmitted_frames_are_dropped():
+    decoder = FrameDecoder()
+    (frame,) = FrameEncoder().encode([(52.5, 13.4, 0), (52.5, 13.4, 1000)])
+
+    assert len(decoder.decode(frame)) == 2
+    assert decoder.decode(frame) == []
+
+
+def test_replayed_frame_keeps_the_delta_base():
+    encoder, decoder = FrameEncoder(), FrameDecoder()
+    (f1,) = encoder.encode([(52.5, 13.4, 0), (52.5001, 13.4, 1000)])
+    (f2,) = encoder.encode([(52.6, 13.4, 900_000)])          # too far for a delta
+    (f3,) = encoder.encode([(52.601, 13.4, 901_000)])        # delta against f2
+
+    decoder.decode(f1)
+    decoder.decode(f2)
+    assert decoder.decode(f1) == []
+    (fix,) = decoder.decode(f3)
+
+    assert (fix.seq, fix.ts_ms) == (3, 901_000)
+    assert fix.lat == pytest.approx(52.601, abs=1e-6)
+
+
+@pytest.mark.parametrize("frame", [
+    b"\x01",
+    HEADER.pack(VERSION + 1, 0, 1, 0) + bytes(16),
+    HEADER.pack(VERSION, 0, 2, 0) + bytes(16),
+])
+def test_malformed_frames_raise(frame):
+    with pytest.raises(FrameError):
+        FrameDecoder().decode(frame)
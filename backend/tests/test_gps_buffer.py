@@ -0,0 +1,42 @@
+import asyncio
+from datetime import datetime
+
+from app.models.gps import GPSLocation
+from app.services.gps_buffer import GPSWriteBuffer
+
+
+NOW = datetime(2026, 10, 18, 12, 0)
+
+
+def test_put_before_start_is_flushed_on_stop(db, make_rider):
+    rider = make_rider()
+    buffer = GPSWriteBuffer(flush_rows=100, flush_ms=10)
+
+    async def run():
+        await buffer.put(rider.id, 52.5, 13.4, NOW)
+        await buffer.start()
+        await buffer.put(rider.id, 52.6, 13.4, NOW)
+        await buffer.stop()
+
+    asyncio.run(run())
+
+    assert db.query(GPSLocation).count() == 2
+    assert buffer.stats()["flushed_rows"] == 2
+
+
+def test_a_bad_row_only_drops_itself(db, make_rider):
+    rider = make_rider()
+    buffer = GPSWriteBuffer(flush_rows=100, flush_ms=10)
+
+    async def run():
+        await buffer.start()
+        await buffer.put(rider.id, 52.5, 13.4, NOW)
+        await buffer.put(rider.id, None, 13.4, NOW)     # NOT NULL violation
+        await buffer.put(rider.id, 52.6, 13.4, NOW)
+        await buffer.stop()
+
+    asyncio.run(run())
+
+    assert sorted(lat for (lat,) in db.query(GPSLocation.latitude)) == [52.5, 52.6]
+    stats = buffer.stats()
+    assert (stats["flushed_rows"], stats["dropped_rows"]) == (2, 1)
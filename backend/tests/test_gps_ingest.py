@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+from app.models.gps import GPSLocation
+from app.services.gps_ingest import MIN_UPDATE_SECONDS, ingest_fixes, is_stagnant
+from app.services.last_fix_cache import LastFix
+
+
+NOW = datetime(2026, 10, 18, 12, 0)
+
+
+def test_batch_is_stored_in_one_go(db, make_rider):
+    rider = make_rider()
+    fixes = [
+        (0, rider.id, 52.50, 13.40, NOW - timedelta(minutes=2)),
+        (1, rider.id, 52.51, 13.40, NOW - timedelta(minutes=1)),
+        (2, rider.id, 52.52, 13.40, NOW),
+    ]
+
+    accepted, rejected = ingest_fixes(db, fixes, now=NOW)
+
+    assert [a["index"] for a in accepted] == [0, 1, 2]
+    assert rejected == []
+    assert db.query(GPSLocation).count() == 3
+
+
+def test_bad_fixes_are_rejected_with_a_reason(db, make_rider):
+    rider = make_rider()
+    fixes = [
+        (0, rider.id, 91.0, 13.40, NOW),
+        (1, rider.id, 52.50, 13.40, NOW + timedelta(hours=1)),
+        (2, 9999, 52.50, 13.40, NOW),
+        (3, rider.id, 52.50, 13.40, NOW - timedelta(minutes=1)),
+        (4, rider.id, 52.50, 13.40, NOW - timedelta(minutes=1) + timedelta(seconds=5)),
+    ]
+
+    accepted, rejected = ingest_fixes(db, fixes, now=NOW)
+
+    assert [a["index"] for a in accepted] == [3]
+    assert {r["index"]: r["reason"] for r in rejected} == {
+        0: "invalid_coordinates",
+        1: "future_timestamp",
+        2: "unknown_rider",
+        4: "too_frequent",
+    }
+
+
+def test_batches_are_ordered_per_rider_before_the_rules(db, make_rider):
+    rider = make_rider()
+    step = timedelta(seconds=MIN_UPDATE_SECONDS)
+    fixes = [
+        (0, rider.id, 52.52, 13.40, NOW),
+        (1, rider.id, 52.50, 13.40, NOW - 2 * step),
+        (2, rider.id, 52.51, 13.40, NOW - step),
+    ]
+
+    accepted, rejected = ingest_fixes(db, fixes, now=NOW)
+
+    assert len(accepted) == 3 and rejected == []
+
+
+def test_stagnation_rule():
+    last = LastFix(1, 1, 52.5, 13.4, NOW - timedelta(minutes=10))
+
+    assert is_stagnant(last, 52.5001, 13.4, NOW) == 10
+    assert is_stagnant(last, 52.51, 13.4, NOW) is None
+    assert is_stagnant(last._replace(timestamp=NOW - timedelta(minutes=2)), 52.5, 13.4, NOW) is None
+
+
+def test_fixes_older_than_the_stored_one_are_out_of_order(db, make_rider):
+    rider = make_rider()
+    ingest_fixes(db, [(0, rider.id, 52.50, 13.40, NOW)], now=NOW)
+
+    accepted, rejected = ingest_fixes(db, [
+        (0, rider.id, 52.49, 13.40, NOW - timedelta(minutes=5)),
+        (1, rider.id, 52.50, 13.40, NOW + timedelta(seconds=10)),
+        (2, rider.id, 52.51, 13.40, NOW + timedelta(seconds=MIN_UPDATE_SECONDS)),
+    ], now=NOW + timedelta(minutes=1))
+
+    assert [a["index"] for a in accepted] == [2]
+    assert {r["index"]: r["reason"] for r in rejected} == {0: "out_of_order", 1: "too_frequent"}
@@ -0,0 +1,35 @@
+from datetime import date
+
+from app.services.gps_partitions import (
+    DEFAULT_PARTITION,
+    _parse_partition_start,
+    next_period,
+    partition_name,
+    period_start,
+)
+
+
+def test_month_periods():
+    start = period_start(date(2026, 12, 17), "month")
+
+    assert start == date(2026, 12, 1)
+    assert next_period(start, "month") == date(2027, 1, 1)
+    assert partition_name(start, "month") == "gps_locations_p202612"
+
+
+def test_day_periods():
+    start = period_start(date(2026, 10, 31), "day")
+
+    assert next_period(start, "day") == date(2026, 11, 1)
+    assert partition_name(start, "day") == "gps_locations_p20261031"
+
+
+def test_partition_names_round_trip():
+    for interval, day in (("day", date(2026, 2, 28)), ("month", date(2026, 2, 1))):
+        assert _parse_partition_start(partition_name(day, interval), interval) == day
+
+
+def test_default_partition_is_never_expired():
+    # expire_partitions skips names it cannot parse
+    assert _parse_partition_start(DEFAULT_PARTITION, "month") is None
+    assert _parse_partition_start(DEFAULT_PARTITION, "day") is None
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from app.models.gps import GPSLocation
+from app.services.last_fix_cache import LastFix, LastFixCache, query_last_fixes
+
+
+NOW = datetime(2026, 10, 18, 12, 0)
+
+
+def fix(rider_id, minutes=0, point_id=1):
+    return LastFix(point_id, rider_id, 52.5, 13.4, NOW + timedelta(minutes=minutes))
+
+
+def test_lru_bound():
+    cache = LastFixCache(max_size=2)
+    cache.put(fix(1))
+    cache.put(fix(2))
+    cache.get(1)
+    cache.put(fix(3))
+
+    assert cache.get(2) is None
+    assert cache.get(1) is not None and cache.get(3) is not None
+
+
+def test_older_fix_never_replaces_a_newer_one():
+    cache = LastFixCache()
+    cache.put(fix(1, minutes=5, point_id=2))
+    cache.put(fix(1, minutes=1, point_id=1))
+
+    assert cache.get(1).id == 2
+
+
+def test_misses_are_loaded_from_the_db_once(db, make_rider):
+    a, b = make_rider("a"), make_rider("b")
+    db.add_all([
+        GPSLocation(rider_id=a.id, latitude=1.0, longitude=1.0, timestamp=NOW),
+        GPSLocation(rider_id=a.id, latitude=2.0, longitude=2.0, timestamp=NOW + timedelta(minutes=1)),
+        GPSLocation(rider_id=b.id, latitude=3.0, longitude=3.0, timestamp=NOW),
+    ])
+    db.commit()
+
+    cache = LastFixCache()
+    found = cache.get_many(db, [a.id, b.id, 9999])
+
+    assert {rider_id: f.latitude for rider_id, f in found.items()} == {a.id: 2.0, b.id: 3.0}
+    assert len(cache) == 2
+
+
+def test_query_breaks_timestamp_ties_by_id(db, make_rider):
+    rider = make_rider()
+    db.add_all([
+        GPSLocation(rider_id=rider.id, latitude=1.0, longitude=1.0, timestamp=NOW),
+        GPSLocation(rider_id=rider.id, latitude=2.0, longitude=2.0, timestamp=NOW),
+    ])
+    db.commit()
+
+    (last,) = query_last_fixes(db, [rider.id])
+    assert last.latitude == 2.0
@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.daily_distance import DailyDistance, HourlyDistance, WeeklyDistance
+from app.services import odometer as odometer_module
+from app.services.last_fix_cache import LastFix
+from app.services.odometer import Odometer
+from app.utils.gps import haversine
+
+
+T0 = datetime(2026, 10, 5, 23, 50)
+
+
+def fix(point_id, minutes, lat, rider_id=1):
+    return LastFix(point_id, rider_id, lat, 13.4, T0 + timedelta(minutes=minutes))
+
+
+def pending_km(odometer):
+    return {hour: round(km, 6) for _, hour, km in odometer.pending()}
+
+
+def test_segments_go_to_the_hour_of_their_end_point(db):
+    odometer = Odometer()
+    odometer.record(fix(1, 0, 52.50))
+    km = odometer.record(fix(2, 15, 52.51))      # crosses midnight
+
+    assert km == pytest.approx(haversine(52.50, 13.4, 52.51, 13.4))
+    assert pending_km(odometer) == {datetime(2026, 10, 6, 0): round(km, 6)}
+
+
+def test_late_and_far_apart_fixes_are_not_counted(db):
+    odometer = Odometer()
+    odometer.record(fix(1, 0, 52.50))
+
+    assert odometer.record(fix(2, -5, 52.60)) == 0.0          # older than the last one
+    assert odometer.record(fix(3, 60 * 48, 52.70)) == 0.0     # two days later
+    assert odometer.pending() == []
+
+
+def test_flush_writes_hour_day_and_week_together(db):
+    odometer = Odometer()
+    odometer.record(fix(1, 15, 52.50))
+    km = odometer.record(fix(2, 20, 52.51))
+
+    asyncio.run(odometer.flush())
+
+    assert odometer.pending() == []
+    for model in (HourlyDistance, DailyDistance, WeeklyDistance):
+        assert db.query(model.distance_km).scalar() == pytest.approx(km)
+
+
+def test_a_cancelled_flush_keeps_its_km(db, monkeypatch):
+    odometer = Odometer()
+    odometer.record(fix(1, 15, 52.50))
+    odometer.record(fix(2, 20, 52.51))
+    before = pending_km(odometer)
+
+    class HangingSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def run_sync(self, fn, batch):
+            await asyncio.sleep(60)
+
+    async def run():
+        monkeypatch.setattr(odometer_module, "AsyncSessionLocal", HangingSession)
+        task = asyncio.create_task(odometer.flush())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+
+    assert pending_km(odometer) == before
@@ -0,0 +1,71 @@
+import math
+import random
+
+import pytest
+
+from app.red_zone_service import distance_meters
+from app.utils.geo import PreparedPolygon
+from app.utils.spatial_grid import ZoneGrid
+
+# an L-shaped block around Berlin Mitte
+L_SHAPE = [(52.50, 13.38), (52.50, 13.42), (52.51, 13.42), (52.51, 13.39), (52.53, 13.39), (52.53, 13.38)]
+
+
+def star(rng, lat, lon, points=40):
+    vertices = []
+    for i in range(points):
+        angle = 2 * math.pi * i / points
+        r = 0.005 + rng.random() * 0.02
+        vertices.append((lat + r * math.sin(angle), lon + r * math.cos(angle)))
+    return vertices
+
+
+def ray_cast(vertices, lat, lon):
+    inside = False
+    for (lat1, lon1), (lat2, lon2) in zip(vertices, vertices[1:] + vertices[:1]):
+        if (lat1 > lat) != (lat2 > lat):
+            if lon1 + (lat - lat1) * (lon2 - lon1) / (lat2 - lat1) > lon:
+                inside = not inside
+    return inside
+
+
+def test_l_shape_and_bbox():
+    polygon = PreparedPolygon(L_SHAPE + [L_SHAPE[0]])       # closed ring is accepted
+
+    assert len(polygon.vertices) == 6
+    assert polygon.bbox == (52.50, 13.38, 52.53, 13.42)
+    assert polygon.contains(52.505, 13.41)
+    assert polygon.contains(52.52, 13.385)
+    assert not polygon.contains(52.52, 13.41)               # the notch, inside the bbox
+    assert not polygon.contains(52.60, 13.40)
+
+
+def test_banded_edges_match_a_full_ray_cast():
+    rng = random.Random(25)
+    vertices = star(rng, 52.52, 13.40)
+    polygon = PreparedPolygon(vertices)
+
+    for _ in range(5000):
+        lat, lon = 52.49 + rng.random() * 0.06, 13.37 + rng.random() * 0.06
+        assert polygon.contains(lat, lon) == ray_cast(vertices, lat, lon)
+
+
+def test_too_few_vertices():
+    with pytest.raises(ValueError):
+        PreparedPolygon([(52.5, 13.4), (52.6, 13.4), (52.5, 13.4)])
+
+
+def test_grid_mixes_polygons_and_circles():
+    polygon = PreparedPolygon(L_SHAPE)
+    zones = [
+        {"id": "block", "lat": 52.505, "lon": 13.39, "polygon": L_SHAPE,
+         "radius": round(polygon.bounding_radius(52.505, 13.39))},
+        {"id": "circle", "lat": 52.52, "lon": 13.41, "radius": 300},
+    ]
+    grid = ZoneGrid(zones, distance_meters, cell_deg=0.005)
+
+    assert grid.containing(52.505, 13.41)["id"] == "block"
+    assert grid.containing(52.52, 13.41)["id"] == "circle"    # in the notch
+    assert grid.containing(52.515, 13.415) is None
+    # the farthest vertex from the anchor is the north-west corner
+    assert polygon.bounding_radius(52.505, 13.39) == pytest.approx(distance_meters(52.505, 13.39, 52.53, 13.38))
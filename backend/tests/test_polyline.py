@@ -0,0 +1,71 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.routes import RouteCache, build_route, cacheable
+from app.utils.polyline import decode, encode, meters_per_pixel, simplify
+
+
+Row = namedtuple("Row", "rider_id latitude longitude timestamp")
+
+
+def test_encodes_the_reference_example():
+    # from the encoded polyline algorithm format description
+    lats, lons = [38.5, 40.7, 43.252], [-120.2, -120.95, -126.453]
+
+    assert encode(lats, lons) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert decode("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == list(zip(lats, lons))
+
+
+def test_straight_line_keeps_only_its_ends():
+    lats = [52.5 + i * 0.001 for i in range(20)]
+    lons = [13.4] * 20
+
+    assert simplify(lats, lons, tolerance_m=1) == [0, 19]
+
+
+def test_corners_survive_and_tolerance_zero_keeps_all():
+    lats = [52.50, 52.51, 52.52, 52.52, 52.52]
+    lons = [13.40, 13.40, 13.40, 13.41, 13.42]
+
+    assert simplify(lats, lons, tolerance_m=5) == [0, 2, 4]
+    assert simplify(lats, lons, tolerance_m=0) == [0, 1, 2, 3, 4]
+
+
+def test_zoom_tolerance_is_about_a_pixel():
+    assert meters_per_pixel(0, 0) == pytest.approx(156543.03392)
+    assert meters_per_pixel(60, 1) == pytest.approx(156543.03392 / 4)
+
+
+def test_build_route_as_polyline():
+    t0 = datetime(2026, 10, 5, 9, 0)
+    rows = [Row(1, 52.5 + i * 0.001, 13.4, t0 + timedelta(minutes=i)) for i in range(10)]
+
+    route = build_route(rows, tolerance_m=1, fmt="polyline")
+
+    assert (route["points"], route["raw_points"]) == (2, 10)
+    assert decode(route["polyline"]) == [(52.5, 13.4), (52.509, 13.4)]
+    assert route["end_time"] == rows[-1].timestamp
+
+
+def test_route_cache_is_an_lru():
+    cache = RouteCache(max_size=1)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    assert cache.get("a") is None and cache.get("b") == 2
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_only_simplified_closed_days_are_cached():
+    now = datetime(2026, 10, 18, 9, 30)
+    day = datetime(2026, 10, 17)
+
+    assert cacheable(day, day + timedelta(days=1), tolerance_m=5, now=now)
+    assert cacheable(day, day + timedelta(days=1), zoom=14, now=now)
+    assert not cacheable(day, day + timedelta(days=1), now=now)                        # raw
+    assert not cacheable(day, day + timedelta(days=1), tolerance_m=0, now=now)
+    assert not cacheable(day - timedelta(days=60), day, tolerance_m=5, now=now)          # months
+    assert not cacheable(day + timedelta(hours=3), day + timedelta(days=1, hours=3), zoom=14, now=now)
+    assert not cacheable(now.replace(hour=0), now.replace(hour=0) + timedelta(days=1), zoom=14, now=now)
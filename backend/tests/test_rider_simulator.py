@@ -0,0 +1,64 @@
+import argparse
+import math
+import random
+
+import pytest
+
+from app.rider_simulator import METERS_PER_DEG, ClusteredModel, IdleModel, Metrics, parse_mix
+
+
+def test_parse_mix():
+    assert parse_mix("idle=1,moving=3,clustered") == {"idle": 1.0, "moving": 3.0, "clustered": 1.0}
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mix("teleport=1")
+
+
+def test_percentiles_in_milliseconds():
+    stats = Metrics.percentiles([i / 1000 for i in range(1, 101)])
+
+    assert (stats["p50_ms"], stats["p99_ms"], stats["max_ms"]) == (51.0, 100.0, 100.0)
+    assert stats["samples"] == 100
+    assert Metrics.percentiles([]) is None
+
+
+def test_idle_riders_only_jitter():
+    model = IdleModel(random.Random(1), 52.52, 13.405)
+
+    for _ in range(100):
+        lat, lon = model.step(1)
+        assert abs(lat - 52.52) * METERS_PER_DEG <= 5
+        assert abs(lon - 13.405) * METERS_PER_DEG <= 5
+
+
+def test_clustered_riders_stay_near_their_zone():
+    model = ClusteredModel(random.Random(2), 0, 0)
+    radius_deg = model.zone["radius"] / METERS_PER_DEG
+
+    for _ in range(600):
+        lat, lon = model.step(1)
+        assert math.hypot(lat - model.zone["lat"], lon - model.zone["lon"]) < radius_deg * 1.2
+
+
+def test_pending_fixes_expire_as_unobserved():
+    metrics = Metrics(observe_timeout=10)
+    metrics.track(("r1", 52.5, 13.4), now=0)
+    metrics.track(("r2", 52.5, 13.4), now=5)
+
+    metrics.observe(("r2", 52.5, 13.4), now=6)
+    metrics.track(("r3", 52.5, 13.4), now=12)          # r1 is too old by now
+
+    assert (metrics.accepted, metrics.unobserved) == (1, 1)
+    assert list(metrics.pending) == [("r3", 52.5, 13.4)]
+    assert metrics.ingest_latency == [1]
+
+    metrics.expire()
+    assert not metrics.pending and metrics.unobserved == 2
+
+
+def test_resending_the_same_position_counts_the_first_as_unobserved():
+    metrics = Metrics()
+    metrics.track(("r1", 52.5, 13.4), now=0)
+    metrics.track(("r1", 52.5, 13.4), now=1)
+
+    metrics.observe(("r1", 52.5, 13.4), now=3)
+    assert metrics.unobserved == 1 and metrics.ingest_latency == [2]
@@ -0,0 +1,66 @@
+import asyncio
+import random
+
+from app.services.admin_broadcast import AdminBroadcaster
+from app.utils.spatial_grid import SpatialGrid
+
+
+def brute_force(points, south, west, north, east):
+    return {k for k, (lat, lon) in points.items() if south <= lat <= north and west <= lon <= east}
+
+
+def test_bbox_queries_match_a_scan():
+    rng = random.Random(8)
+    grid = SpatialGrid(cell_deg=0.01)
+    points = {}
+    for i in range(500):
+        points[i] = (52.4 + rng.random() * 0.2, 13.3 + rng.random() * 0.2)
+        grid.update(i, *points[i])
+
+    for _ in range(50):
+        south, west = 52.4 + rng.random() * 0.2, 13.3 + rng.random() * 0.2
+        box = (south, west, south + rng.random() * 0.1, west + rng.random() * 0.1)
+        assert set(grid.query_bbox(*box)) == brute_force(points, *box)
+
+    # a box much larger than the occupied area scans occupied cells only
+    assert set(grid.query_bbox(-90, -180, 90, 180)) == set(points)
+
+
+def test_moves_and_removals_keep_cells_consistent():
+    grid = SpatialGrid(cell_deg=0.01)
+    grid.update("a", 52.501, 13.401)
+    grid.update("a", 52.551, 13.451)
+
+    assert grid.query_bbox(52.50, 13.40, 52.502, 13.402) == []
+    assert grid.query_bbox(52.55, 13.45, 52.552, 13.452) == ["a"]
+    assert len(grid.cells) == 1
+
+    grid.remove("a")
+    grid.remove("missing")
+    assert len(grid) == 0 and not grid.cells
+
+
+def test_viewport_admins_see_riders_enter_and_leave():
+    broadcaster = AdminBroadcaster(full_snapshot_ticks=0)
+    sent = []
+
+    class Socket:
+        async def send_json(self, message):
+            sent.append(message)
+
+    async def run():
+        client = broadcaster.register(Socket())
+        broadcaster.subscribe(client, {"type": "SUBSCRIBE", "bbox": [52.50, 13.40, 52.51, 13.41]})
+        broadcaster.publish("in", 52.505, 13.405)
+        broadcaster.publish("out", 48.1, 11.6)
+        broadcaster.broadcast()
+        broadcaster.publish("in", 48.1, 11.6)
+        broadcaster.broadcast()
+        await asyncio.sleep(0)
+        await broadcaster.stop()
+
+    asyncio.run(run())
+
+    entered, left = [m for m in sent if m.get("type") == "POSITIONS"][-2:]
+    assert [r["rider_id"] for r in entered["riders"]] == ["in"]
+    assert left["riders"] == [] and left["removed"] == ["in"]
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+import uuid
+
+import pytest
+
+from app.tracking_state import (
+    InMemoryRiderStateStore,
+    RedisRiderStateStore,
+    RiderStateStore,
+    SharedMemoryRiderStateStore,
+)
+from app.utils.local_redis import LocalRedis
+
+
+@pytest.fixture(params=["memory", "shm", "redis"])
+def store(request):
+    if request.param == "memory":
+        yield InMemoryRiderStateStore()
+    elif request.param == "shm":
+        shm = SharedMemoryRiderStateStore(name=f"fleet_test_{uuid.uuid4().hex[:8]}", slots=64)
+        yield shm
+        shm.close(unlink=True)
+    else:
+        yield RedisRiderStateStore(prefix="test", client=LocalRedis())
+
+
+def test_the_interface_is_abstract():
+    with pytest.raises(TypeError):
+        RiderStateStore()
+
+
+def test_jitter_does_not_reset_the_idle_timer(store):
+    store.update_position("r1", 52.5, 13.4, now=100)
+    state = store.update_position("r1", 52.50001, 13.4, now=200)
+
+    assert state["last_move_time"] == 100 and state["last_update"] == 200
+
+    state = store.update_position("r1", 52.51, 13.4, now=300)
+    assert state["last_move_time"] == 300 and state["lat"] == 52.51
+
+
+def test_alerts_and_removal(store):
+    store.update_position("r1", 52.5, 13.4, now=100)
+    store.mark_alert("r1", "REDIRECT", 150)
+
+    assert store.get("r1")["last_alert"]["REDIRECT"] == 150
+    assert "r1" in store and len(store) == 1
+
+    store.remove("r1")
+    assert store.get("r1") is None and "r1" not in store
+    assert store.positions() == {}
+
+
+def test_zone_counters_follow_riders(store):
+    for rider in ("r1", "r2"):
+        store.update_position(rider, 52.5, 13.4, now=100)
+
+    assert store.set_zone("r1", "z1") is None
+    store.set_zone("r2", "z1")
+    assert store.set_zone("r1", "z2") == "z1"
+    assert store.zone_counts() == {"z1": 1, "z2": 1}
+
+    store.remove("r2")
+    assert store.zone_counts() == {"z2": 1}
+    assert store.set_zone("ghost", "z1") is None
+
+
+def test_memory_url_selects_the_local_client():
+    assert isinstance(RedisRiderStateStore(url="memory://").client, LocalRedis)
+
+
+def test_only_a_networked_redis_store_blocks(store):
+    assert store.blocking is False
+    assert RedisRiderStateStore(client=object()).blocking is True
+
+
+def test_blocking_store_calls_run_off_the_event_loop(monkeypatch):
+    import app.main as main
+
+    class NetworkStore(InMemoryRiderStateStore):
+        blocking = True
+        threads = set()
+
+        def update_position(self, *args, **kwargs):
+            self.threads.add(threading.get_ident())
+            return super().update_position(*args, **kwargs)
+
+        def mark_alert(self, *args):
+            self.threads.add(threading.get_ident())
+            return super().mark_alert(*args)
+
+    class Socket:
+        sent = []
+
+        async def send_json(self, message):
+            self.sent.append(message["type"])
+
+    store = NetworkStore()
+    monkeypatch.setattr(main, "rider_state", store)
+    # idle for a while, so the fix also triggers an alert
+    store.update_position("r1", 52.5, 13.4, time.time() - 3600)
+    store.threads.clear()
+
+    async def handle():
+        await main.handle_rider_fix(Socket(), "r1", 52.5, 13.4)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(handle())
+
+    assert "STATIONARY_WARNING" in Socket.sent
+    assert store.get("r1")["last_alert"]["STATIONARY"] > 0
+    assert store.threads and loop_thread not in store.threads
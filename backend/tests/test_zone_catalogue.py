@@ -0,0 +1,71 @@
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app import red_zone_service
+from app.core.security import create_access_token
+from app.red_zone_service import (
+    RED_ZONES,
+    load_zone_catalogue,
+    set_red_zones,
+    zone_catalogue,
+)
+from app.schemas.redzone import RedZoneUpdate
+
+
+@pytest.fixture(autouse=True)
+def restore_catalogue(monkeypatch):
+    # the catalogue is process-wide: put the original back afterwards
+    monkeypatch.setattr(red_zone_service, "_catalogue", zone_catalogue())
+
+
+def test_empty_table_is_seeded_with_the_defaults(db):
+    catalogue = load_zone_catalogue(db)
+
+    assert [z["name"] for z in catalogue.zones] == [z["name"] for z in RED_ZONES]
+    assert catalogue.grid.containing(RED_ZONES[0]["lat"], RED_ZONES[0]["lon"])["name"] == "Berlin Center"
+
+
+def test_version_only_moves_when_the_zones_change():
+    before = zone_catalogue()
+
+    assert set_red_zones(before.zones) is before
+    changed = set_red_zones(before.zones[:1])
+    assert changed.version == before.version + 1
+    assert len(changed.grid) == 1
+
+
+def test_update_schema_rejects_nulls_and_short_polygons():
+    assert RedZoneUpdate(weight=4).model_dump(exclude_unset=True) == {"weight": 4}
+    assert RedZoneUpdate(radius_meters=None).model_dump(exclude_unset=True) == {"radius_meters": None}
+
+    with pytest.raises(ValidationError):
+        RedZoneUpdate(name=None)
+    with pytest.raises(ValidationError):
+        RedZoneUpdate(polygon=[(52.5, 13.4), (52.6, 13.4)])
+
+
+def test_partial_put_keeps_other_fields_and_republishes(db, make_rider):
+    from app.main import app
+
+    admin = make_rider("boss", role="admin")
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': admin.login_id, 'role': 'admin'})}"}
+    client = TestClient(app)
+
+    created = client.post("/admin/redzones/", headers=headers, json={
+        "name": "Ostkreuz", "latitude": 52.503, "longitude": 13.469, "radius_meters": 400,
+    }).json()
+    version = zone_catalogue().version
+
+    updated = client.put(f"/admin/redzones/{created['id']}", headers=headers, json={"weight": 4})
+    assert updated.status_code == 200
+    assert updated.json() == {**created, "weight": 4}
+
+    catalogue = zone_catalogue()
+    assert catalogue.version == version + 1
+    assert [z["weight"] for z in catalogue.zones if z["db_id"] == created["id"]] == [4]
+
+    # a circle cannot lose its radius without getting a polygon
+    refused = client.put(f"/admin/redzones/{created['id']}", headers=headers, json={"radius_meters": None})
+    assert refused.status_code == 422
+    assert client.get("/admin/redzones/", headers=headers).json()[0]["radius_meters"] == 400
@@ -0,0 +1,63 @@
+import random
+
+from app.red_zone_service import distance_meters
+from app.utils.spatial_grid import ZoneGrid
+
+
+def random_zones(rng, count):
+    return [
+        {
+            "id": f"zone_{i}",
+            "lat": 52.3 + rng.random() * 0.4,
+            "lon": 13.1 + rng.random() * 0.6,
+            "radius": rng.choice([200, 500, 1500]),
+            "weight": rng.randint(1, 3),
+        }
+        for i in range(count)
+    ]
+
+
+def scan_containing(zones, lat, lon):
+    return next(
+        (z for z in zones if distance_meters(lat, lon, z["lat"], z["lon"]) <= z["radius"]),
+        None,
+    )
+
+
+def scan_nearest(zones, lat, lon, accept=None):
+    candidates = [z for z in zones if accept is None or accept(z)]
+    return min(candidates, key=lambda z: distance_meters(lat, lon, z["lat"], z["lon"]), default=None)
+
+
+def test_lookups_match_a_scan_of_the_list():
+    rng = random.Random(21)
+    zones = random_zones(rng, 200)
+    grid = ZoneGrid(zones, distance_meters, cell_deg=0.01)
+    heavy = lambda zone: zone["weight"] == 3
+
+    for _ in range(2000):
+        # some points well outside the zones, to exercise the scan fallback
+        lat, lon = 52.0 + rng.random() * 1.0, 12.8 + rng.random() * 1.2
+        assert grid.containing(lat, lon) is scan_containing(zones, lat, lon)
+        assert grid.nearest(lat, lon) is scan_nearest(zones, lat, lon)
+        assert grid.nearest(lat, lon, heavy) is scan_nearest(zones, lat, lon, heavy)
+
+
+def test_overlapping_zones_resolve_to_the_first_listed():
+    zones = [
+        {"id": "a", "lat": 52.52, "lon": 13.405, "radius": 500},
+        {"id": "b", "lat": 52.52, "lon": 13.405, "radius": 800},
+    ]
+    grid = ZoneGrid(zones, distance_meters)
+
+    assert grid.containing(52.5201, 13.4051)["id"] == "a"
+    assert grid.nearest(52.6, 13.5)["id"] == "a"
+    assert grid.containing(52.6, 13.5) is None
+
+
+def test_empty_grid():
+    grid = ZoneGrid([], distance_meters)
+
+    assert len(grid) == 0
+    assert grid.containing(52.52, 13.405) is None
+    assert grid.nearest(52.52, 13.405) is None
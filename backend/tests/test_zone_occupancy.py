@@ -0,0 +1,52 @@
+from app.red_zone_service import (
+    RED_ZONES,
+    _build,
+    ZoneOccupancy,
+    compute_zone_loads,
+)
+from app.tracking_state import InMemoryRiderStateStore
+
+CENTER, KREUZBERG, MITTE = RED_ZONES
+NOWHERE = (52.40, 13.10)
+
+
+def place(store, occupancy, catalogue, rider_id, lat, lon):
+    store.update_position(rider_id, lat, lon, 0)
+    return occupancy.track(rider_id, lat, lon, catalogue)
+
+
+def test_counts_follow_riders_between_zones():
+    store, catalogue = InMemoryRiderStateStore(), _build(1, RED_ZONES)
+    occupancy = ZoneOccupancy(store)
+
+    assert place(store, occupancy, catalogue, "a", CENTER["lat"], CENTER["lon"]) is CENTER
+    place(store, occupancy, catalogue, "b", CENTER["lat"], CENTER["lon"])
+    place(store, occupancy, catalogue, "c", *NOWHERE)
+    assert occupancy.counts(catalogue) == {"zone_1": 2}
+
+    place(store, occupancy, catalogue, "a", MITTE["lat"], MITTE["lon"])
+    place(store, occupancy, catalogue, "b", *NOWHERE)
+    assert occupancy.counts(catalogue) == {"zone_3": 1}
+
+
+def test_loads_match_a_recount_from_scratch():
+    store, catalogue = InMemoryRiderStateStore(), _build(1, RED_ZONES)
+    occupancy = ZoneOccupancy(store)
+    spots = [CENTER, CENTER, KREUZBERG, MITTE, None, None]
+    for i, zone in enumerate(spots):
+        lat, lon = (zone["lat"], zone["lon"]) if zone else NOWHERE
+        place(store, occupancy, catalogue, f"r{i}", lat, lon)
+
+    assert occupancy.loads(catalogue) == compute_zone_loads(store.positions(), catalogue)
+    assert occupancy.loads(catalogue)["zone_1"] == {"current": 2, "target": 3.0, "pressure": 0.67}
+
+
+def test_new_catalogue_version_reclassifies_everyone():
+    store = InMemoryRiderStateStore()
+    occupancy = ZoneOccupancy(store)
+    place(store, occupancy, _build(1, RED_ZONES), "a", MITTE["lat"], MITTE["lon"])
+
+    # Mitte comes back under a new id
+    moved = [CENTER, KREUZBERG, {**MITTE, "id": "zone_9"}]
+    assert occupancy.counts(_build(2, moved)) == {"zone_9": 1}
+    assert occupancy.version == 2
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from app.red_zone_service import RED_ZONES, ZoneOccupancy, _build
+from app.services import zone_pressure as module
+from app.services.zone_pressure import ZonePressureScheduler, pressure_color
+from app.tracking_state import InMemoryRiderStateStore
+
+CENTER, KREUZBERG, MITTE = RED_ZONES
+
+
+@pytest.fixture
+def fleet(monkeypatch):
+    """
+    A private store and catalogue behind the scheduler.
+    `fleet.move(rider_id, zone)` puts a rider in a zone.
+    """
+    class Fleet:
+        store = InMemoryRiderStateStore()
+        occupancy = ZoneOccupancy(store)
+        catalogue = _build(1, RED_ZONES)
+
+        def move(self, rider_id, zone):
+            self.store.update_position(rider_id, zone["lat"], zone["lon"], 0)
+            self.occupancy.track(rider_id, zone["lat"], zone["lon"], self.catalogue)
+
+    fleet = Fleet()
+    monkeypatch.setattr(module, "zone_occupancy", fleet.occupancy)
+    monkeypatch.setattr(module, "zone_catalogue", lambda: fleet.catalogue)
+    return fleet
+
+
+def test_pressure_colors():
+    assert [pressure_color(p) for p in (0, 0.79, 0.8, 1.2, 1.21)] == [
+        "green", "green", "yellow", "yellow", "red",
+    ]
+
+
+def test_version_only_moves_when_something_changed(fleet):
+    scheduler = ZonePressureScheduler()
+    fleet.move("a", CENTER)
+    first = scheduler.snapshot()
+
+    assert scheduler.refresh().version == first.version == 1
+    assert scheduler.refresh() is not first         # each refresh publishes a new tuple
+
+    fleet.move("a", MITTE)
+    assert scheduler.refresh().version == 2
+
+    fleet.catalogue = _build(2, RED_ZONES[:2])
+    second = scheduler.refresh()
+    assert second.version == 3
+    assert [z["id"] for z in second.zones] == ["zone_1", "zone_2"]
+
+
+def test_snapshot_zones_and_redirect_target(fleet):
+    scheduler = ZonePressureScheduler()
+    for rider_id in ("a", "b", "c", "d"):
+        fleet.move(rider_id, CENTER)
+    fleet.move("e", KREUZBERG)
+    fleet.move("f", MITTE)
+
+    zones = {z["id"]: z for z in scheduler.snapshot().zones}
+    assert zones["zone_1"]["pressure"] == 1.33 and zones["zone_1"]["color"] == "red"
+    assert zones["zone_2"]["color"] == "green"
+
+    # Mitte is nearer to the center but at its target
+    assert zones["zone_3"]["pressure"] == 1.0
+    assert scheduler.nearest_under_served(CENTER["lat"], CENTER["lon"])["id"] == "zone_2"
+
+
+def test_stop_waits_for_the_task(fleet):
+    async def main():
+        scheduler = ZonePressureScheduler(interval_ms=10)
+        await scheduler.start()
+        task = scheduler._task
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+        return scheduler, task
+
+    scheduler, task = asyncio.run(main())
+
+    assert task.done() and scheduler._task is None
+    assert scheduler.runs >= 2 and scheduler.failures == 0
+    assert scheduler.metrics()["version"] == 1